@@ -0,0 +1,106 @@
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+# Marcador de ausência (None pode ser um resultado válido)
+AUSENTE = object()
+
+
+class AgentCache:
+    # Cache persistente dos resultados dos agentes, chaveado por agente + versão + hash da entrada
+    # Armazena valores serializados e comprimidos, com despejo LRU quando o orçamento de bytes estoura
+
+    def __init__(self, db_path='agent_cache.db', max_bytes=100 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_database()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM resultados").fetchone()[0]
+
+    def _create_database(self):
+        # Cria a tabela de resultados se não existir
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS resultados (
+                chave TEXT PRIMARY KEY,
+                valor BLOB NOT NULL,
+                acessado_em REAL NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (acessado_em)")
+        self.conn.commit()
+
+    def obter(self, chave):
+        # Retorna o valor salvo ou AUSENTE
+        return self.obter_varios([chave]).get(chave, AUSENTE)
+
+    def obter_varios(self, chaves):
+        # Busca várias chaves em lote; retorna apenas as encontradas
+        encontrados = {}
+        with self._lock:
+            for inicio in range(0, len(chaves), 500):
+                lote = chaves[inicio:inicio + 500]
+                placeholders = ", ".join("?" * len(lote))
+                rows = self.conn.execute(
+                    f"SELECT chave, valor FROM resultados WHERE chave IN ({placeholders})", lote
+                ).fetchall()
+                for chave, valor in rows:
+                    encontrados[chave] = pickle.loads(zlib.decompress(valor))
+
+            if encontrados:
+                agora = time.time()
+                self.conn.executemany("UPDATE resultados SET acessado_em = ? WHERE chave = ?",
+                                      [(agora, chave) for chave in encontrados])
+                self.conn.commit()
+            self.hits += len(encontrados)
+            self.misses += len(chaves) - len(encontrados)
+        return encontrados
+
+    def salvar(self, chave, valor):
+        self.salvar_varios({chave: valor})
+
+    def salvar_varios(self, valores):
+        # Salva vários resultados numa única transação e despeja os menos usados se necessário
+        if not valores:
+            return
+        agora = time.time()
+        linhas = []
+        for chave, valor in valores.items():
+            blob = zlib.compress(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+            linhas.append((chave, blob, agora, len(blob)))
+
+        with self._lock:
+            chaves = list(valores)
+            antigos = 0
+            for inicio in range(0, len(chaves), 500):
+                lote = chaves[inicio:inicio + 500]
+                placeholders = ", ".join("?" * len(lote))
+                antigos += self.conn.execute(
+                    f"SELECT COALESCE(SUM(tamanho), 0) FROM resultados WHERE chave IN ({placeholders})", lote
+                ).fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO resultados (chave, valor, acessado_em, tamanho) VALUES (?, ?, ?, ?)", linhas
+            )
+            self.total_bytes += sum(linha[3] for linha in linhas) - antigos
+            self._despejar()
+            self.conn.commit()
+
+    def _despejar(self):
+        # Remove os resultados acessados há mais tempo até caber em max_bytes (chamado com o lock)
+        if self.total_bytes <= self.max_bytes:
+            return
+        removidas = []
+        for chave, tamanho in self.conn.execute("SELECT chave, tamanho FROM resultados ORDER BY acessado_em"):
+            if self.total_bytes <= self.max_bytes:
+                break
+            removidas.append((chave,))
+            self.total_bytes -= tamanho
+        self.conn.executemany("DELETE FROM resultados WHERE chave = ?", removidas)
+
+    def close(self):
+        # Fecha a conexão com o banco do cache
+        self.conn.close()
@@ -1,6 +1,8 @@
 ﻿from datetime import datetime
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
+from KeywordMatcher import keyword_matcher
+from NewsItem import NewsItem, catalogo
 
 
 class Agent1_ThemeSummarizer(EconomicNewsletterAgent):
@@ -10,10 +12,36 @@ class Agent1_ThemeSummarizer(EconomicNewsletterAgent):
         super().__init__("AGENT_1", "Sumarizador de Temas",
                          "Identifica e sumariza os temas principais das notícias econômicas")
 
+        # Palavras-chave por tema, em ordem de precedência (o primeiro tema encontrado vence)
+        self.theme_keywords = {
+            'mercado_financeiro': ['bolsa', 'ibovespa', 'ações', 'investimento'],
+            'politica_economica': ['governo', 'ministério', 'política'],
+            'empresas': ['empresa', 'corporação', 'negócios'],
+            'internacional': ['internacional', 'global', 'mundial'],
+            'commodities': ['petróleo', 'ouro', 'commodities']
+        }
+        keyword_matcher.registrar('agent1_temas', self.theme_keywords)
+
+    def configuracao(self):
+        return self.theme_keywords
+
+    def tema_da_noticia(self, item):
+        # Tema de uma notícia: o primeiro tema cujas palavras-chave aparecem no texto
+        found = keyword_matcher.agrupar(item.doc.ocorrencias(), 'agent1_temas')
+        return next((theme for theme in self.theme_keywords if found[theme]), 'outros')
+
+    @instrumentado(items_in=len, items_out=lambda result: result['total_news'])
     def process_news(self, raw_news_list):
         #Sumariza temas principais das notícias
         self.log_activity("Iniciando sumarização de temas principais...")
 
+        items = [NewsItem.coerce(news) for news in raw_news_list]
+
+        # Classificação básica por palavras-chave (notícias já vistas vêm do cache)
+        return self.agregar_temas(items, self.memorizar_por_noticia(items, self.tema_da_noticia))
+
+    def agregar_temas(self, items, temas):
+        # Monta o resumo a partir do tema de cada notícia (no modo streaming os temas chegam um a um)
         themes = {
             'mercado_financeiro': [],
             'politica_economica': [],
@@ -23,32 +51,18 @@ class Agent1_ThemeSummarizer(EconomicNewsletterAgent):
             'outros': []
         }
 
-        # Simular análise de temas principais
-        for news in raw_news_list:
-            title = news.get('title', '').lower()
-            content = news.get('content', '').lower()
-
-            # Classificação básica por palavras-chave
-            if any(word in title + content for word in ['bolsa', 'ibovespa', 'ações', 'investimento']):
-                themes['mercado_financeiro'].append(news)
-            elif any(word in title + content for word in ['governo', 'ministério', 'política']):
-                themes['politica_economica'].append(news)
-            elif any(word in title + content for word in ['empresa', 'corporação', 'negócios']):
-                themes['empresas'].append(news)
-            elif any(word in title + content for word in ['internacional', 'global', 'mundial']):
-                themes['internacional'].append(news)
-            elif any(word in title + content for word in ['petróleo', 'ouro', 'commodities']):
-                themes['commodities'].append(news)
-            else:
-                themes['outros'].append(news)
-
-        self.processed_count += len(raw_news_list)
+        for item, theme in zip(items, temas):
+            themes[theme].append(item.id)
+
+        self.processed_count += len(items)
         summary = {
             'timestamp': datetime.now().isoformat(),
-            'total_news': len(raw_news_list),
+            'total_news': len(items),
             'themes_distribution': {k: len(v) for k, v in themes.items()},
-            'main_themes': themes
+            # Ids das notícias por tema; o texto fica apenas no catálogo 'items'
+            'main_themes': themes,
+            'items': catalogo(items)
         }
 
-        self.log_activity(f"Processadas {len(raw_news_list)} notícias em {len(themes)} temas")
+        self.log_activity(f"Processadas {len(items)} notícias em {len(themes)} temas")
         return summary
\ No newline at end of file
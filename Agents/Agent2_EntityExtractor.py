@@ -1,13 +1,17 @@
-﻿from datetime import datetime
-import re
+﻿from collections import Counter
+from datetime import datetime
 from typing import Dict, Any
 
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
+from KeywordMatcher import keyword_matcher
+from ValueExtractor import value_extractor
 
 class Agent2_EntityExtractor(EconomicNewsletterAgent):
     #Agente 2: Extrai entidades nomeadas das notícias
 
+    VERSION = '1.2'
+
     def __init__(self):
         super().__init__("AGENT_2", "Extrator de Entidades",
                          "Extrai entidades como empresas, pessoas, localidades e valores")
@@ -30,54 +34,88 @@ class Agent2_EntityExtractor(EconomicNewsletterAgent):
             'china', 'europa', 'ásia', 'eua', 'oriente médio', 'irã', 'argentina'
         ]
 
+        keyword_matcher.registrar('agent2_companies', {name: [name] for name in self.known_companies})
+        keyword_matcher.registrar('agent2_people', {name: [name] for name in self.known_people})
+        keyword_matcher.registrar('agent2_locations', {name: [name] for name in self.known_locations})
+
+    def configuracao(self):
+        return [self.known_companies, self.known_people, self.known_locations]
+
+    def entidades_da_noticia(self, item):
+        # Entidades encontradas numa única notícia
+        doc = item.doc
+
+        # Extrair empresas, pessoas e localizações das ocorrências já calculadas no documento
+        occurrences = doc.ocorrencias()
+        found = {entity_type: sorted(keyword_matcher.agrupar(occurrences, f'agent2_{entity_type}'))
+                 for entity_type in ('companies', 'people', 'locations')}
+
+        # Valores, datas, percentuais e tickers numa única varredura do texto original (tickers dependem da caixa)
+        # 'structured' guarda os valores normalizados, que agregar_entidades transforma em arrays tipados
+        trechos, found['structured'] = value_extractor.extrair(f"{item.title} {item.content}",
+                                                               value_extractor.referencia(item.timestamp))
+        found.update(trechos)
+        # Menções por entidade, para o índice de entidades do banco (NewsStore.indexar_mencoes)
+        found['mentions'] = self._contar_mencoes(occurrences, trechos['tickers'])
+
+        return found
+
+    def mencoes_da_noticia(self, item):
+        # Quantas vezes cada entidade aparece numa notícia, {tipo: {nome: menções}}, sem as demais entidades
+        # Usado na indexação offline do histórico (python NewsStore.py --indexar-entidades)
+        trechos, _ = value_extractor.extrair(f"{item.title} {item.content}")
+        return self._contar_mencoes(item.doc.ocorrencias(), trechos['tickers'])
+
+    @staticmethod
+    def _contar_mencoes(occurrences, tickers):
+        mentions = {entity_type: dict(keyword_matcher.contar(occurrences, f'agent2_{entity_type}'))
+                    for entity_type in ('companies', 'people', 'locations')}
+        mentions['tickers'] = dict(Counter(tickers))
+        return mentions
+
+    @instrumentado(items_in=lambda themes: sum(len(ids) for ids in themes['main_themes'].values()),
+                   items_out=lambda result: sum(result['entity_count'].values()))
     def extract_entities(self, summarized_themes: Dict[str, Any]) -> Dict[str, Any]:
         #Extrai entidades relevantes das notícias
         self.log_activity("Iniciando extração de entidades...")
 
+        items = summarized_themes['items']
+        news_list = [items[news_id] for news_ids in summarized_themes['main_themes'].values() for news_id in news_ids]
+
+        # Processar cada notícia para extrair entidades (notícias já vistas vêm do cache)
+        return self.agregar_entidades(self.memorizar_por_noticia(news_list, self.entidades_da_noticia), news_list)
+
+    def agregar_entidades(self, resultados, items=None):
+        # Junta as entidades de cada notícia (no formato de entidades_da_noticia) no resultado do agente
+        # Com as notícias (items, na mesma ordem), 'mentions' traz as menções de cada uma pela URL
         entities = {
             'companies': set(),
             'people': set(),
             'locations': set(),
             'values': [],
-            'dates': []
+            'dates': [],
+            'percentages': [],
+            'tickers': set()
         }
 
-        # Processar cada notícia para extrair entidades
-        for theme, news_list in summarized_themes['main_themes'].items():
-            for news in news_list:
-                text = (news.get('title', '') + ' ' + news.get('content', '')).lower()
-
-                # Extrair empresas
-                for company in self.known_companies:
-                    if company in text:
-                        entities['companies'].add(company.title())
-
-                # Extrair pessoas
-                for person in self.known_people:
-                    if person in text:
-                        entities['people'].add(person.title())
-
-                # Extrair localizações
-                for location in self.known_locations:
-                    if location in text:
-                        entities['locations'].add(location.title())
-
-                # Extrair valores monetários
-                money_pattern = r'r\$\s*[\d.,]+(?:\s*(?:milhões?|bilhões?|trilhões?))?'
-                values = re.findall(money_pattern, text)
-                entities['values'].extend(values)
-
-                # Extrair datas
-                date_pattern = r'\d{1,2}\s+de\s+(?:janeiro|fevereiro|março|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)\s+de\s+\d{4}'
-                dates = re.findall(date_pattern, text)
-                entities['dates'].extend(dates)
+        for found in resultados:
+            for entity_type in ('companies', 'people', 'locations'):
+                entities[entity_type].update(name.title() for name in found[entity_type])
+            entities['values'].extend(found['values'])
+            entities['dates'].extend(found['dates'])
+            entities['percentages'].extend(found['percentages'])
+            entities['tickers'].update(found['tickers'])
 
         # Converter sets para listas para serialização
         entities['companies'] = list(entities['companies'])
         entities['people'] = list(entities['people'])
         entities['locations'] = list(entities['locations'])
+        entities['tickers'] = sorted(entities['tickers'])
 
-        self.processed_count += len([item for sublist in summarized_themes['main_themes'].values() for item in sublist])
+        # Valores normalizados de todas as notícias em arrays NumPy (a coluna 'noticia' é a posição em resultados)
+        structured_values = value_extractor.tabela([found['structured'] for found in resultados])
+
+        self.processed_count += len(resultados)
 
         # Estatísticas das entidades extraídas
         result = {
@@ -88,14 +126,20 @@ class Agent2_EntityExtractor(EconomicNewsletterAgent):
                 'people': len(entities['people']),
                 'locations': len(entities['locations']),
                 'values': len(entities['values']),
-                'dates': len(entities['dates'])
+                'dates': len(entities['dates']),
+                'percentages': len(entities['percentages']),
+                'tickers': len(entities['tickers'])
             },
             'top_entities': {
                 'companies': entities['companies'][:5],
                 'people': entities['people'][:5],
                 'locations': entities['locations'][:5]
-            }
+            },
+            'structured_values': structured_values,
+            'value_stats': value_extractor.estatisticas(structured_values)
         }
+        if items is not None:
+            result['mentions'] = {item.url: found['mentions'] for item, found in zip(items, resultados) if item.url}
 
         self.log_activity(f"Extraídas {sum(result['entity_count'].values())} entidades")
         return result
\ No newline at end of file
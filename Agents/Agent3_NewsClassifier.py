@@ -1,12 +1,17 @@
 ﻿from datetime import datetime
 from typing import Dict, Any, List
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
+from HashingClassifier import HashingClassifier
+from KeywordMatcher import keyword_matcher
 
 
 class Agent3_NewsClassifier(EconomicNewsletterAgent):
     # Agente 3: Classifica notícias por temas específicos
 
+    # Níveis de prioridade, do menor para o maior
+    PRIORITY_LEVELS = ('baixa', 'média', 'alta')
+
     def __init__(self):
         super().__init__("AGENT_3", "Classificador de Notícias",
                          "Classifica notícias em categorias específicas do momento econômico")
@@ -40,15 +45,95 @@ class Agent3_NewsClassifier(EconomicNewsletterAgent):
                 'priority': 'baixa'
             }
         }
+        keyword_matcher.registrar('agent3_categorias',
+                                  {category: config['keywords'] for category, config in self.current_categories.items()})
+
+        # Detector de tendências (TrendTracker), configurado pelo sistema; ajusta as prioridades ao ciclo de notícias
+        self.trends = None
+        # Classificador aprendido (HashingClassifier), configurado pelo sistema quando há um modelo treinado; suas
+        # categorias são as de current_categories e outras sem palavras-chave, com a prioridade configurada no banco
+        # Substitui as palavras-chave na pontuação das notícias
+        self.model = None
+
+    def configuracao(self):
+        return self.current_categories
+
+    def carregar_modelo(self, db_path='news.db'):
+        # Passa a pontuar com o modelo treinado offline (python HashingClassifier.py) salvo no banco, se houver um
+        # cujas categorias tenham todas uma prioridade (aqui ou no banco); sem ele valem as palavras-chave
+        try:
+            self.model = HashingClassifier.carregar(db_path, categorias=self.current_categories)
+        except ValueError as e:
+            self.log_activity(f"Modelo de categorias ignorado: {e}")
+            self.model = None
+        return self.model
+
+    def categorias_ativas(self):
+        # Categorias pontuadas: as do modelo, quando há um, ou as configuradas por palavras-chave
+        # Categorias do modelo sem palavras-chave usam a prioridade gravada com a configuração do treino
+        if self.model is None:
+            return self.current_categories
+        return {category: self.current_categories.get(category)
+                or {'keywords': [], 'priority': self.model.prioridades[category]}
+                for category in self.model.categorias}
+
+    def assinatura_pontuacao(self):
+        # Identifica a escala das pontuações: percentuais de um modelo (pela versão dos pesos) ou contagens de
+        # palavras-chave (pela configuração); pontuações de assinaturas diferentes não podem ser somadas
+        if self.model is not None:
+            return f"modelo:{self.model.versao}"
+        return f"palavras-chave:{self._prefixo_cache()}"
+
+    def categorias_vigentes(self, limiar=2.0):
+        # Categorias com a prioridade ajustada ao ciclo de notícias: um nível acima quando a categoria está em alta
+        # (surto >= limiar) e um abaixo quando está esfriando (surto <= 1 / limiar); sem detector, as configuradas
+        active = self.categorias_ativas()
+        if self.trends is None:
+            return active
+        surtos = self.trends.surtos('categorias', list(active))
+        categories = {}
+        for category, config in active.items():
+            level = self.PRIORITY_LEVELS.index(config['priority'])
+            if surtos[category] >= limiar:
+                level = min(level + 1, len(self.PRIORITY_LEVELS) - 1)
+            elif surtos[category] <= 1 / limiar:
+                level = max(level - 1, 0)
+            categories[category] = {**config, 'priority': self.PRIORITY_LEVELS[level]}
+        return categories
+
+    def pontuar_noticia(self, item):
+        # Quantas palavras-chave de cada categoria aparecem na notícia (só categorias com correspondência)
+        matches = keyword_matcher.agrupar(item.doc.ocorrencias(), 'agent3_categorias')
+        return {category: matches[category] for category in self.current_categories if matches[category] > 0}
 
+    def pontuar_lote(self, items, registrar=True):
+        # Pontuação de várias notícias: o modelo aprendido prediz o lote inteiro de uma vez; sem modelo, as
+        # palavras-chave de cada notícia (com as já vistas vindas do cache)
+        if self.model is not None:
+            return self.model.pontuar(items)
+        return self.memorizar_por_noticia(items, self.pontuar_noticia, registrar=registrar)
+
+    @instrumentado(items_in=lambda themes: sum(len(ids) for ids in themes['main_themes'].values()),
+                   items_out=lambda result: sum(result['category_distribution'].values()))
     def classify_news(self, themes_and_entities: Dict[str, Any]) -> Dict[str, Any]:
         # Classifica notícias em categorias específicas
         self.log_activity("Iniciando classificação de notícias...")
 
+        themes = themes_and_entities.get('main_themes', {})
+        items = themes_and_entities.get('items', {})
+
+        pairs = [(theme_name, news_id) for theme_name, news_ids in themes.items() for news_id in news_ids]
+
+        # Verificar correspondência com cada categoria (notícias já vistas vêm do cache)
+        scores = self.pontuar_lote([items[news_id] for _, news_id in pairs])
+        return self.agregar_classificacao(pairs, scores, items)
+
+    def agregar_classificacao(self, pairs, scores, items):
+        # Monta a classificação a partir de pares (tema, news_id) e da pontuação de cada notícia
         classified_news = {}
 
         # Inicializar estrutura de categorias
-        for category, config in self.current_categories.items():
+        for category, config in self.categorias_vigentes().items():
             classified_news[category] = {
                 'news': [],
                 'priority': config['priority'],
@@ -56,21 +141,13 @@ class Agent3_NewsClassifier(EconomicNewsletterAgent):
             }
 
         # Classificar notícias por categorias
-        themes = themes_and_entities.get('main_themes', {})
-
-        for theme_name, news_list in themes.items():
-            for news in news_list:
-                text = (news.get('title', '') + ' ' + news.get('content', '')).lower()
-
-                # Verificar correspondência com cada categoria
-                for category, config in self.current_categories.items():
-                    keyword_matches = sum(1 for keyword in config['keywords'] if keyword in text)
-                    if keyword_matches > 0:
-                        classified_news[category]['news'].append({
-                            'news': news,
-                            'relevance_score': keyword_matches,
-                            'original_theme': theme_name
-                        })
+        for (theme_name, news_id), matches in zip(pairs, scores):
+            for category, keyword_matches in matches.items():
+                classified_news[category]['news'].append({
+                    'news_id': news_id,
+                    'relevance_score': keyword_matches,
+                    'original_theme': theme_name
+                })
 
         # Calcular scores de relevância total por categoria
         for category in classified_news:
@@ -83,6 +160,7 @@ class Agent3_NewsClassifier(EconomicNewsletterAgent):
         result = {
             'timestamp': datetime.now().isoformat(),
             'classified_categories': classified_news,
+            'items': items,
             'category_distribution': {cat: len(data['news']) for cat, data in classified_news.items()},
             'high_priority_count': sum(len(data['news']) for cat, data in classified_news.items()
                                        if data['priority'] == 'alta'),
@@ -90,5 +168,5 @@ class Agent3_NewsClassifier(EconomicNewsletterAgent):
                                       if len(data['news']) > 0], key=lambda x: x[1], reverse=True)[:3]
         }
 
-        self.log_activity(f"Classificadas notícias em {len(self.current_categories)} categorias")
+        self.log_activity(f"Classificadas notícias em {len(classified_news)} categorias")
         return result
\ No newline at end of file
@@ -1,7 +1,8 @@
-﻿from datetime import datetime
+﻿import time
+from datetime import datetime
 from typing import Dict, Any
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
 
 class Agent4_ResponseStandardizer(EconomicNewsletterAgent):
     # Agente 4: Padroniza as respostas e formato de saída
@@ -10,9 +11,17 @@ class Agent4_ResponseStandardizer(EconomicNewsletterAgent):
         super().__init__("AGENT_4", "Padronizador de Respostas",
                          "Padroniza formato e estrutura das respostas dos agentes anteriores")
 
+    @instrumentado(items_in=lambda classified: sum(len(cat['news'])
+                                                   for cat in classified['classified_categories'].values()),
+                   items_out=lambda result: sum(len(cat['news_items']) for cat in result['content'].values()))
     def standardize_output(self, classified_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Padroniza a saída em formato consistente (reaproveitado do cache quando a entrada não mudou)
+        return self.memorizar_etapa(classified_data, lambda: self._standardize_output(classified_data))
+
+    def _standardize_output(self, classified_data: Dict[str, Any]) -> Dict[str, Any]:
         # Padroniza a saída em formato consistente
         self.log_activity("Iniciando padronização de respostas...")
+        started = time.perf_counter()
 
         standardized = {
             'metadata': {
@@ -22,7 +31,8 @@ class Agent4_ResponseStandardizer(EconomicNewsletterAgent):
                 'total_categories': len(classified_data.get('classified_categories', {}))
             },
             'content': {},
-            'statistics': {}
+            'statistics': {},
+            'items': classified_data.get('items', {})
         }
 
         # Padronizar conteúdo por categoria
@@ -31,7 +41,8 @@ class Agent4_ResponseStandardizer(EconomicNewsletterAgent):
                 'category_name': category.replace('_', ' ').title(),
                 'priority_level': data.get('priority', 'média'),
                 'relevance_score': data.get('relevance_score', 0),
-                'news_count': len(data.get('news', [])),
+                # Os agregados do modo incremental trazem só as notícias do topo, com a contagem total à parte
+                'news_count': data.get('news_count', len(data.get('news', []))),
                 'news_items': []
             }
 
@@ -39,17 +50,12 @@ class Agent4_ResponseStandardizer(EconomicNewsletterAgent):
             sorted_news = sorted(data.get('news', []),
                                  key=lambda x: x.get('relevance_score', 0), reverse=True)
 
-            # Padronizar cada notícia
+            # Padronizar cada notícia (apenas a referência ao item; o texto fica no catálogo)
             for item in sorted_news[:5]:
-                news = item.get('news', {})
                 standardized_news = {
-                    'title': news.get('title', 'Título não disponível'),
-                    'summary': news.get('content', '')[:200] + '...' if len(
-                        news.get('content', '')) > 200 else news.get('content', ''),
+                    'news_id': item['news_id'],
                     'relevance_score': item.get('relevance_score', 0),
-                    'source_theme': item.get('original_theme', 'outros'),
-                    'url': news.get('url', '#'),
-                    'timestamp': news.get('timestamp', datetime.now().isoformat())
+                    'source_theme': item.get('original_theme', 'outros')
                 }
                 standardized['content'][category]['news_items'].append(standardized_news)
 
@@ -60,8 +66,7 @@ class Agent4_ResponseStandardizer(EconomicNewsletterAgent):
                                              if cat['priority_level'] == 'alta']),
             'top_category': max(standardized['content'].items(),
                                 key=lambda x: x[1]['relevance_score'])[0] if standardized['content'] else None,
-            'processing_time_ms': (datetime.now() - datetime.fromisoformat(
-                standardized['metadata']['timestamp'])).total_seconds() * 1000
+            'processing_time_ms': (time.perf_counter() - started) * 1000
         }
 
         self.processed_count += standardized['statistics']['total_news_processed']
@@ -1,17 +1,33 @@
 ﻿from datetime import datetime
 from typing import Any, Dict
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
+from Summarizer import summarizer
 
 class Agent5_TopicSummarizer(EconomicNewsletterAgent):
     # Agente 5: Resume informações em tópicos concisos
 
+    # 1.1: resumos extrativos (TF-IDF) no lugar dos cortes fixos do conteúdo
+    # 1.2: um tópico por história (cluster) em vez de um por categoria
+    VERSION = '1.2'
+
     def __init__(self):
         super().__init__("AGENT_5", "Resumidor em Tópicos",
                          "Cria resumos em tópicos únicos por tema para o newsletter")
 
-    def create_topic_summaries(self, standardized_data: Dict[str, Any]) -> Dict[str, Any]:
-        # Cria resumos em tópicos únicos por tema
+    @instrumentado(items_in=lambda standardized: sum(len(cat['news_items'])
+                                                     for cat in standardized['content'].values()),
+                   items_out=lambda result: result['topic_statistics']['total_topics'])
+    def create_topic_summaries(self, standardized_data: Dict[str, Any],
+                               clusters_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Cria um tópico por história (reaproveitado do cache quando a entrada não mudou)
+        # clusters_data vem de TopicClusterer.grupos; sem ele, cada notícia é uma história
+        entrada = {'standardized': standardized_data, 'clusters': clusters_data}
+        return self.memorizar_etapa(entrada, lambda: self._create_topic_summaries(standardized_data, clusters_data))
+
+    def _create_topic_summaries(self, standardized_data: Dict[str, Any],
+                                clusters_data: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Cria um tópico por história, na seção da categoria em que ela é mais relevante
         self.log_activity("Iniciando criação de tópicos resumidos...")
 
         # Seções para o newsletter
@@ -24,6 +40,9 @@ class Agent5_TopicSummarizer(EconomicNewsletterAgent):
         }
 
         content = standardized_data.get('content', {})
+        items = standardized_data.get('items', {})
+        assignments = (clusters_data or {}).get('assignments', {})
+        clusters = (clusters_data or {}).get('clusters', {})
 
         # Mapear categorias para tópicos do newsletter
         category_mapping = {
@@ -35,40 +54,71 @@ class Agent5_TopicSummarizer(EconomicNewsletterAgent):
             'empresas_resultados': 'mercado_hoje'
         }
 
-        # Processar cada categoria
+        # Agrupar as notícias de todas as categorias por história; notícias sem cluster formam uma história só
+        stories = {}
         for category, data in content.items():
-            target_topic = category_mapping.get(category, 'principais_destaques')
-
-            if data['news_count'] > 0:
-                # Criar tópico único resumindo a categoria
-                topic_summary = {
-                    'topic_title': f"{data['category_name']} - {data['news_count']} notícias",
-                    'priority': data['priority_level'],
-                    'main_points': [],
-                    'key_developments': [],
-                    'impact_level': self._calculate_impact_level(data['relevance_score'])
+            if data['news_count'] == 0:
+                continue
+            for news_item in data['news_items']:
+                story = stories.setdefault(assignments.get(news_item['news_id'], news_item['news_id']),
+                                           {'news': {}, 'categories': {}})
+                story['categories'][category] = story['categories'].get(category, 0) + news_item['relevance_score']
+                known = story['news'].get(news_item['news_id'])
+                if known is None or news_item['relevance_score'] > known['relevance_score']:
+                    story['news'][news_item['news_id']] = news_item
+
+        # Histórias mais relevantes primeiro; cada uma com suas notícias da mais para a menos relevante
+        ranked_stories = []
+        for story_id, story in stories.items():
+            news_items = sorted(story['news'].values(), key=lambda x: x['relevance_score'], reverse=True)
+            ranked_stories.append((story_id, story, news_items, sum(x['relevance_score'] for x in news_items)))
+        ranked_stories.sort(key=lambda x: x[3], reverse=True)
+
+        # Resumos extrativos de todas as notícias usadas, calculados em um único lote
+        briefs = summarizer.resumir([items[x['news_id']] for _, _, news_items, _ in ranked_stories
+                                     for x in news_items[:3]], num_sentencas=1, cache=self.cache)
+        summaries = summarizer.resumir([items[news_items[0]['news_id']] for _, _, news_items, _ in ranked_stories],
+                                       num_sentencas=2, cache=self.cache)
+
+        # Processar cada história
+        for story_id, story, news_items, relevance in ranked_stories:
+            # Categoria dominante: a de maior relevância somada entre as notícias da história
+            category = max(story['categories'], key=story['categories'].get)
+            data = content[category]
+            top_news = items[news_items[0]['news_id']]
+            news_count = clusters[story_id]['news_count'] if story_id in clusters else len(news_items)
+
+            # Criar tópico da história, com a manchete da notícia mais relevante
+            topic_summary = {
+                'topic_title': f"{top_news.title or data['category_name']} - {news_count} notícias",
+                'category': category,
+                'priority': data['priority_level'],
+                'main_points': [],
+                'key_developments': [],
+                'impact_level': self._calculate_impact_level(relevance)
+            }
+
+            # Extrair pontos principais (top 3 notícias da história)
+            for news_item in news_items[:3]:
+                news = items[news_item['news_id']]
+                point = {
+                    'news_id': news.id,
+                    'headline': news.title or 'Título não disponível',
+                    'brief': briefs[news.id],
+                    'relevance': news_item['relevance_score'],
+                    'url': news.url
                 }
+                topic_summary['main_points'].append(point)
+
+            # Identificar desenvolvimento principal
+            topic_summary['key_developments'].append({
+                'news_id': top_news.id,
+                'headline': top_news.title or 'Título não disponível',
+                'importance': 'alta' if data['priority_level'] == 'alta' else 'média',
+                'summary': summaries[top_news.id]
+            })
 
-                # Extrair pontos principais (top 3 notícias)
-                for news_item in data['news_items'][:3]:
-                    point = {
-                        'headline': news_item['title'],
-                        'brief': news_item['summary'][:100] + '...',
-                        'relevance': news_item['relevance_score'],
-                        'url': news_item['url']
-                    }
-                    topic_summary['main_points'].append(point)
-
-                # Identificar desenvolvimento principal
-                if data['news_items']:
-                    top_news = data['news_items'][0]
-                    topic_summary['key_developments'].append({
-                        'headline': top_news['title'],
-                        'importance': 'alta' if data['priority_level'] == 'alta' else 'média',
-                        'summary': top_news['summary']
-                    })
-
-                topics[target_topic].append(topic_summary)
+            topics[category_mapping.get(category, 'principais_destaques')].append(topic_summary)
 
         # Estatísticas dos tópicos
         topic_stats = {
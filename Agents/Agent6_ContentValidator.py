@@ -1,6 +1,6 @@
 ﻿from typing import Any, Dict, List
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
 
 class Agent6_ContentValidator(EconomicNewsletterAgent):
     # Agente 6: Valida se os resumos são adequados para leitores
@@ -9,7 +9,13 @@ class Agent6_ContentValidator(EconomicNewsletterAgent):
         super().__init__("AGENT_6", "Validador de Conteúdo",
                          "Valida qualidade e adequação do conteúdo para leitores")
 
+    @instrumentado(items_in=lambda summaries: sum(len(topics) for topics in summaries['newsletter_topics'].values()),
+                   items_out=lambda result: sum(len(topics) for topics in result['approved_topics'].values()))
     def validate_content(self, topic_summaries: Dict[str, Any]) -> Dict[str, Any]:
+        # Valida se o conteúdo está adequado para publicação (reaproveitado do cache quando a entrada não mudou)
+        return self.memorizar_etapa(topic_summaries, lambda: self._validate_content(topic_summaries))
+
+    def _validate_content(self, topic_summaries: Dict[str, Any]) -> Dict[str, Any]:
         # Valida se o conteúdo está adequado para publicação
         self.log_activity("Iniciando validação de conteúdo...")
 
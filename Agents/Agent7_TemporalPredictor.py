@@ -1,25 +1,188 @@
-﻿from datetime import datetime, timedelta
+﻿import sqlite3
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
 import numpy as np
 
-from EconomicNewsletterAgent import EconomicNewsletterAgent
+from EconomicNewsletterAgent import EconomicNewsletterAgent, instrumentado
+from NewsStore import NewsStore
+from TimeSeries import soma_movel, soma_exponencial, razao, ajustar_tendencia, prever, probabilidade_acima
 
 class Agent7_TemporalPredictor(EconomicNewsletterAgent):
     # Agente 7: Faz predições econômicas para as próximas semanas
+    # As predições saem de séries diárias do banco de notícias: volume, sentimento médio e notícias que
+    # citam cada indicador, setor ou risco (contadas pelo índice FTS5). Médias exponenciais dão o nível
+    # atual e uma tendência linear ponderada dá a previsão para o horizonte, com intervalo de 90%
 
-    def __init__(self):
+    # 2.0: predições calculadas a partir das séries do banco, em vez de valores fixos
+    VERSION = '2.0'
+
+    # Indicadores: palavras buscadas, categorias do Agente 3 relacionadas e fatores usados sem tópicos aprovados
+    INDICADORES = {
+        'inflacao': {
+            'termos': ['inflação', 'ipca', 'igpm', 'igp-m', 'preços', 'custo de vida'],
+            'categorias': ['inflacao_juros', 'commodities'],
+            'fatores': ['tensão geopolítica', 'commodities']
+        },
+        'juros': {
+            'termos': ['juros', 'selic', 'copom', 'taxa básica'],
+            'categorias': ['inflacao_juros', 'politica_fiscal'],
+            'fatores': ['política fiscal', 'inflação']
+        },
+        'cambio': {
+            'termos': ['dólar', 'câmbio', 'cambial', 'real frente'],
+            'categorias': ['tensao_geopolitica', 'commodities'],
+            'fatores': ['conflito internacional', 'commodities']
+        },
+        'bolsa': {
+            'termos': ['ibovespa', 'bolsa', 'b3', 'ações'],
+            'categorias': ['mercado_capitais', 'empresas_resultados'],
+            'fatores': ['cenário internacional', 'resultados corporativos']
+        }
+    }
+
+    # Setores: o panorama vem do sentimento das notícias que citam o setor
+    SETORES = {
+        'petroleo_gas': {
+            'termos': ['petróleo', 'petrobras', 'gás natural', 'barril', 'opep'],
+            'categorias': ['tensao_geopolitica', 'commodities'],
+            'fatores': ['conflito Oriente Médio', 'demanda global']
+        },
+        'bancos': {
+            'termos': ['bancos', 'bancário', 'itaú', 'bradesco', 'crédito', 'spread', 'inadimplência'],
+            'categorias': ['inflacao_juros', 'mercado_capitais'],
+            'fatores': ['spreads bancários', 'inadimplência']
+        },
+        'commodities': {
+            'termos': ['commodities', 'commodity', 'minério', 'soja', 'ouro', 'café', 'agrícola'],
+            'categorias': ['commodities'],
+            'fatores': ['geopolítica', 'demanda China']
+        }
+    }
+
+    # Riscos: a probabilidade é a de a cobertura do tema ficar acima do normal no horizonte
+    RISCOS = {
+        'geopoliticos': {
+            'termos': ['guerra', 'conflito', 'irã', 'israel', 'ormuz', 'oriente médio', 'ataque'],
+            'description': 'Escalada do conflito no Oriente Médio',
+            'impact_level': 'alto',
+            'affected_sectors': ['energia', 'transportes', 'seguros']
+        },
+        'fiscais': {
+            'termos': ['fiscal', 'orçamento', 'déficit', 'arcabouço', 'gastos públicos', 'dívida pública'],
+            'description': 'Pressão sobre meta fiscal brasileira',
+            'impact_level': 'médio',
+            'affected_sectors': ['governo', 'bancos', 'construção']
+        },
+        'monetarios': {
+            'termos': ['fed', 'federal reserve', 'powell', 'treasuries'],
+            'description': 'Mudança na política do Fed americano',
+            'impact_level': 'alto',
+            'affected_sectors': ['financeiro', 'imobiliário', 'consumo']
+        }
+    }
+
+    def __init__(self, db_path='news.db', janela_historico=365, janela_tendencia=28, horizonte_dias=21,
+                 meia_vida=7):
         super().__init__("AGENT_7", "Preditor Temporal",
                          "Analisa tendências e faz predições econômicas para próximas semanas")
+        self.db_path = db_path
+        self.janela_historico = janela_historico
+        self.janela_tendencia = janela_tendencia
+        self.horizonte_dias = horizonte_dias
+        self.meia_vida = meia_vida
+        # Conexão de consulta, aberta no primeiro uso (o scraper cria a tabela noticias)
+        self.store = None
+
+    def configuracao(self):
+        return {
+            'indicadores': self.INDICADORES, 'setores': self.SETORES, 'riscos': self.RISCOS,
+            'janelas': [self.janela_historico, self.janela_tendencia, self.horizonte_dias, self.meia_vida]
+        }
 
+    @instrumentado(items_in=lambda validated: sum(len(topics) for topics in validated['approved_topics'].values()),
+                   items_out=lambda result: len(result['predictions']['economic_indicators'])
+                   + len(result['predictions']['sector_predictions']))
     def generate_predictions(self, validated_content: Dict[str, Any]) -> Dict[str, Any]:
-        # Gera predições baseadas no conteúdo validado
+        # Gera predições baseadas no conteúdo validado (reaproveitado do cache quando a entrada não mudou)
+        # O estado do banco entra na chave, já que as séries vêm dele
+        entrada = {'validated': validated_content, 'banco': self._estado_banco()}
+        return self.memorizar_etapa(entrada, lambda: self._generate_predictions(validated_content))
+
+    def _abrir_store(self):
+        if self.store is None:
+            try:
+                self.store = NewsStore(self.db_path)
+            except sqlite3.Error as e:
+                self.log_activity(f"Banco de notícias indisponível para as séries: {str(e)}")
+        return self.store
+
+    def _estado_banco(self):
+        # Quantidade de notícias e maior id: mudam sempre que o banco recebe notícias
+        store = self._abrir_store()
+        return store.conn.execute("SELECT COUNT(*), MAX(id) FROM noticias").fetchone() if store else None
+
+    def _series(self, grupos):
+        # Séries diárias do histórico: volume total e, por grupo, notícias que o citam e seus sentimentos
+        # Retorna (volume, citacoes, soma_sentimento, com_sentimento), com um grupo por linha
+        fim = (datetime.now(timezone.utc).date() + timedelta(days=1)).isoformat()
+        inicio = (datetime.now(timezone.utc).date() - timedelta(days=self.janela_historico - 1)).isoformat()
+        store = self._abrir_store()
+        if store is None:
+            vazio = np.zeros((len(grupos), self.janela_historico))
+            return np.zeros(self.janela_historico), vazio, vazio, vazio
+
+        volume = store.contagens_diarias(inicio, fim)['noticias']
+        contagens = [store.contagens_diarias(inicio, fim, config['termos']) for config in grupos.values()]
+        return (volume,
+                np.array([contagem['noticias'] for contagem in contagens]),
+                np.array([contagem['soma_sentimento'] for contagem in contagens]),
+                np.array([contagem['com_sentimento'] for contagem in contagens]))
+
+    def _modelar(self, citacoes, volume, soma_sentimento, com_sentimento):
+        # Ajusta, para todos os grupos de uma vez, a cobertura (fração das notícias do dia que citam o grupo)
+        # e o sentimento médio das notícias do grupo: nível exponencial, tendência e previsão com intervalo
+        janela = self.janela_tendencia
+        volume = np.broadcast_to(volume, citacoes.shape)
+
+        cobertura_diaria = razao(citacoes, volume)
+        tendencia = ajustar_tendencia(cobertura_diaria[:, -janela:], volume[:, -janela:])
+        prevista, inferior, superior = prever(tendencia, self.horizonte_dias)
+
+        sentimento_diario = razao(soma_sentimento, com_sentimento)
+        tendencia_sentimento = ajustar_tendencia(sentimento_diario[:, -janela:], com_sentimento[:, -janela:])
+        sentimento_previsto, sentimento_inferior, sentimento_superior = prever(tendencia_sentimento,
+                                                                               self.horizonte_dias)
+
+        # Referência de longo prazo: cobertura média do histórico e desvio da cobertura semanal
+        semanal = razao(soma_movel(citacoes, 7), soma_movel(volume, 7))
+        return {
+            'atual': razao(soma_exponencial(citacoes, self.meia_vida), soma_exponencial(volume, self.meia_vida))[:, -1],
+            'media': razao(citacoes.sum(axis=1), volume.sum(axis=1)),
+            'desvio_semanal': np.nanstd(np.where(volume > 0, semanal, np.nan), axis=1),
+            'inclinacao': tendencia['inclinacao'],
+            'sigma': tendencia['sigma'],
+            'prevista': np.clip(prevista, 0, 1),
+            'inferior': np.clip(inferior, 0, 1),
+            'superior': np.clip(superior, 0, 1),
+            'cobertura_janela': (volume[:, -janela:] > 0).mean(axis=1),
+            'citacoes_janela': citacoes[:, -janela:].sum(axis=1),
+            'sentimento_atual': razao(soma_exponencial(soma_sentimento, self.meia_vida),
+                                      soma_exponencial(com_sentimento, self.meia_vida))[:, -1],
+            'sentimento_previsto': np.clip(sentimento_previsto, -1, 1),
+            'sentimento_inferior': np.clip(sentimento_inferior, -1, 1),
+            'sentimento_superior': np.clip(sentimento_superior, -1, 1),
+            'dias_com_sentimento': (com_sentimento[:, -janela:] > 0).mean(axis=1)
+        }
+
+    def _generate_predictions(self, validated_content: Dict[str, Any]) -> Dict[str, Any]:
+        # Gera predições baseadas no conteúdo validado e nas séries do banco
         self.log_activity("Iniciando análise preditiva temporal...")
 
         predictions = {
             'analysis_period': {
                 'start_date': datetime.now().strftime('%Y-%m-%d'),
                 'prediction_horizon': '3_weeks',
-                'end_date': (datetime.now() + timedelta(weeks=3)).strftime('%Y-%m-%d')
+                'end_date': (datetime.now() + timedelta(days=self.horizonte_dias)).strftime('%Y-%m-%d')
             },
             'economic_indicators': {},
             'sector_predictions': {},
@@ -27,80 +190,62 @@ class Agent7_TemporalPredictor(EconomicNewsletterAgent):
             'confidence_levels': {}
         }
 
-        # Analisar tópicos aprovados para extrair sinais
+        # Tópicos aprovados por categoria: explicam os movimentos (fatores) de cada indicador e setor
         approved_topics = validated_content.get('approved_topics', {})
+        headlines = {}
+        for topics in approved_topics.values():
+            for topic in topics:
+                headlines.setdefault(topic.get('category'), []).append(topic['topic_title'].rsplit(' - ', 1)[0])
 
-        # Predições por indicador econômico (simulado - substituir por algoritmo real)
-        predictions['economic_indicators'] = {
-            'inflacao': {
-                'current_trend': 'estabilidade',
-                'prediction_3weeks': 'leve_alta',
-                'factors': ['tensão geopolítica', 'commodities'],
-                'confidence': 0.72
-            },
-            'juros': {
-                'current_trend': 'alta',
-                'prediction_3weeks': 'manutencao',
-                'factors': ['política fiscal', 'inflação'],
-                'confidence': 0.68
-            },
-            'cambio': {
-                'current_trend': 'volatilidade_alta',
-                'prediction_3weeks': 'fortalecimento_real',
-                'factors': ['conflito internacional', 'commodities'],
-                'confidence': 0.55
-            },
-            'bolsa': {
-                'current_trend': 'cautela',
-                'prediction_3weeks': 'recuperacao_moderada',
-                'factors': ['cenário internacional', 'resultados corporativos'],
-                'confidence': 0.61
+        # Todas as séries (indicadores, setores e riscos) são calculadas e modeladas juntas
+        grupos = {**{('indicador', nome): config for nome, config in self.INDICADORES.items()},
+                  **{('setor', nome): config for nome, config in self.SETORES.items()},
+                  **{('risco', nome): config for nome, config in self.RISCOS.items()}}
+        volume, citacoes, soma_sentimento, com_sentimento = self._series(grupos)
+        modelo = self._modelar(citacoes, volume, soma_sentimento, com_sentimento)
+        linha = {grupo: i for i, grupo in enumerate(grupos)}
+
+        # Predições por indicador econômico: cobertura do indicador no noticiário
+        for nome, config in self.INDICADORES.items():
+            i = linha[('indicador', nome)]
+            fatores = [headline for category in config['categorias'] for headline in headlines.get(category, [])]
+            predictions['economic_indicators'][nome] = {
+                'current_trend': self._tendencia(modelo, i),
+                'prediction_3weeks': self._direcao(modelo['atual'][i], modelo['prevista'][i]),
+                'factors': fatores[:3] or config['fatores'],
+                'confidence': self._confianca(modelo, i),
+                'news_share': self._numero(modelo['atual'][i]),
+                'forecast_share': self._numero(modelo['prevista'][i]),
+                'forecast_interval_90': [self._numero(modelo['inferior'][i]), self._numero(modelo['superior'][i])]
             }
-        }
 
-        # Predições setoriais
-        predictions['sector_predictions'] = {
-            'petroleo_gas': {
-                'outlook': 'positivo',
-                'key_drivers': ['conflito Oriente Médio', 'demanda global'],
-                'timeline': '2-3 semanas',
-                'confidence': 0.78
-            },
-            'bancos': {
-                'outlook': 'neutro',
-                'key_drivers': ['spreads bancários', 'inadimplência'],
-                'timeline': '3-4 semanas',
-                'confidence': 0.65
-            },
-            'commodities': {
-                'outlook': 'volatil_positivo',
-                'key_drivers': ['geopolítica', 'demanda China'],
-                'timeline': '1-3 semanas',
-                'confidence': 0.71
+        # Predições setoriais: sentimento das notícias do setor
+        for nome, config in self.SETORES.items():
+            i = linha[('setor', nome)]
+            fatores = [headline for category in config['categorias'] for headline in headlines.get(category, [])]
+            intervalo = modelo['sentimento_superior'][i] - modelo['sentimento_inferior'][i]
+            predictions['sector_predictions'][nome] = {
+                'outlook': self._panorama(modelo['sentimento_previsto'][i], intervalo),
+                'key_drivers': fatores[:3] or config['fatores'],
+                'timeline': f"{self.horizonte_dias // 7} semanas",
+                'confidence': self._confianca_sentimento(modelo, i),
+                'sentiment': self._numero(modelo['sentimento_atual'][i]),
+                'forecast_sentiment': self._numero(modelo['sentimento_previsto'][i]),
+                'forecast_interval_90': [self._numero(modelo['sentimento_inferior'][i]),
+                                         self._numero(modelo['sentimento_superior'][i])]
             }
-        }
 
-        # Fatores de risco identificados
-        predictions['risk_factors'] = {
-            'geopoliticos': {
-                'description': 'Escalada do conflito no Oriente Médio',
-                'probability': 0.45,
-                'impact_level': 'alto',
-                'affected_sectors': ['energia', 'transportes', 'seguros']
-            },
-            'fiscais': {
-                'description': 'Pressão sobre meta fiscal brasileira',
-                'probability': 0.67,
-                'impact_level': 'médio',
-                'affected_sectors': ['governo', 'bancos', 'construção']
-            },
-            'monetarios': {
-                'description': 'Mudança na política do Fed americano',
-                'probability': 0.38,
-                'impact_level': 'alto',
-                'affected_sectors': ['financeiro', 'imobiliário', 'consumo']
+        # Fatores de risco: probabilidade de a cobertura passar da média + 1 desvio no horizonte
+        for nome, config in self.RISCOS.items():
+            i = linha[('risco', nome)]
+            probabilidade = probabilidade_acima(modelo['prevista'][i], modelo['inferior'][i], modelo['superior'][i],
+                                                modelo['media'][i] + modelo['desvio_semanal'][i])
+            predictions['risk_factors'][nome] = {
+                'description': config['description'],
+                'probability': self._numero(probabilidade, padrao=0.0),
+                'impact_level': config['impact_level'],
+                'affected_sectors': config['affected_sectors']
             }
-        }
 
         # Calcular níveis de confiança gerais
         all_confidences = []
@@ -115,29 +260,27 @@ class Agent7_TemporalPredictor(EconomicNewsletterAgent):
             'uncertainty_level': 'moderada' if np.mean(all_confidences) >= 0.6 else 'alta'
         }
 
-        # Recomendações temporais
+        # Recomendações temporais: os indicadores e riscos cuja cobertura mais cresce
+        variacao = modelo['prevista'] - modelo['atual']
+        crescentes = sorted((grupo for grupo in grupos if grupo[0] != 'setor' and variacao[linha[grupo]] > 0),
+                            key=lambda grupo: variacao[linha[grupo]], reverse=True)
         predictions['temporal_recommendations'] = {
-            'short_term_1week': [
-                'Monitorar evolução do conflito no Oriente Médio',
-                'Acompanhar próximas decisões do Copom',
-                'Observar dados de inflação dos EUA'
-            ],
-            'medium_term_3weeks': [
-                'Avaliar impacto da geopolítica nos preços do petróleo',
-                'Monitorar sinais de mudança na política fiscal',
-                'Observar comportamento do dólar vs commodities'
-            ],
-            'key_dates': [
-                {'date': '2025-07-01', 'event': 'Possível reunião Copom', 'importance': 'alta'},
-                {'date': '2025-07-15', 'event': 'Dados de inflação IPCA', 'importance': 'média'},
-                {'date': '2025-07-07', 'event': 'Relatório Focus', 'importance': 'média'}
-            ]
+            'short_term_1week': [f"Monitorar {nome.replace('_', ' ')}: cobertura em alta"
+                                 for nome in self.INDICADORES
+                                 if predictions['economic_indicators'][nome]['current_trend'] == 'alta'][:3]
+                                or ['Acompanhar o noticiário econômico diário'],
+            'medium_term_3weeks': [f"Avaliar {nome.replace('_', ' ')}: cobertura prevista em alta"
+                                   for _, nome in crescentes][:3]
+                                  or ['Nenhum tema com cobertura prevista em alta'],
+            'key_dates': self._datas_chave(citacoes[linha[('indicador', 'juros')]])
         }
 
         result = {
             'timestamp': datetime.now().isoformat(),
             'predictions': predictions,
-            'methodology': 'Análise técnica + tendências + fatores geopolíticos',
+            'methodology': (f'Séries diárias do banco de notícias ({self.janela_historico} dias): média exponencial '
+                            f'(meia-vida de {self.meia_vida} dias) e tendência linear ponderada dos últimos '
+                            f'{self.janela_tendencia} dias, com intervalo de previsão de 90%'),
             'disclaimer': 'Predições baseadas em análise de tendências. Não constituem recomendação de investimento.'
         }
 
@@ -145,4 +288,87 @@ class Agent7_TemporalPredictor(EconomicNewsletterAgent):
         self.log_activity(
             f"Geradas predições para {len(predictions['economic_indicators'])} indicadores e {len(predictions['sector_predictions'])} setores")
 
-        return result
\ No newline at end of file
+        return result
+
+    @staticmethod
+    def _numero(valor, padrao=None):
+        # Arredonda para a saída; NaN (dados insuficientes) vira `padrao`
+        return padrao if np.isnan(valor) else round(float(valor), 4)
+
+    def _tendencia(self, modelo, i):
+        # Variação semanal da cobertura segundo a tendência, relativa à cobertura média
+        if np.isnan(modelo['inclinacao'][i]):
+            return 'dados_insuficientes'
+        if modelo['citacoes_janela'][i] == 0:
+            return 'sem_cobertura'
+        referencia = max(modelo['media'][i], 1e-9)
+        if modelo['sigma'][i] > referencia * 1.5:
+            return 'volatilidade_alta'
+        semanal = modelo['inclinacao'][i] * 7 / referencia
+        return 'alta' if semanal > 0.1 else 'queda' if semanal < -0.1 else 'estabilidade'
+
+    @staticmethod
+    def _direcao(atual, prevista):
+        # Classifica a variação entre a cobertura atual e a prevista
+        if np.isnan(atual) or np.isnan(prevista):
+            return 'dados_insuficientes'
+        variacao = (prevista - atual) / max(atual, 1e-9)
+        if variacao > 0.25:
+            return 'alta'
+        if variacao > 0.05:
+            return 'leve_alta'
+        if variacao < -0.25:
+            return 'queda'
+        if variacao < -0.05:
+            return 'leve_queda'
+        return 'estabilidade'
+
+    @staticmethod
+    def _panorama(sentimento, intervalo):
+        # Panorama do setor pelo sentimento previsto; intervalos largos marcam o panorama como volátil
+        if np.isnan(sentimento):
+            return 'dados_insuficientes'
+        panorama = 'positivo' if sentimento > 0.05 else 'negativo' if sentimento < -0.05 else 'neutro'
+        return f"volatil_{panorama}" if intervalo > 0.5 else panorama
+
+    @staticmethod
+    def _confianca(modelo, i):
+        # Confiança = precisão relativa do intervalo x fração dos dias da janela com notícias
+        # Sem nenhuma citação na janela não há o que prever
+        meia_largura = (modelo['superior'][i] - modelo['inferior'][i]) / 2
+        referencia = max(modelo['prevista'][i], modelo['media'][i], 1e-9)
+        if np.isnan(meia_largura) or modelo['citacoes_janela'][i] == 0:
+            return 0.0
+        return round(float(np.clip(modelo['cobertura_janela'][i] / (1 + meia_largura / referencia), 0.05, 0.95)), 2)
+
+    @staticmethod
+    def _confianca_sentimento(modelo, i):
+        # Confiança = 1 - meia largura do intervalo do sentimento, x fração dos dias com sentimento
+        meia_largura = (modelo['sentimento_superior'][i] - modelo['sentimento_inferior'][i]) / 2
+        if np.isnan(meia_largura):
+            return 0.0
+        return round(float(np.clip((1 - meia_largura) * modelo['dias_com_sentimento'][i], 0.05, 0.95)), 2)
+
+    def _datas_chave(self, citacoes_juros):
+        # Datas do horizonte: Focus (segundas-feiras), IPCA (em torno do dia 10) e a próxima reunião do
+        # Copom, estimada 45 dias após o pico de notícias sobre juros dos últimos 45 dias (as reuniões são a
+        # cada ~45 dias; o pico precisa ser o dobro da mediana do período)
+        hoje = datetime.now(timezone.utc).date()
+        fim = hoje + timedelta(days=self.horizonte_dias)
+        datas = []
+
+        segunda = hoje + timedelta(days=(7 - hoje.weekday()) % 7 or 7)
+        datas.append({'date': segunda.isoformat(), 'event': 'Relatório Focus', 'importance': 'média'})
+
+        ipca = hoje.replace(day=10) if hoje.day < 10 else (hoje.replace(day=1) + timedelta(days=32)).replace(day=10)
+        if ipca <= fim:
+            datas.append({'date': ipca.isoformat(), 'event': 'Dados de inflação IPCA', 'importance': 'média'})
+
+        recentes = citacoes_juros[-45:]
+        pico = int(np.argmax(recentes))
+        if recentes[pico] > 2 * max(np.median(recentes), 1):
+            reuniao = hoje - timedelta(days=len(recentes) - 1 - pico) + timedelta(days=45)
+            if hoje < reuniao <= fim:
+                datas.append({'date': reuniao.isoformat(), 'event': 'Possível reunião Copom', 'importance': 'alta'})
+
+        return sorted(datas, key=lambda data: data['date'])
@@ -0,0 +1,242 @@
+import heapq
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from Agents.Agent1_ThemeSummarizer import Agent1_ThemeSummarizer
+from Agents.Agent2_EntityExtractor import Agent2_EntityExtractor
+from Agents.Agent3_NewsClassifier import Agent3_NewsClassifier
+from Metrics import metrics
+from NewsItem import NewsItem
+from ValueExtractor import value_extractor
+
+ENTITY_TYPES = ('companies', 'people', 'locations', 'values', 'dates', 'percentages', 'tickers')
+# Entidades listadas com repetição, uma vez por ocorrência (as demais listam nomes distintos)
+REPEATED_TYPES = ('values', 'dates', 'percentages')
+# Notícias lidas do banco e pontuadas de uma vez (Agent3.pontuar_lote) dentro de um intervalo
+TAMANHO_SUBLOTE = 500
+
+# Agentes de cada processo do pool, criados uma vez pelo inicializador
+_agentes = None
+
+
+class ResultadoParcial:
+    # Resultado da análise de um intervalo de notícias: temas, entidades e pontuação por categoria
+    # Dois parciais são combinados com combinar(), em qualquer ordem (redução associativa)
+
+    def __init__(self, theme_names, categories, limite=5):
+        self.limite = limite
+        self.total = 0
+        # (id da linha, news_id) por tema; ordenado só no fim, porque os lotes chegam fora de ordem
+        self.temas = {theme: [] for theme in theme_names}
+        self.entidades = {entity_type: Counter() for entity_type in ENTITY_TYPES}
+        # Por categoria: quantidade de notícias, soma da relevância e as `limite` notícias mais relevantes
+        self.categorias = {category: {'news_count': 0, 'relevance_score': 0, 'top': []} for category in categories}
+        # Valores estruturados em arrays tipados (coluna 'noticia' = id da linha); os registros das notícias
+        # ficam pendentes até consolidar_valores(), que os converte de uma vez
+        self.valores = value_extractor.concatenar([])
+        self._pendentes = ([], [])
+
+    def adicionar(self, rowid, news_id, tema, entidades, pontuacoes):
+        # Soma a análise de uma notícia (formatos de tema_da_noticia, entidades_da_noticia e pontuar_noticia)
+        self.total += 1
+        self.temas[tema].append((rowid, news_id))
+        for entity_type in ENTITY_TYPES:
+            self.entidades[entity_type].update(entidades[entity_type])
+        self._pendentes[0].append(rowid)
+        self._pendentes[1].append(entidades['structured'])
+        for category, pontuacao in pontuacoes.items():
+            dados = self.categorias[category]
+            dados['news_count'] += 1
+            dados['relevance_score'] += pontuacao
+            # Empates ficam com a notícia mais antiga (menor id), como na ordem do pipeline
+            entrada = (pontuacao, -rowid, news_id, tema)
+            if len(dados['top']) < self.limite:
+                heapq.heappush(dados['top'], entrada)
+            else:
+                heapq.heappushpop(dados['top'], entrada)
+
+    def consolidar_valores(self):
+        # Converte os registros pendentes em arrays e os junta aos já consolidados
+        if self._pendentes[0]:
+            rowids, registros = self._pendentes
+            self.valores = value_extractor.concatenar([self.valores, value_extractor.tabela(registros, rowids)])
+            self._pendentes = ([], [])
+        return self.valores
+
+    def combinar(self, outro):
+        # Junta outro parcial a este e retorna este
+        self.valores = value_extractor.concatenar([self.consolidar_valores(), outro.consolidar_valores()])
+        self.total += outro.total
+        for theme, ids in outro.temas.items():
+            self.temas[theme].extend(ids)
+        for entity_type, contagem in outro.entidades.items():
+            self.entidades[entity_type].update(contagem)
+        for category, dados in outro.categorias.items():
+            atual = self.categorias[category]
+            atual['news_count'] += dados['news_count']
+            atual['relevance_score'] += dados['relevance_score']
+            atual['top'] = heapq.nlargest(self.limite, atual['top'] + dados['top'])
+            heapq.heapify(atual['top'])
+        return self
+
+
+def _inicializar_processo(db_path):
+    # Cria os agentes uma vez por processo (as palavras-chave são registradas no matcher do processo), com o
+    # modelo de categorias salvo no banco, como no pipeline
+    global _agentes
+    classifier = Agent3_NewsClassifier()
+    classifier.carregar_modelo(db_path)
+    _agentes = (Agent1_ThemeSummarizer(), Agent2_EntityExtractor(), classifier)
+
+
+def _analisar_intervalo(db_path, inicio, fim, limite):
+    # Analisa as notícias com id entre inicio e fim, lendo-as do banco dentro do próprio processo
+    theme_agent, entity_agent, classifier = _agentes
+    parcial = ResultadoParcial([*theme_agent.theme_keywords, 'outros'], classifier.categorias_ativas(), limite)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        # O cursor percorre as linhas sob demanda, em sublotes pontuados de uma vez pelo classificador
+        cursor = conn.execute(
+            "SELECT id, url, titulo, texto, data, fonte FROM noticias WHERE id BETWEEN ? AND ? ORDER BY id",
+            (inicio, fim))
+        while True:
+            linhas = cursor.fetchmany(TAMANHO_SUBLOTE)
+            if not linhas:
+                break
+            items = [NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte)
+                     for _, url, titulo, texto, data, fonte in linhas]
+            pontuacoes = classifier.pontuar_lote(items, registrar=False)
+            for (rowid, *_), item, pontuacao in zip(linhas, items, pontuacoes):
+                parcial.adicionar(rowid, item.id, theme_agent.tema_da_noticia(item),
+                                  entity_agent.entidades_da_noticia(item), pontuacao)
+                item.liberar_documento()
+    finally:
+        conn.close()
+    # O parcial volta ao processo principal com os valores já em arrays (mais compactos para serializar)
+    parcial.consolidar_valores()
+    return parcial
+
+
+def analisar_historico(db_path='news.db', processos=None, tamanho_lote=5000, limite=5, categorias=None):
+    # Roda os Agentes 1-3 sobre toda a tabela noticias, em lotes de ids distribuídos entre processos
+    # Os processos leem o próprio lote do banco; o processo principal só combina os resultados parciais
+    # categorias (ex.: Agent3.categorias_vigentes()) dá as prioridades; sem ela, as configuradas no Agente 3
+    # Retorna temas, entidades e classificação nos formatos dos agentes
+    processos = processos or os.cpu_count() or 1
+    theme_agent, classifier = Agent1_ThemeSummarizer(), Agent3_NewsClassifier()
+    classifier.carregar_modelo(db_path)
+    ativas = classifier.categorias_ativas()
+    categorias = {category: (categorias or {}).get(category, config) for category, config in ativas.items()}
+    theme_names = [*theme_agent.theme_keywords, 'outros']
+    total = ResultadoParcial(theme_names, categorias, limite)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        minimo, maximo = conn.execute("SELECT MIN(id), MAX(id) FROM noticias").fetchone()
+    finally:
+        conn.close()
+
+    with metrics.medir_etapa('batch.analisar_historico') as registro:
+        if minimo is not None:
+            intervalos = [(inicio, min(inicio + tamanho_lote - 1, maximo))
+                          for inicio in range(minimo, maximo + 1, tamanho_lote)]
+
+            if processos == 1:
+                _inicializar_processo(db_path)
+                for inicio, fim in intervalos:
+                    total.combinar(_analisar_intervalo(db_path, inicio, fim, limite))
+            else:
+                with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo,
+                                         initargs=(db_path,)) as executor:
+                    # No máximo dois lotes por processo em andamento, para limitar a memória do processo principal
+                    pendentes = set()
+                    for inicio, fim in intervalos:
+                        if len(pendentes) >= processos * 2:
+                            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                            for future in prontos:
+                                total.combinar(future.result())
+                        pendentes.add(executor.submit(_analisar_intervalo, db_path, inicio, fim, limite))
+                    for future in wait(pendentes).done:
+                        total.combinar(future.result())
+
+        registro['items_in'] = registro['items_out'] = total.total
+
+    return _formatar(total, db_path, categorias)
+
+
+def _formatar(total, db_path, categories):
+    # Converte o resultado combinado para os formatos de saída dos Agentes 1, 2 e 3
+    main_themes = {theme: [news_id for _, news_id in sorted(ids)] for theme, ids in total.temas.items()}
+    themes = {
+        'timestamp': datetime.now().isoformat(),
+        'total_news': total.total,
+        'themes_distribution': {theme: len(ids) for theme, ids in main_themes.items()},
+        'main_themes': main_themes
+    }
+
+    # Mesmo formato do Agente 2: valores, datas e percentuais com repetição, tickers ordenados e os demais nomes
+    # distintos com iniciais maiúsculas
+    entities = {}
+    for entity_type, contagem in total.entidades.items():
+        if entity_type in REPEATED_TYPES:
+            entities[entity_type] = [nome for nome, quantidade in contagem.items() for _ in range(quantidade)]
+        elif entity_type == 'tickers':
+            entities[entity_type] = sorted(contagem)
+        else:
+            entities[entity_type] = [nome.title() for nome, _ in contagem.most_common()]
+    entity_count = {entity_type: len(nomes) for entity_type, nomes in entities.items()}
+    structured_values = total.consolidar_valores()
+    entities_result = {
+        'timestamp': datetime.now().isoformat(),
+        'entities': entities,
+        'entity_count': entity_count,
+        'top_entities': {entity_type: entities[entity_type][:5] for entity_type in ('companies', 'people', 'locations')},
+        'entity_tallies': {entity_type: dict(contagem) for entity_type, contagem in total.entidades.items()},
+        'structured_values': structured_values,
+        'value_stats': value_extractor.estatisticas(structured_values)
+    }
+
+    classified_news = {}
+    rowids = set()
+    for category, config in categories.items():
+        dados = total.categorias[category]
+        top = sorted(dados['top'], reverse=True)
+        rowids.update(-menos_rowid for _, menos_rowid, _, _ in top)
+        classified_news[category] = {
+            'news': [{'news_id': news_id, 'relevance_score': pontuacao, 'original_theme': tema}
+                     for pontuacao, _, news_id, tema in top],
+            'news_count': dados['news_count'],
+            'priority': config['priority'],
+            'relevance_score': dados['relevance_score']
+        }
+
+    # Catálogo apenas das notícias que aparecem no topo das categorias
+    items = {}
+    if rowids:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            placeholders = ", ".join("?" * len(rowids))
+            for url, titulo, texto, data, fonte in conn.execute(
+                    f"SELECT url, titulo, texto, data, fonte FROM noticias WHERE id IN ({placeholders})",
+                    list(rowids)):
+                item = NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte)
+                items[item.id] = item
+        finally:
+            conn.close()
+
+    classified = {
+        'timestamp': datetime.now().isoformat(),
+        'classified_categories': classified_news,
+        'items': items,
+        'category_distribution': {cat: data['news_count'] for cat, data in classified_news.items()},
+        'high_priority_count': sum(data['news_count'] for data in classified_news.values()
+                                   if data['priority'] == 'alta'),
+        'top_categories': sorted([(cat, data['relevance_score']) for cat, data in classified_news.items()
+                                  if data['news_count'] > 0], key=lambda x: x[1], reverse=True)[:3]
+    }
+
+    return {'themes': themes, 'entities': entities_result, 'classifications': classified}
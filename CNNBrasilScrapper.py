@@ -1,11 +1,48 @@
 ﻿import requests
-from bs4 import BeautifulSoup
-from textblob import TextBlob
-import re
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from urllib.parse import urlparse
 import time
 
+from HtmlParser import HtmlParser
+from KeywordMatcher import keyword_matcher
+from Metrics import metrics
+from NewsDocument import NewsDocument
+from NewsItem import NewsItem
+from NewsStore import NewsWriter, preparar_banco
+from Sentiment import sentiment_analyzer
+from Summarizer import summarizer
+
+
+class LimitadorPorHost:
+    # Limita requisições simultâneas e o intervalo mínimo entre requisições para cada host
+
+    def __init__(self, max_simultaneas=2, intervalo_minimo=1.0):
+        self.max_simultaneas = max_simultaneas
+        self.intervalo_minimo = intervalo_minimo
+        self._lock = threading.Lock()
+        self._semaforos = {}
+        self._proximo_horario = {}
+
+    @contextmanager
+    def reservar(self, url):
+        # Aguarda uma vaga livre no host e respeita o intervalo mínimo desde a última requisição
+        host = urlparse(url).netloc
+        with self._lock:
+            semaforo = self._semaforos.setdefault(host, threading.BoundedSemaphore(self.max_simultaneas))
+
+        with semaforo:
+            with self._lock:
+                agora = time.monotonic()
+                horario = max(agora, self._proximo_horario.get(host, agora))
+                self._proximo_horario[host] = horario + self.intervalo_minimo
+            if horario > agora:
+                time.sleep(horario - agora)
+            yield
+
 
 class CNNBrasilScraper:
     CATEGORIAS = {
@@ -21,13 +58,29 @@ class CNNBrasilScraper:
         "emprego": ["emprego", "desemprego", "desempregado", "trabalho", "caged"]
     }
 
-    def __init__(self, db_path='news.db'):
+    # Notícias baixadas pontuadas juntas pelo analisador de sentimento
+    LOTE_SENTIMENTO = 16
+
+    def __init__(self, db_path='news.db', max_workers=1, max_por_host=2, intervalo_minimo=1.0, cache=None,
+                 parser_backend=None, sentiment_cache=None):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         }
+        # max_workers > 1 ativa a coleta concorrente das notícias
+        self.max_workers = max_workers
+        self.limitador = LimitadorPorHost(max_por_host, intervalo_minimo)
+        # Cache HTTP opcional (ResponseCache); com ele as respostas válidas não vão à rede
+        self.cache = cache
+        # Backend de parsing: 'selectolax', 'lxml' ou 'html.parser' (padrão: o mais rápido instalado)
+        self.parser = HtmlParser(parser_backend)
+        # Cache opcional (AgentCache) das análises de sentimento, compartilhado entre execuções
+        self.sentiment_cache = sentiment_cache
+        keyword_matcher.registrar('scraper_categorias', self.CATEGORIAS)
         self.conn = sqlite3.connect(db_path)
         self.cursor = self.conn.cursor()
         self._create_database()
+        # Toda escrita de notícias passa pela thread do NewsWriter, em lotes
+        self.writer = NewsWriter(db_path)
 
     def _create_database(self):
         # Cria a tabela de notícias se não existir
@@ -45,170 +98,214 @@ class CNNBrasilScraper:
             )
         ''')
         self.conn.commit()
+        # Data de publicação normalizada, índices e índice de busca textual
+        preparar_banco(self.conn)
 
     def classificar_categoria(self, texto):
         # Classifica a notícia em uma categoria com base em palavras-chave
-        texto = texto.lower()
-        for categoria, palavras in self.CATEGORIAS.items():
-            if any(palavra in texto for palavra in palavras):
+        # Aceita o texto puro ou um NewsDocument (usa só o conteúdo, sem o título)
+        if isinstance(texto, NewsDocument):
+            ocorrencias = texto.ocorrencias(somente_conteudo=True)
+        else:
+            ocorrencias = keyword_matcher.buscar(texto.lower())
+        encontradas = keyword_matcher.agrupar(ocorrencias, 'scraper_categorias')
+        for categoria in self.CATEGORIAS:
+            if encontradas[categoria]:
                 return categoria
         return "outras"
 
     def analisar_sentimento(self, texto):
-        # Analisa o sentimento do texto usando TextBlob
-        blob = TextBlob(texto)
-        return blob.sentiment.polarity
+        # Polaridade do texto pelo léxico em português (memorizada pelo hash do texto)
+        return sentiment_analyzer.polaridade(texto)
+
+    def pontuar_sentimento(self, items):
+        # Sentimento de um lote de notícias numa única passada do analisador: polaridade e sentenças
+        resultados = sentiment_analyzer.analisar([item.content for item in items], cache=self.sentiment_cache)
+        for item, resultado in zip(items, resultados):
+            item.sentiment = resultado['polaridade']
+            item.sentiment_sentences = resultado['sentencas']
+        return items
+
+    def _get(self, url, classe='artigo'):
+        # Faz a requisição HTTP passando pelo cache, quando configurado, e registra suas métricas
+        inicio = time.perf_counter()
+        response = None
+        try:
+            if self.cache is None:
+                response = self._requisitar(url)
+            else:
+                response = self.cache.obter(url, classe, lambda headers: self._requisitar(url, headers))
+            return response
+        finally:
+            from_cache = getattr(response, 'from_cache', False)
+            metrics.registrar_http(url, time.perf_counter() - inicio, getattr(response, 'status_code', None),
+                                   0 if response is None or from_cache else len(response.content), from_cache)
+
+    def _requisitar(self, url, headers_extra=None):
+        # Faz a requisição HTTP respeitando o limite de educação por host
+        headers = dict(self.headers, **(headers_extra or {}))
+        with self.limitador.reservar(url):
+            return requests.get(url, headers=headers, timeout=15)
 
     def extrair_conteudo_noticia(self, url):
         # Extrai o conteúdo completo de uma notícia
         try:
-            response = requests.get(url, headers=self.headers, timeout=15)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Extrair título
-            title = soup.find('h1')
-            title_text = title.get_text(strip=True) if title else "Título não encontrado"
-
-            # Extrair conteúdo principal
-            content_div = soup.find('div', class_='post__content')
-            if not content_div:
-                content_div = soup.find('article')
-
-            content_text = ""
-            if content_div:
-                paragraphs = content_div.find_all('p')
-                content_text = " ".join([p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)])
-
-            # Extrair data de publicação
-            date_element = soup.find('time')
-            date = date_element['datetime'] if date_element and date_element.has_attr(
-                'datetime') else "Data não encontrada"
-
-            return {
-                'title': title_text,
-                'content': content_text,
-                'date': date
-            }
+            response = self._get(url)
+
+            # Extrair título, conteúdo principal e data de publicação
+            return self.parser.extrair_artigo(response.text)
         except Exception as e:
             print(f"Erro ao acessar {url}: {e}")
             return {'title': '', 'content': '', 'date': ''}
 
-    def scrape_economia_news(self):
+    def scrape_economia_news(self, incremental=False):
         # Coleta notícias de economia da CNN Brasil
+        # No modo incremental, notícias já salvas no banco são carregadas do SQLite em vez de baixadas
+        return list(self.iterar_noticias(incremental))
+
+    def iterar_noticias(self, incremental=False):
+        # Gera as notícias à medida que são analisadas, na ordem da página de economia
+        # Com max_workers > 1 as próximas notícias continuam sendo baixadas enquanto o consumidor processa a atual
+        with metrics.medir_etapa('scraper.scrape_economia_news') as registro:
+            try:
+                for news_item in self._iterar_noticias(incremental, registro):
+                    registro['items_out'] += 1
+                    yield news_item
+            finally:
+                # Grava o que já foi enfileirado, mesmo se o consumidor parar no meio
+                self.writer.flush()
+
+    def _iterar_noticias(self, incremental, registro):
         base_url = "https://www.cnnbrasil.com.br/economia/"
+        executor = None
         try:
-            response = requests.get(base_url, headers=self.headers, timeout=15)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Estratégia 1: Procurar por elementos de notícia em <article>
-            news_items = []
-            articles = soup.find_all('article')
-
-            for article in articles:
-                link = article.find('a', href=True)
-                if link and link['href']:
-                    title = article.find(['h2', 'h3', 'h4'])
-                    if title:
-                        news_items.append({
-                            'title': title.get_text(strip=True),
-                            'url': link['href']
-                        })
-
-            # Estratégia 2: Procurar por títulos que parecem notícias
-            if len(news_items) < 5:
-                for heading in soup.find_all(['h2', 'h3', 'h4']):
-                    if heading.get_text(strip=True) and len(heading.get_text(strip=True)) > 20:
-                        parent_link = heading.find_parent('a', href=True)
-                        if parent_link and parent_link['href']:
-                            news_items.append({
-                                'title': heading.get_text(strip=True),
-                                'url': parent_link['href']
-                            })
-
-            # Remover duplicados
-            unique_news = {}
-            for item in news_items:
-                if item['title'] and item['url']:
-                    # Normalizar URL
-                    if not item['url'].startswith('http'):
-                        if item['url'].startswith('/'):
-                            item['url'] = f"https://www.cnnbrasil.com.br{item['url']}"
-                        else:
-                            item['url'] = f"https://www.cnnbrasil.com.br/{item['url']}"
-
-                    # Usar URL como chave para evitar duplicatas
-                    unique_news[item['url']] = item
-
-            # Processar cada notícia
-            full_news = []
-            for url, item in unique_news.items():
-                try:
-                    # Extrair conteúdo completo
-                    news_details = self.extrair_conteudo_noticia(url)
-
-                    if news_details['content'] and len(news_details['content']) > 100:
-                        # Analisar sentimento e categoria
-                        sentiment = self.analisar_sentimento(news_details['content'])
-                        category = self.classificar_categoria(news_details['content'])
-
-                        # Adicionar à lista de notícias
-                        news_data = {
-                            'fonte': 'CNN Brasil',
-                            'url': url,
-                            'titulo': item['title'],
-                            'texto': news_details['content'],
-                            'data': news_details['date'],
-                            'sentimento': sentiment,
-                            'categoria': category
-                        }
-                        full_news.append(news_data)
-
-                        # Salvar no banco de dados
-                        try:
-                            self.cursor.execute(
-                                """INSERT INTO noticias 
-                                (fonte, url, titulo, texto, data, sentimento, categoria) 
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                                ON CONFLICT(url) DO NOTHING""",
-                                (news_data['fonte'], news_data['url'], news_data['titulo'],
-                                 news_data['texto'], news_data['data'], news_data['sentimento'],
-                                 news_data['categoria'])
-                            )
-                            self.conn.commit()
-                        except sqlite3.Error as e:
-                            print(f"Erro no banco de dados: {e}")
-
-                    # Delay para evitar bloqueio
-                    time.sleep(1)
-
-                except Exception as e:
-                    print(f"Erro ao processar {url}: {e}")
-
-            return full_news
+            response = self._get(base_url, classe='landing')
+            unique_news = self._descobrir_noticias(response.text)
+            registro['items_in'] = len(unique_news)
+
+            stored_news = self.buscar_noticias_salvas(list(unique_news.keys())) if incremental else {}
+            new_news = {url: item for url, item in unique_news.items() if url not in stored_news}
+            if incremental:
+                print(f"Modo incremental: {len(stored_news)} notícias já salvas, {len(new_news)} novas")
+
+            # Processar cada notícia nova (em paralelo se max_workers > 1); os resultados saem na ordem da página
+            if self.max_workers > 1:
+                executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                fetched_news = executor.map(self._processar_noticia, new_news.keys(), new_news.values())
+            else:
+                fetched_news = map(self._processar_noticia, new_news.keys(), new_news.values())
+
+            # As notícias baixadas esperam em `pendentes` até formar um lote para o sentimento; uma notícia
+            # já salva só sai depois delas, para manter a ordem da página
+            pendentes = []
+            for url in unique_news:
+                if url in stored_news:
+                    yield from self._gravar_pendentes(pendentes)
+                    yield stored_news[url]
+                    continue
+
+                news_item = next(fetched_news)
+                if news_item is None:
+                    continue
+
+                pendentes.append(news_item)
+                if len(pendentes) >= self.LOTE_SENTIMENTO:
+                    yield from self._gravar_pendentes(pendentes)
+            yield from self._gravar_pendentes(pendentes)
 
         except Exception as e:
             print(f"Erro ao acessar o site: {e}")
-            return []
+
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _gravar_pendentes(self, pendentes):
+        # Pontua o sentimento do lote, enfileira as notícias para gravação e as repassa ao consumidor
+        if not pendentes:
+            return
+        lote = self.pontuar_sentimento(list(pendentes))
+        pendentes.clear()
+        for news_item in lote:
+            self.writer.put(news_item)
+            yield news_item
+
+    def buscar_noticias_salvas(self, urls):
+        # Busca no banco, em lote, as notícias cujas URLs já foram salvas
+        stored_news = {}
+        # Respeita o limite de parâmetros por consulta do SQLite
+        for inicio in range(0, len(urls), 500):
+            lote = urls[inicio:inicio + 500]
+            placeholders = ", ".join("?" * len(lote))
+            try:
+                self.cursor.execute(
+                    f"""SELECT fonte, url, titulo, texto, data, sentimento, categoria
+                    FROM noticias WHERE url IN ({placeholders})""",
+                    lote
+                )
+            except sqlite3.Error as e:
+                print(f"Erro no banco de dados: {e}")
+                continue
+
+            for fonte, url, titulo, texto, data, sentimento, categoria in self.cursor.fetchall():
+                stored_news[url] = NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte,
+                                            sentiment=sentimento, category=categoria)
+        return stored_news
+
+    def _descobrir_noticias(self, html):
+        # Encontra os links de notícias na página de economia
+        news_items = self.parser.extrair_links(html)
+
+        # Remover duplicados
+        unique_news = {}
+        for item in news_items:
+            if item['title'] and item['url']:
+                # Normalizar URL
+                if not item['url'].startswith('http'):
+                    if item['url'].startswith('/'):
+                        item['url'] = f"https://www.cnnbrasil.com.br{item['url']}"
+                    else:
+                        item['url'] = f"https://www.cnnbrasil.com.br/{item['url']}"
+
+                # Usar URL como chave para evitar duplicatas
+                unique_news[item['url']] = item
+
+        return unique_news
+
+    def _processar_noticia(self, url, item):
+        # Baixa e analisa uma notícia; retorna None se o conteúdo for insuficiente
+        # O intervalo entre requisições agora é controlado pelo LimitadorPorHost
+        try:
+            # Extrair conteúdo completo
+            news_details = self.extrair_conteudo_noticia(url)
+
+            if news_details['content'] and len(news_details['content']) > 100:
+                # Documento normalizado, reaproveitado depois por todos os agentes
+                doc = NewsDocument(item['title'], news_details['content'])
+
+                # Analisar a categoria; o sentimento é calculado depois, em lote (pontuar_sentimento)
+                category = self.classificar_categoria(doc)
+
+                return NewsItem(url=url, title=item['title'], content=news_details['content'],
+                                timestamp=news_details['date'], source='CNN Brasil', category=category, doc=doc)
+
+        except Exception as e:
+            print(f"Erro ao processar {url}: {e}")
+
+        return None
 
     def close(self):
         # Fecha a conexão com o banco de dados
+        self.writer.close()
         self.conn.close()
+        if self.cache is not None:
+            self.cache.close()
 
-    def sumarizar_noticias_simples(self, noticias):
-        # Sumariza notícias usando uma abordagem simplificada
+    def sumarizar_noticias_simples(self, noticias, max_noticias=5):
+        # Sumariza notícias com a sentença mais representativa (TF-IDF) de cada uma das primeiras notícias
         if not noticias:
             return "Nenhuma notícia relevante foi coletada."
 
-        # Extrair frases manualmente
-        textos = " ".join([noticia['texto'] for noticia in noticias])
-        frases = re.split(r'(?<=[.!?])\s+', textos)
-
-        # Verificar se há frases suficientes
-        if len(frases) < 5:
-            return textos
-
-        # Selecionar algumas frases importantes
-        indices = [0, len(frases) // 4, len(frases) // 2, 3 * len(frases) // 4, min(len(frases) - 1, 10)]
-        resumo = " ".join([frases[i] for i in indices])
-
-        return resumo
+        noticias = noticias[:max_noticias]
+        resumos = summarizer.resumir(noticias, num_sentencas=1)
+        return " ".join(resumos[noticia.id] for noticia in noticias)
@@ -1,17 +1,110 @@
-﻿import warnings
-from datetime import datetime
+﻿import functools
+import hashlib
+import json
+import warnings
+from datetime import datetime, date
 from logger_config import logger
+from AgentCache import AUSENTE
+from Metrics import metrics
 
 warnings.filterwarnings('ignore')
 
+
+def instrumentado(items_in=None, items_out=None):
+    # Decorador dos métodos principais dos agentes: registra tempo de parede, CPU, memória e itens
+    # items_in é extraído da entrada do método (primeiro argumento) e items_out do resultado; sem items_out,
+    # conta-se o mesmo que na entrada. processed_count não serve, porque cada agente conta uma coisa diferente
+    # e nada é somado quando o resultado vem do cache
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with metrics.medir_etapa(f"{self.agent_id}.{func.__name__}") as registro:
+                result = func(self, *args, **kwargs)
+                registro['items_in'] = items_in(args[0]) if items_in and args else 0
+                registro['items_out'] = items_out(result) if items_out else registro['items_in']
+            return result
+        return wrapper
+    return decorador
+
+def _sem_volateis(valor):
+    # Remove da entrada o que muda a cada execução sem mudar o resultado (timestamps e o catálogo de itens)
+    if isinstance(valor, dict):
+        return {k: _sem_volateis(v) for k, v in valor.items()
+                if k not in ('timestamp', 'items', 'processing_time_ms')}
+    if isinstance(valor, (list, tuple)):
+        return [_sem_volateis(v) for v in valor]
+    return valor
+
+
 class EconomicNewsletterAgent:
     # Classe base para todos os agentes
 
+    # Versão da lógica do agente; incrementar invalida os resultados salvos no cache
+    VERSION = '1.0'
+
     def __init__(self, agent_id: str, name: str, description: str):
         self.agent_id = agent_id
         self.name = name
         self.description = description
         self.processed_count = 0
+        # Cache de resultados entre execuções (AgentCache), configurado pelo sistema
+        self.cache = None
+
+    def configuracao(self):
+        # Parâmetros que mudam o resultado do agente (ex.: palavras-chave); fazem parte da chave do cache
+        return None
+
+    def _prefixo_cache(self) -> str:
+        config = json.dumps(self.configuracao(), sort_keys=True, ensure_ascii=False, default=str)
+        return f"{self.agent_id}:{self.VERSION}:{hashlib.sha1(config.encode('utf-8')).hexdigest()[:12]}"
+
+    def memorizar_por_noticia(self, items, calcular, registrar=True):
+        # Aplica calcular(item) a cada notícia, reaproveitando do cache os resultados de notícias já vistas
+        # O id do NewsItem é um hash do conteúdo, então serve de chave
+        # registrar=False evita uma linha de log por chamada quando as notícias chegam uma a uma
+        if self.cache is None:
+            return [calcular(item) for item in items]
+
+        prefixo = self._prefixo_cache()
+        chaves = [f"{prefixo}:noticia:{item.id}" for item in items]
+        encontrados = self.cache.obter_varios(chaves)
+
+        novos = {}
+        resultados = []
+        for chave, item in zip(chaves, items):
+            if chave in encontrados:
+                resultados.append(encontrados[chave])
+            else:
+                novos[chave] = calcular(item)
+                resultados.append(novos[chave])
+        self.cache.salvar_varios(novos)
+
+        if encontrados and registrar:
+            self.log_activity(f"{len(encontrados)} notícias reaproveitadas do cache, {len(novos)} processadas")
+        return resultados
+
+    def memorizar_etapa(self, entrada, calcular):
+        # Reaproveita a saída inteira do estágio quando a entrada não mudou
+        # A data entra na chave porque as saídas carregam datas do dia
+        if self.cache is None:
+            return calcular()
+
+        conteudo = json.dumps(_sem_volateis(entrada), sort_keys=True, ensure_ascii=False, default=str)
+        chave = (f"{self._prefixo_cache()}:etapa:{date.today().isoformat()}:"
+                 f"{hashlib.sha1(conteudo.encode('utf-8')).hexdigest()}")
+
+        salvo = self.cache.obter(chave)
+        if salvo is AUSENTE:
+            resultado = calcular()
+            # O catálogo de itens não é salvo: no reaproveitamento ele vem da entrada atual
+            self.cache.salvar(chave, ('items' in resultado, {k: v for k, v in resultado.items() if k != 'items'}))
+            return resultado
+
+        tinha_items, resultado = salvo
+        if tinha_items:
+            resultado['items'] = entrada.get('items', {})
+        self.log_activity("Resultado do estágio reaproveitado do cache")
+        return resultado
 
     def log_activity(self, message: str) -> None:
         # Registra atividade do agente no log
@@ -1,4 +1,5 @@
-﻿import os
+﻿import itertools
+import os
 from datetime import datetime, timedelta
 from typing import Dict, Any
 from Agents.Agent2_EntityExtractor import Agent2_EntityExtractor
@@ -9,21 +10,44 @@ from Agents.Agent6_ContentValidator import Agent6_ContentValidator
 from Agents.Agent7_TemporalPredictor import Agent7_TemporalPredictor
 
 from Agents.Agent1_ThemeSummarizer import Agent1_ThemeSummarizer
+from AgentCache import AgentCache
+from BatchAnalysis import analisar_historico
 from CNNBrasilScrapper import CNNBrasilScraper
+from NearDuplicates import NearDuplicateDetector
+from NewsAggregates import NewsAggregates
+from NewsItem import NewsItem
+from NewsStore import NewsStore
+from ResponseCache import ResponseCache
+from StageScheduler import Stage, StageScheduler
+from TopicClustering import TopicClusterer
+from TrendSketches import TrendTracker
 from EconomicNewsletterAgent import EconomicNewsletterAgent
 from logger_config import logger
+from Metrics import metrics
 
 class EconomicNewsletterSystem:
 
+    # Tamanho dos lotes em que um fluxo de notícias é consumido no modo incremental
+    STREAM_BATCH_SIZE = 20
+
     def __init__(self):
+        self.agent_cache = AgentCache()
         self.agents = self._initialize_agents()
-        self.scraper = CNNBrasilScraper()
+        self.scraper = CNNBrasilScraper(cache=ResponseCache(), sentiment_cache=self.agent_cache)
+        self.news_store = NewsStore()
+        self.aggregates = NewsAggregates()
+        self.deduplicator = NearDuplicateDetector()
+        self.clusterer = TopicClusterer()
+        self.trends = TrendTracker()
+        self.agents['news_classifier'].trends = self.trends
+        # Modelo de categorias treinado offline (python HashingClassifier.py); sem ele valem as palavras-chave
+        self.agents['news_classifier'].carregar_modelo()
         self.data_pipeline = []
         self.is_running = False
 
     def _initialize_agents(self) -> Dict[str, EconomicNewsletterAgent]:
-        # Inicializa todos os 7 agentes
-        return {
+        # Inicializa todos os 7 agentes, compartilhando o cache de resultados
+        agents = {
             'theme_summarizer': Agent1_ThemeSummarizer(),
             'entity_extractor': Agent2_EntityExtractor(),
             'news_classifier': Agent3_NewsClassifier(),
@@ -32,73 +56,86 @@ class EconomicNewsletterSystem:
             'content_validator': Agent6_ContentValidator(),
             'temporal_predictor': Agent7_TemporalPredictor()
         }
+        for agent in agents.values():
+            agent.cache = self.agent_cache
+        return agents
 
-    def run_pipeline(self, news_data=None) -> Dict[str, Any]:
+    def run_pipeline(self, news_data=None, incremental=False, streaming=False) -> Dict[str, Any]:
         # Executa o pipeline completo de processamento
+        # incremental=True baixa apenas as notícias que ainda não estão no banco, analisa só as que ainda não
+        # entraram nos agregados persistidos e gera o newsletter a partir desses agregados
+        # streaming=True analisa cada notícia assim que o scraper a entrega; só a agregação espera o fim da coleta
         logger.info("Iniciando pipeline de newsletter econômico")
+        metrics.reiniciar()
+
+        descartadas_antes = self.deduplicator.descartadas
 
         try:
             # Passo 1: Web Scraping (se não recebeu dados)
-            if news_data is None:
-                raw_news = self.scraper.scrape_economia_news()
+            # Quase-duplicatas são reduzidas à primeira notícia de cada grupo antes de qualquer agente
+            # e cada notícia restante é atribuída a uma história (cluster) à medida que passa
+            if streaming:
+                # As notícias são consumidas pelo primeiro estágio à medida que chegam
+                stream_stats = {'news': 0}
+                stream = self.scraper.iterar_noticias(incremental=incremental) if news_data is None else news_data
+                raw_news = self._contar(self.clusterer.agrupar(self.deduplicator.filtrar(stream)), stream_stats)
+            elif news_data is None:
+                raw_news = self.scraper.scrape_economia_news(incremental=incremental)
                 if not raw_news:
                     logger.error("Falha ao obter notícias - pipeline interrompido")
                     return {'error': 'Nenhuma notícia encontrada', 'status': 'failed'}
             else:
-                raw_news = news_data
-
-            # Passo 2: Pipeline de processamento dos 7 agentes
-            logger.info(f"Iniciando processamento com {len(raw_news)} notícias")
-
-            # Agente 1: Sumarização de temas
-            step1_themes = self.agents['theme_summarizer'].process_news(raw_news)
-
-            # Agente 2: Extração de entidades
-            step2_entities = self.agents['entity_extractor'].extract_entities(step1_themes)
+                # Aceita dicionários no formato dos agentes ou do banco e converte para NewsItem
+                raw_news = [NewsItem.coerce(news) for news in news_data]
 
-            # Agente 3: Classificação de notícias
-            step3_classified = self.agents['news_classifier'].classify_news(step1_themes)
+            if not streaming:
+                raw_news = list(self.clusterer.agrupar(self.deduplicator.filtrar(raw_news)))
 
-            # Agente 4: Padronização de respostas
-            step4_standardized = self.agents['response_standardizer'].standardize_output(step3_classified)
+            # Passo 2: Pipeline de processamento dos 7 agentes, executado pelo agendador de estágios
+            if not streaming:
+                logger.info(f"Iniciando processamento com {len(raw_news)} notícias")
+            run = StageScheduler(self._pipeline_stages(incremental, streaming)).run({'raw_news': raw_news})
+            results = run['results']
 
-            # Agente 5: Resumos em tópicos
-            step5_topics = self.agents['topic_summarizer'].create_topic_summaries(step4_standardized)
+            if 'newsletter' not in results:
+                logger.error(f"Pipeline interrompido - estágios com erro: {run['errors']}")
+                return {'error': '; '.join(f"{name}: {error}" for name, error in run['errors'].items()),
+                        'status': 'failed', 'stage_timings': run['timings']}
 
-            # Agente 6: Validação de conteúdo
-            step6_validated = self.agents['content_validator'].validate_content(step5_topics)
-
-            # Agente 7: Predições temporais
-            step7_predictions = self.agents['temporal_predictor'].generate_predictions(step6_validated)
-
-            # Passo 3: Geração do newsletter final
-            newsletter_html = self.generate_newsletter(step7_predictions, step6_validated)
-
-            # Passo 4: Salvar resultados
-            self.save_newsletter(newsletter_html)
+            step2_entities = results.get('entities')
+            step5_topics = results['topics']
+            step6_validated = results['validated']
+            step7_predictions = results['predictions']
 
             # Estatísticas do pipeline
             pipeline_stats = {
                 'timestamp': datetime.now().isoformat(),
-                'news_processed': len(raw_news),
-                'total_entities': sum(step2_entities['entity_count'].values()),
+                'news_processed': stream_stats['news'] if streaming else len(raw_news),
+                'duplicates_removed': self.deduplicator.descartadas - descartadas_antes,
+                'total_entities': sum(step2_entities['entity_count'].values()) if step2_entities else 0,
                 'topics_created': step5_topics['topic_statistics']['total_topics'],
                 'topics_approved': sum(
                     check['approved_count'] for check in step6_validated['validation_checks'].values()),
-                'predictions_confidence': step7_predictions['predictions']['confidence_levels']['overall_confidence']
+                'predictions_confidence': step7_predictions['predictions']['confidence_levels']['overall_confidence'],
+                'stage_timings': run['timings']
             }
+            if incremental and 'themes' in results:
+                pipeline_stats['news_in_window'] = results['themes']['total_news']
 
-            logger.info(f"Pipeline concluído com sucesso: {pipeline_stats['news_processed']} notícias processadas")
+            # Um estágio com falha (ex.: extração de entidades) não descarta o newsletter já gerado
+            status = 'partial' if run['errors'] else 'success'
+            logger.info(f"Pipeline concluído ({status}): {pipeline_stats['news_processed']} notícias processadas")
 
             return {
-                'status': 'success',
+                'status': status,
                 'stats': pipeline_stats,
+                'errors': run['errors'],
                 'newsletter': 'newsletter_economia.html',
                 'pipeline_data': {
-                    'themes': step1_themes,
+                    'themes': results.get('themes'),
                     'entities': step2_entities,
-                    'classifications': step3_classified,
-                    'standardized': step4_standardized,
+                    'classifications': results.get('classified'),
+                    'standardized': results.get('standardized'),
                     'topics': step5_topics,
                     'validation': step6_validated,
                     'predictions': step7_predictions
@@ -109,6 +146,207 @@ class EconomicNewsletterSystem:
             logger.error(f"Erro no pipeline: {str(e)}")
             return {'error': str(e), 'status': 'failed'}
 
+        finally:
+            # Relatório de métricas (JSON + Prometheus) ao fim de toda execução, com sucesso ou não
+            try:
+                json_path, prom_path = metrics.exportar()
+                logger.info(f"Métricas salvas em: {json_path} e {prom_path}")
+            except OSError as e:
+                logger.error(f"Erro ao salvar métricas: {str(e)}")
+
+    def run_batch(self, db_path='news.db', processos=None, tamanho_lote=5000) -> Dict[str, Any]:
+        # Analisa todo o histórico salvo no banco com os Agentes 1-3, em lotes distribuídos entre processos
+        # Diferente de run_pipeline(news_data=...), não carrega a tabela inteira em memória
+        logger.info(f"Iniciando análise histórica de {db_path}")
+        metrics.reiniciar()
+
+        try:
+            # Mesmas categorias e prioridades do pipeline (modelo e tendências do Agente 3)
+            resultado = analisar_historico(db_path, processos=processos, tamanho_lote=tamanho_lote,
+                                           categorias=self.agents['news_classifier'].categorias_vigentes())
+            stats = {
+                'timestamp': datetime.now().isoformat(),
+                'news_processed': resultado['themes']['total_news'],
+                'total_entities': sum(resultado['entities']['entity_count'].values())
+            }
+            logger.info(f"Análise histórica concluída: {stats['news_processed']} notícias processadas")
+            return {'status': 'success', 'stats': stats, 'pipeline_data': resultado}
+
+        except Exception as e:
+            logger.error(f"Erro na análise histórica: {str(e)}")
+            return {'error': str(e), 'status': 'failed'}
+
+        finally:
+            try:
+                metrics.exportar()
+            except OSError as e:
+                logger.error(f"Erro ao salvar métricas: {str(e)}")
+
+    def _pipeline_stages(self, incremental=False, streaming=False):
+        # Estágios do pipeline com suas entradas; Agente 2 e Agente 3 dependem só dos temas e rodam em paralelo
+        if streaming and not incremental:
+            # Um único estágio consome o fluxo de notícias e entrega temas, entidades e categorias
+            stages = [
+                Stage('analyzed', self.analyze_stream, ['raw_news']),
+                Stage('themes', lambda analyzed: analyzed['themes'], ['analyzed']),
+                Stage('entities', lambda analyzed: analyzed['entities'], ['analyzed']),
+                Stage('classified', lambda analyzed: analyzed['classified'], ['analyzed'])
+            ]
+        elif incremental:
+            # Temas, entidades e categorias vêm dos agregados, atualizados apenas com as notícias novas
+            theme_names = [*self.agents['theme_summarizer'].theme_keywords, 'outros']
+            classifier = self.agents['news_classifier']
+            stages = [
+                Stage('aggregates', self.update_aggregates, ['raw_news'], timeout=120),
+                Stage('themes', lambda aggregates: aggregates.temas(theme_names), ['aggregates']),
+                Stage('entities', NewsAggregates.entidades, ['aggregates']),
+                # As prioridades são lidas depois de update_aggregates, com as tendências já atualizadas
+                Stage('classified', lambda aggregates: aggregates.classificacao(classifier.categorias_vigentes()),
+                      ['aggregates'])
+            ]
+        else:
+            stages = [
+                Stage('themes', self.agents['theme_summarizer'].process_news, ['raw_news']),
+                Stage('entities', self.agents['entity_extractor'].extract_entities, ['themes'], timeout=120),
+                Stage('classified', self.agents['news_classifier'].classify_news, ['themes'], timeout=120),
+                # Depois dos Agentes 2 e 3, com os resultados de cada notícia já no cache
+                Stage('trends', lambda themes, entities, classified: self.observe_trends(themes),
+                      ['themes', 'entities', 'classified'], timeout=120)
+            ]
+
+        return stages + [
+            # Depois das entidades o fluxo do scraper já terminou, então as notícias novas estão no banco
+            Stage('entity_index', self.index_entities, ['entities'], timeout=120),
+            Stage('standardized', self.agents['response_standardizer'].standardize_output, ['classified']),
+            # O fluxo de notícias já foi consumido quando 'standardized' termina, então todas têm cluster
+            Stage('clusters', self.cluster_topics, ['standardized']),
+            Stage('topics', self.agents['topic_summarizer'].create_topic_summaries, ['standardized', 'clusters']),
+            Stage('validated', self.agents['content_validator'].validate_content, ['topics']),
+            Stage('predictions', self.agents['temporal_predictor'].generate_predictions, ['validated'], timeout=120),
+            Stage('newsletter', self.generate_newsletter, ['predictions', 'validated']),
+            Stage('saved', self.save_newsletter, ['newsletter'])
+        ]
+
+    def index_entities(self, entities_data):
+        # Acrescenta ao índice de entidades do banco as notícias analisadas pelo Agente 2 nesta execução, com as
+        # menções já calculadas (no modo incremental elas são indexadas em update_aggregates)
+        # O histórico anterior ao índice é indexado offline: python NewsStore.py --indexar-entidades
+        indexadas = self.news_store.indexar_mencoes(entities_data.get('mentions', {}))
+        logger.info(f"Índice de entidades: {indexadas} notícias indexadas")
+        return {'indexed': indexadas, 'trending': self.news_store.entidades_em_alta(limite=10)}
+
+    def observe_trends(self, summarized_themes):
+        # Alimenta os sketches de tendência com as notícias analisadas nesta execução (modo em lote); notícias
+        # já observadas em execuções anteriores são puladas pelo próprio TrendTracker
+        entity_agent = self.agents['entity_extractor']
+        items = summarized_themes['items']
+        news_list = [items[news_id] for news_ids in summarized_themes['main_themes'].values() for news_id in news_ids]
+        entidades = entity_agent.memorizar_por_noticia(news_list, entity_agent.entidades_da_noticia, registrar=False)
+        pontuacoes = self.agents['news_classifier'].pontuar_lote(news_list, registrar=False)
+        observadas = self.trends.observar(news_list, entidades, pontuacoes)
+        self.trends.salvar()
+        logger.info(f"Tendências: {observadas} notícias observadas")
+        return {'observed': observadas, 'trending': self.trends.em_alta(limite=10)}
+
+    def cluster_topics(self, standardized_data):
+        # Histórias (clusters) das notícias selecionadas pelo Agente 4
+        return self.clusterer.grupos([news_item['news_id'] for data in standardized_data['content'].values()
+                                      for news_item in data['news_items']])
+
+    def update_aggregates(self, raw_news):
+        # Analisa só as notícias que ainda não estão nos agregados e remove as que saíram da janela
+        theme_agent = self.agents['theme_summarizer']
+        entity_agent = self.agents['entity_extractor']
+        classifier = self.agents['news_classifier']
+
+        # Aceita uma lista ou um fluxo de notícias; o fluxo é consumido em lotes pequenos, sem acumular o texto
+        recebidas = novas_total = adicionadas = 0
+        with metrics.medir_etapa('aggregates.update') as registro:
+            # Com outro pontuador de categorias (modelo carregado, removido ou retreinado) a janela é pontuada
+            # de novo antes de receber as notícias novas, para não somar escalas diferentes
+            repontuadas = self.aggregates.repontuar(classifier.assinatura_pontuacao(),
+                                                    lambda items: classifier.pontuar_lote(items, registrar=False))
+            if repontuadas:
+                logger.info(f"Agregados: {repontuadas} notícias da janela pontuadas com o novo classificador")
+            stream = iter(raw_news)
+            while True:
+                lote = [NewsItem.coerce(news) for news in itertools.islice(stream, self.STREAM_BATCH_SIZE)]
+                if not lote:
+                    break
+                recebidas += len(lote)
+                novas = self.aggregates.novas(lote)
+                novas_total += len(novas)
+                temas = theme_agent.memorizar_por_noticia(novas, theme_agent.tema_da_noticia, registrar=False)
+                entidades = entity_agent.memorizar_por_noticia(novas, entity_agent.entidades_da_noticia,
+                                                               registrar=False)
+                pontuacoes = classifier.pontuar_lote(novas, registrar=False)
+                aceitas = set(self.aggregates.adicionar(list(zip(novas, temas, entidades, pontuacoes))))
+                adicionadas += len(aceitas)
+                # Os agregados não guardam as menções por notícia, então o índice de entidades é atualizado aqui
+                self.news_store.indexar_mencoes({item.url: encontradas['mentions']
+                                                 for item, encontradas in zip(novas, entidades) if item.url})
+                # Só as notícias que entraram na janela alimentam os sketches de tendência; as publicadas antes
+                # dela não voltam como novas e não seriam mais contadas nos agregados
+                posicoes = [i for i, item in enumerate(novas) if item.id in aceitas]
+                self.trends.observar([novas[i] for i in posicoes], [entidades[i] for i in posicoes],
+                                     [pontuacoes[i] for i in posicoes])
+            expiradas = self.aggregates.expirar()
+            self.trends.salvar()
+            registro['items_in'] = recebidas
+            registro['items_out'] = adicionadas
+
+        # Sem notícias novas (ex.: só republicações já descartadas) o newsletter sai dos agregados existentes
+        if not recebidas and not self.aggregates.contadores('total'):
+            raise ValueError("Nenhuma notícia encontrada")
+        logger.info(f"Agregados atualizados: {recebidas} notícias recebidas, {novas_total} analisadas, "
+                    f"{adicionadas} novas na janela, {expiradas} expiradas")
+        return self.aggregates
+
+    def analyze_stream(self, news_stream):
+        # Analisa cada notícia (tema, entidades, categorias) assim que ela chega do scraper
+        # Só a agregação final espera o fim do fluxo; o documento de cada notícia é descartado após a análise
+        theme_agent = self.agents['theme_summarizer']
+        entity_agent = self.agents['entity_extractor']
+        classifier = self.agents['news_classifier']
+
+        items, temas, entidades, pontuacoes = [], [], [], []
+        with metrics.medir_etapa('stream.analyze') as registro:
+            for news in news_stream:
+                item = NewsItem.coerce(news)
+                temas.extend(theme_agent.memorizar_por_noticia([item], theme_agent.tema_da_noticia, registrar=False))
+                entidades.extend(entity_agent.memorizar_por_noticia([item], entity_agent.entidades_da_noticia,
+                                                                    registrar=False))
+                pontuacoes.extend(classifier.pontuar_lote([item], registrar=False))
+                # Os sketches de tendência leem as palavras do documento, então a notícia é observada antes de
+                # liberá-lo; a classificação final já usa as prioridades com as notícias deste fluxo
+                self.trends.observar([item], entidades[-1:], pontuacoes[-1:])
+                item.liberar_documento()
+                items.append(item)
+            self.trends.salvar()
+            registro['items_in'] = registro['items_out'] = len(items)
+
+        if not items:
+            raise ValueError("Nenhuma notícia encontrada")
+        logger.info(f"Fluxo concluído: {len(items)} notícias analisadas")
+
+        # Agregação na mesma ordem do pipeline em lote (notícias agrupadas por tema)
+        themes = theme_agent.agregar_temas(items, temas)
+        posicao = {item.id: i for i, item in enumerate(items)}
+        ordem = [posicao[news_id] for news_ids in themes['main_themes'].values() for news_id in news_ids]
+        return {
+            'themes': themes,
+            'entities': entity_agent.agregar_entidades([entidades[i] for i in ordem], [items[i] for i in ordem]),
+            'classified': classifier.agregar_classificacao([(temas[i], items[i].id) for i in ordem],
+                                                           [pontuacoes[i] for i in ordem], themes['items'])
+        }
+
+    @staticmethod
+    def _contar(stream, stream_stats):
+        # Repassa as notícias do fluxo contando quantas passaram
+        for news in stream:
+            stream_stats['news'] += 1
+            yield news
+
     def generate_newsletter(self, predictions_data: Dict[str, Any], validated_content: Dict[str, Any]) -> str:
         # Gera HTML do newsletter final
         logger.info("Gerando HTML do newsletter final")
@@ -136,7 +374,7 @@ class EconomicNewsletterSystem:
                 newsletter_html += f"<h4>{section_name.replace('_', ' ').title()}</h4>\n"
 
                 for topic in topics[:3]:  # Limitar a 3 tópicos por seção
-                    newsletter_html += f"<p><strong>{topic['topic_title'].split(' - ')[0]}:</strong> "
+                    newsletter_html += f"<p><strong>{topic['topic_title'].rsplit(' - ', 1)[0]}:</strong> "
                     if topic.get('main_points'):
                         newsletter_html += f"{topic['main_points'][0].get('brief', '')}</p>\n"
 
@@ -0,0 +1,379 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from NewsDocument import remover_acentos
+from NewsItem import NewsItem
+from Summarizer import STOPWORDS
+
+# Palavras ignoradas, já sem acento (o texto é comparado sem acentos)
+_STOPWORDS = {remover_acentos(palavra) for palavra in STOPWORDS}
+
+# Rótulos do treino: categoria do site (noticias.categoria) -> categorias do classificador
+# Gravados no banco (classificador_rotulos) na primeira vez e editáveis pela linha de comando; categorias do site
+# sem correspondência (ex.: 'outras') ficam fora do treino
+ROTULOS_PADRAO = {
+    'mercado': ['mercado_capitais'],
+    'empresas': ['empresas_resultados'],
+    'commodities': ['commodities'],
+    'juros': ['inflacao_juros'],
+    'inflação': ['inflacao_juros'],
+    'energia': ['commodities', 'energia'],
+    'política': ['politica_fiscal'],
+    'internacional': ['cenario_externo'],
+    'tecnologia': ['tecnologia'],
+    'emprego': ['emprego']
+}
+
+# Prioridade das categorias que não têm palavras-chave no Agente 3 (as demais usam a prioridade configurada nele)
+PRIORIDADES_PADRAO = {
+    'energia': 'média',
+    'cenario_externo': 'média',
+    'tecnologia': 'baixa',
+    'emprego': 'média'
+}
+
+
+def preparar_configuracao(conn):
+    # Tabelas com os rótulos do treino e as prioridades das categorias sem palavras-chave, preenchidas com os
+    # valores padrão quando são criadas
+    existia = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                           "AND name = 'classificador_rotulos'").fetchone()
+    with conn:
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS classificador_rotulos (
+                origem TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                PRIMARY KEY (origem, categoria)
+            );
+            CREATE TABLE IF NOT EXISTS classificador_categorias (
+                categoria TEXT PRIMARY KEY,
+                prioridade TEXT NOT NULL
+            );
+        ''')
+        if not existia:
+            conn.executemany("INSERT INTO classificador_rotulos VALUES (?, ?)",
+                             [(origem, categoria) for origem, categorias in ROTULOS_PADRAO.items()
+                              for categoria in categorias])
+            conn.executemany("INSERT OR IGNORE INTO classificador_categorias VALUES (?, ?)", PRIORIDADES_PADRAO.items())
+
+
+def ler_configuracao(db_path='news.db'):
+    # ({categoria do site: [categorias]}, {categoria sem palavras-chave: prioridade}) gravados no banco
+    conn = sqlite3.connect(db_path)
+    try:
+        preparar_configuracao(conn)
+        rotulos = {}
+        for origem, categoria in conn.execute("SELECT origem, categoria FROM classificador_rotulos ORDER BY rowid"):
+            rotulos.setdefault(origem, []).append(categoria)
+        return rotulos, dict(conn.execute("SELECT categoria, prioridade FROM classificador_categorias"))
+    finally:
+        conn.close()
+
+
+def _versao(estado):
+    # Identificador do modelo salvo: muda sempre que os pesos ou a configuração mudam
+    resumo = hashlib.sha1()
+    for chave in sorted(estado):
+        valor = estado[chave]
+        resumo.update(valor.encode('utf-8') if isinstance(valor, str) else valor)
+    return resumo.hexdigest()[:12]
+
+
+class HashingClassifier:
+    # Classificador de categorias aprendido: Naive Bayes multinomial sobre termos com hashing (vocabulário de
+    # tamanho fixo, sem dicionário de palavras). Treinado offline com as notícias do banco rotuladas nas
+    # categorias do classificador (pela categoria do site de cada notícia, via classificador_rotulos) e salvo
+    # no banco; a predição de um lote inteiro é um único produto esparso entre a matriz de termos das notícias e
+    # a de pesos do modelo, então o custo por notícia não cresce com o número de palavras-chave. O modelo guarda
+    # só os pares (termo, categoria) vistos no treino: o log da probabilidade de um termo é a parte comum da
+    # categoria (termo nunca visto, em `base`) mais um ganho esparso (`pesos`) para os termos que apareceram nela
+
+    def __init__(self, dimensoes=2 ** 18, alfa=0.1, limiar=0.25, max_categorias=3):
+        self.dimensoes = dimensoes
+        # Suavização de Laplace/Lidstone das contagens
+        self.alfa = alfa
+        # Probabilidade mínima para a notícia entrar numa categoria e número máximo de categorias por notícia
+        self.limiar = limiar
+        self.max_categorias = max_categorias
+        self.categorias = []
+        # Prioridade das categorias do modelo que não têm palavras-chave no Agente 3 (lida com o modelo)
+        self.prioridades = {}
+        # Identificador dos pesos (ver _versao); None até o modelo ser salvo ou carregado
+        self.versao = None
+        # Pesos esparsos em COO ordenado por termo: termo, índice da categoria e ganho em log
+        self.termos = np.zeros(0, dtype=np.int32)
+        self.classes = np.zeros(0, dtype=np.int32)
+        self.pesos = np.zeros(0, dtype=np.float32)
+        # Por categoria: log da probabilidade de um termo nunca visto nela e log da probabilidade a priori
+        self.base = np.zeros(0)
+        self.priori = np.zeros(0)
+        # Hash de cada palavra já vista (-1 = ignorada), para não repetir acentos e CRC a cada notícia
+        self._hashes = {}
+
+    def _vetorizar(self, items):
+        # Matriz de termos das notícias em formato COO (linha, termo, peso) com tf sublinear (1 + log tf)
+        if len(self._hashes) > 500000:
+            self._hashes.clear()
+        hashes, tamanhos = [], []
+        for item in items:
+            tokens = item.doc.tokens
+            tamanhos.append(len(tokens))
+            for token in tokens:
+                codigo = self._hashes.get(token)
+                if codigo is None:
+                    codigo = self._hashes[token] = self._hash(token)
+                hashes.append(codigo)
+        hashes = np.array(hashes, dtype=np.int64)
+        linhas = np.repeat(np.arange(len(items)), tamanhos)
+        validos = hashes >= 0
+        chave, tf = np.unique(linhas[validos] * self.dimensoes + hashes[validos], return_counts=True)
+        return chave // self.dimensoes, chave % self.dimensoes, 1 + np.log(tf)
+
+    def _hash(self, token):
+        # Coluna da palavra no vocabulário com hashing, sem acento; -1 para palavras curtas, números e
+        # palavras ignoradas
+        if len(token) <= 2 or token.isdigit():
+            return -1
+        token = remover_acentos(token)
+        return -1 if token in _STOPWORDS else zlib.crc32(token.encode('utf-8')) % self.dimensoes
+
+    @classmethod
+    def treinar(cls, rotular=None, db_path='news.db', minimo=5, tamanho_lote=2000, **opcoes):
+        # Treina o modelo com as notícias do banco, lidas em lotes (o texto não fica todo em memória)
+        # rotular(item) dá a categoria da notícia, uma lista de categorias (a notícia conta em todas) ou None para
+        # deixá-la fora do treino; sem ele, os rótulos vêm da categoria do site (item.category) por
+        # classificador_rotulos. Categorias com menos de `minimo` notícias são ignoradas
+        if rotular is None:
+            mapeamento, _ = ler_configuracao(db_path)
+            rotular = lambda item: mapeamento.get(item.category)
+        modelo = cls(**opcoes)
+        indices = {}
+        documentos = Counter()
+        # Contagens acumuladas por (categoria, termo), na chave categoria * dimensoes + termo
+        chaves, contagens = np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            cursor = conn.execute("SELECT titulo, texto, categoria FROM noticias ORDER BY id")
+            while True:
+                linhas = cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                items = []
+                rotulos = []
+                for titulo, texto, categoria in linhas:
+                    item = NewsItem(url='', title=titulo, content=texto, timestamp='', source='', category=categoria)
+                    categorias = rotular(item)
+                    if isinstance(categorias, str):
+                        categorias = [categorias]
+                    categorias = list(dict.fromkeys(categorias or ()))
+                    if categorias:
+                        items.append(item)
+                        rotulos.append([indices.setdefault(categoria, len(indices)) for categoria in categorias])
+                if not items:
+                    continue
+                quantidades = np.array([len(categorias) for categorias in rotulos])
+                rotulos = np.array([indice for categorias in rotulos for indice in categorias])
+                documentos.update(rotulos.tolist())
+                numero, termos, tf = modelo._vetorizar(items)
+                # Os termos de cada notícia somam em todas as suas categorias: cada entrada é repetida uma vez por
+                # categoria da notícia (posição do primeiro rótulo da notícia + deslocamento)
+                repeticoes = quantidades[numero]
+                primeiro = (np.cumsum(quantidades) - quantidades)[numero]
+                deslocamento = np.arange(repeticoes.sum()) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+                classes = rotulos[np.repeat(primeiro, repeticoes) + deslocamento]
+                termos, tf = np.repeat(termos, repeticoes), np.repeat(tf, repeticoes)
+                chaves, inverso = np.unique(np.concatenate([chaves, classes * modelo.dimensoes + termos]),
+                                            return_inverse=True)
+                contagens = np.bincount(inverso, weights=np.concatenate([contagens, tf]), minlength=len(chaves))
+        finally:
+            conn.close()
+
+        # Só as categorias com exemplos suficientes, renumeradas na ordem em que apareceram
+        mantidas = [indice for indice in range(len(indices)) if documentos[indice] >= minimo]
+        nomes = {indice: categoria for categoria, indice in indices.items()}
+        modelo.categorias = [nomes[indice] for indice in mantidas]
+        novo_indice = np.full(len(indices), -1)
+        novo_indice[mantidas] = np.arange(len(mantidas))
+
+        classes = novo_indice[chaves // modelo.dimensoes] if len(chaves) else np.zeros(0, dtype=np.int64)
+        dentro = classes >= 0
+        classes, termos, contagens = classes[dentro], chaves[dentro] % modelo.dimensoes, contagens[dentro]
+
+        totais = np.bincount(classes, weights=contagens, minlength=len(mantidas))
+        exemplos = np.array([documentos[indice] for indice in mantidas], dtype=float)
+        modelo.base = np.log(modelo.alfa / (totais + modelo.alfa * modelo.dimensoes))
+        modelo.priori = np.log(exemplos / exemplos.sum()) if len(exemplos) else np.zeros(0)
+        # log((n + alfa) / (total + alfa * D)) = base + log((n + alfa) / alfa)
+        ordem = np.argsort(termos, kind='stable')
+        modelo.termos = termos[ordem].astype(np.int32)
+        modelo.classes = classes[ordem].astype(np.int32)
+        modelo.pesos = np.log((contagens[ordem] + modelo.alfa) / modelo.alfa).astype(np.float32)
+        return modelo
+
+    def probabilidades(self, items):
+        # Probabilidade de cada categoria para cada notícia (matriz notícias x categorias)
+        num_linhas, num_classes = len(items), len(self.categorias)
+        if not num_linhas or not num_classes:
+            return np.zeros((num_linhas, num_classes))
+        linhas, colunas, tf = self._vetorizar(items)
+
+        # Produto esparso: junção dos termos das notícias com os termos do modelo (ordenados) por searchsorted
+        inicio = np.searchsorted(self.termos, colunas, 'left')
+        quantidade = np.searchsorted(self.termos, colunas, 'right') - inicio
+        deslocamento = np.arange(quantidade.sum()) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+        indices = np.repeat(inicio, quantidade) + deslocamento
+        celulas = np.repeat(linhas, quantidade) * num_classes + self.classes[indices]
+        ganho = np.bincount(celulas, weights=np.repeat(tf, quantidade) * self.pesos[indices],
+                            minlength=num_linhas * num_classes).reshape(num_linhas, num_classes)
+
+        comprimento = np.bincount(linhas, weights=tf, minlength=num_linhas)
+        log_conjunta = self.priori + comprimento[:, None] * self.base + ganho
+        log_conjunta -= log_conjunta.max(axis=1, keepdims=True)
+        probabilidades = np.exp(log_conjunta)
+        return probabilidades / probabilidades.sum(axis=1, keepdims=True)
+
+    def pontuar(self, items):
+        # Categorias de cada notícia no formato de Agent3.pontuar_noticia: {categoria: pontuação}, com a
+        # probabilidade em pontos percentuais; entram as até max_categorias categorias acima do limiar
+        probabilidades = self.probabilidades(items)
+        melhores = np.argsort(-probabilidades, axis=1, kind='stable')[:, :self.max_categorias]
+        percentuais = np.rint(np.take_along_axis(probabilidades, melhores, axis=1) * 100).astype(int).tolist()
+        acima = (np.take_along_axis(probabilidades, melhores, axis=1) >= self.limiar).tolist()
+        return [{self.categorias[indice]: percentual
+                 for indice, percentual, entra in zip(linha, percentuais_linha, acima_linha) if entra}
+                for linha, percentuais_linha, acima_linha in zip(melhores.tolist(), percentuais, acima)]
+
+    def _estado(self):
+        # Modelo serializado, como é gravado no banco
+        return {
+            'config': json.dumps({'dimensoes': self.dimensoes, 'alfa': self.alfa, 'limiar': self.limiar,
+                                  'max_categorias': self.max_categorias, 'categorias': self.categorias},
+                                 ensure_ascii=False),
+            'termos': self.termos.tobytes(),
+            'classes': self.classes.tobytes(),
+            'pesos': self.pesos.tobytes(),
+            'base': self.base.tobytes(),
+            'priori': self.priori.tobytes()
+        }
+
+    def salvar(self, db_path='news.db'):
+        # Grava o modelo no banco, substituindo o anterior
+        estado = self._estado()
+        self.versao = _versao(estado)
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS classificador_modelo (
+                        chave TEXT PRIMARY KEY,
+                        valor BLOB NOT NULL
+                    )
+                ''')
+                conn.execute("DELETE FROM classificador_modelo")
+                conn.executemany("INSERT INTO classificador_modelo VALUES (?, ?)", estado.items())
+        finally:
+            conn.close()
+
+    @classmethod
+    def carregar(cls, db_path='news.db', categorias=None):
+        # Lê o modelo salvo no banco, com a prioridade configurada das categorias; retorna None se nenhum modelo
+        # foi treinado
+        # Com `categorias` (as do Agente 3), recusa com ValueError um modelo que prevê categorias que não estão
+        # nelas nem têm prioridade em classificador_categorias
+        conn = sqlite3.connect(db_path)
+        try:
+            existe = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                                  "AND name = 'classificador_modelo'").fetchone()
+            estado = dict(conn.execute("SELECT chave, valor FROM classificador_modelo")) if existe else {}
+        finally:
+            conn.close()
+        if 'config' not in estado:
+            return None
+
+        config = json.loads(estado['config'])
+        _, prioridades = ler_configuracao(db_path)
+        desconhecidas = [categoria for categoria in config['categorias']
+                         if categorias is not None and categoria not in categorias and categoria not in prioridades]
+        if desconhecidas:
+            raise ValueError(f"Modelo com categorias sem prioridade configurada: {', '.join(desconhecidas)}; "
+                             f"defina-a com python HashingClassifier.py --prioridade categoria=nível")
+        modelo = cls(config['dimensoes'], config['alfa'], config['limiar'], config['max_categorias'])
+        modelo.categorias = config['categorias']
+        modelo.prioridades = {categoria: prioridades[categoria] for categoria in modelo.categorias
+                              if categoria in prioridades}
+        modelo.versao = _versao(estado)
+        modelo.termos = np.frombuffer(estado['termos'], dtype=np.int32)
+        modelo.classes = np.frombuffer(estado['classes'], dtype=np.int32)
+        modelo.pesos = np.frombuffer(estado['pesos'], dtype=np.float32)
+        modelo.base = np.frombuffer(estado['base'], dtype=np.float64)
+        modelo.priori = np.frombuffer(estado['priori'], dtype=np.float64)
+        return modelo
+
+
+def main():
+    # Treino offline: python HashingClassifier.py [--db news.db] [--minimo 5] [--rotulo origem=categoria,...]
+    # [--prioridade categoria=nível]
+    # O rótulo de cada notícia vem da categoria do site (noticias.categoria) pelo mapeamento classificador_rotulos;
+    # --rotulo e --prioridade alteram o mapeamento e as prioridades gravados no banco antes do treino
+    from Agents.Agent3_NewsClassifier import Agent3_NewsClassifier
+
+    parser = argparse.ArgumentParser(description="Treina o classificador de categorias com as notícias do banco")
+    parser.add_argument('--db', default='news.db', help="banco com a tabela noticias (o modelo é salvo nele)")
+    parser.add_argument('--minimo', type=int, default=5, help="mínimo de notícias para manter uma categoria")
+    parser.add_argument('--limiar', type=float, default=0.25, help="probabilidade mínima para atribuir a categoria")
+    parser.add_argument('--rotulo', action='append', default=[], metavar='ORIGEM=CATEGORIA[,CATEGORIA]',
+                        help="categorias do classificador de uma categoria do site (vazio deixa-a fora do treino)")
+    parser.add_argument('--prioridade', action='append', default=[], metavar='CATEGORIA=NÍVEL',
+                        help="prioridade (baixa, média ou alta) de uma categoria sem palavras-chave no Agente 3")
+    args = parser.parse_args()
+
+    classificador = Agent3_NewsClassifier()
+    rotulos, prioridades = [], []
+    for valor in args.rotulo:
+        origem, _, categorias = valor.partition('=')
+        rotulos.append((origem.strip(), [categoria.strip() for categoria in categorias.split(',')
+                                         if categoria.strip()]))
+    for valor in args.prioridade:
+        categoria, _, nivel = valor.partition('=')
+        if nivel.strip() not in classificador.PRIORITY_LEVELS:
+            parser.error(f"prioridade inválida para {categoria}: {nivel!r} "
+                         f"(use {', '.join(classificador.PRIORITY_LEVELS)})")
+        prioridades.append((categoria.strip(), nivel.strip()))
+
+    conn = sqlite3.connect(args.db)
+    try:
+        preparar_configuracao(conn)
+        with conn:
+            for origem, categorias in rotulos:
+                conn.execute("DELETE FROM classificador_rotulos WHERE origem = ?", (origem,))
+                conn.executemany("INSERT INTO classificador_rotulos VALUES (?, ?)",
+                                 [(origem, categoria) for categoria in categorias])
+            conn.executemany("INSERT OR REPLACE INTO classificador_categorias VALUES (?, ?)", prioridades)
+    finally:
+        conn.close()
+
+    modelo = HashingClassifier.treinar(db_path=args.db, minimo=args.minimo, limiar=args.limiar)
+    if not modelo.categorias:
+        print("Nenhuma categoria com notícias rotuladas suficientes; modelo não salvo")
+        return
+    _, configuradas = ler_configuracao(args.db)
+    sem_prioridade = [categoria for categoria in modelo.categorias
+                      if categoria not in classificador.current_categories and categoria not in configuradas]
+    if sem_prioridade:
+        print(f"Categorias sem palavras-chave nem prioridade configurada: {', '.join(sem_prioridade)}; "
+              f"defina-as com --prioridade categoria=nível. Modelo não salvo")
+        return
+    modelo.salvar(args.db)
+    print(f"Modelo salvo com {len(modelo.categorias)} categorias e {len(modelo.pesos)} pesos: "
+          f"{', '.join(modelo.categorias)}")
+
+
+if __name__ == "__main__":
+    main()
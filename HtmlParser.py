@@ -0,0 +1,202 @@
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+
+# Ordem de preferência dos backends, do mais rápido para o mais lento
+BACKENDS = ['selectolax', 'lxml', 'html.parser']
+
+# Blocos que nunca contêm título, texto ou data da notícia; removidos antes do parsing em todos os backends
+BLOCOS_IGNORADOS = ('script', 'style', 'noscript', 'svg', 'template', 'head')
+_ABERTURA = re.compile(r'<(' + '|'.join(BLOCOS_IGNORADOS) + r')\b', re.IGNORECASE)
+_FECHAMENTO = {tag: re.compile(rf'</{tag}\s*>', re.IGNORECASE) for tag in BLOCOS_IGNORADOS}
+
+
+def remover_blocos_ignorados(html):
+    # Corta os blocos ignorados procurando a abertura e depois só o fechamento da mesma tag, sem casar o conteúdo
+    # caractere a caractere (um único regex com .*? custava mais que o parsing inteiro no selectolax e no lxml)
+    partes = []
+    posicao = 0
+    while True:
+        abertura = _ABERTURA.search(html, posicao)
+        if abertura is None:
+            break
+        fechamento = _FECHAMENTO[abertura.group(1).lower()].search(html, abertura.end())
+        if fechamento is None:
+            # Bloco sem fechamento: mantém o texto e segue procurando
+            partes.append(html[posicao:abertura.end()])
+        else:
+            partes.append(html[posicao:abertura.start()])
+        posicao = fechamento.end() if fechamento is not None else abertura.end()
+    partes.append(html[posicao:])
+    return ''.join(partes)
+
+
+def backends_disponiveis():
+    # Lista os backends cujas bibliotecas estão instaladas
+    disponiveis = []
+    if LexborHTMLParser is not None:
+        disponiveis.append('selectolax')
+    if lxml is not None:
+        disponiveis.append('lxml')
+    disponiveis.append('html.parser')
+    return disponiveis
+
+
+class HtmlParser:
+    # Extrai apenas título, parágrafos e data das notícias usando o backend mais rápido disponível
+
+    def __init__(self, backend=None):
+        disponiveis = backends_disponiveis()
+        if backend is None:
+            backend = disponiveis[0]
+        elif backend not in disponiveis:
+            print(f"Backend '{backend}' indisponível, usando '{disponiveis[0]}'")
+            backend = disponiveis[0]
+        self.backend = backend
+
+    def extrair_artigo(self, html):
+        # Retorna título, conteúdo e data de publicação de uma página de notícia
+        # Parsing direcionado: scripts, estilos e o <head> são descartados antes de montar a árvore
+        html = remover_blocos_ignorados(html)
+        if self.backend == 'selectolax':
+            return self._artigo_selectolax(html)
+        if self.backend == 'lxml':
+            return self._artigo_lxml(html)
+        return self._artigo_bs4(html)
+
+    def extrair_links(self, html):
+        # Retorna os pares título/URL encontrados na página de listagem
+        if self.backend == 'selectolax':
+            return self._links_selectolax(html)
+        if self.backend == 'lxml':
+            return self._links_lxml(html)
+        return self._links_bs4(html)
+
+    def _montar_artigo(self, title_text, paragraphs, date):
+        return {
+            'title': title_text if title_text is not None else "Título não encontrado",
+            'content': " ".join([p for p in paragraphs if p]),
+            'date': date if date is not None else "Data não encontrada"
+        }
+
+    def _artigo_bs4(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+
+        title = soup.find('h1')
+        content_div = soup.find('div', class_='post__content') or soup.find('article')
+        paragraphs = [p.get_text(strip=True) for p in content_div.find_all('p')] if content_div else []
+        date_element = soup.find('time')
+        date = date_element['datetime'] if date_element and date_element.has_attr('datetime') else None
+
+        return self._montar_artigo(title.get_text(strip=True) if title else None, paragraphs, date)
+
+    def _artigo_lxml(self, html):
+        root = lxml.html.fromstring(html)
+
+        title = next(root.iter('h1'), None)
+        content_div = next(iter(root.xpath(
+            "//div[contains(concat(' ', normalize-space(@class), ' '), ' post__content ')]")), None)
+        if content_div is None:
+            content_div = next(root.iter('article'), None)
+        paragraphs = [self._texto_lxml(p) for p in content_div.iter('p')] if content_div is not None else []
+        date_element = next(root.iter('time'), None)
+        date = date_element.get('datetime') if date_element is not None else None
+
+        return self._montar_artigo(self._texto_lxml(title) if title is not None else None, paragraphs, date)
+
+    def _artigo_selectolax(self, html):
+        tree = LexborHTMLParser(html)
+
+        title = tree.css_first('h1')
+        content_div = tree.css_first('div.post__content') or tree.css_first('article')
+        paragraphs = [self._texto_selectolax(p) for p in content_div.css('p')] if content_div else []
+        date_element = tree.css_first('time')
+        date = date_element.attributes.get('datetime') if date_element else None
+
+        return self._montar_artigo(self._texto_selectolax(title) if title else None, paragraphs, date)
+
+    def _links_bs4(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Estratégia 1: Procurar por elementos de notícia em <article>
+        news_items = []
+        for article in soup.find_all('article'):
+            link = article.find('a', href=True)
+            if link and link['href']:
+                title = article.find(['h2', 'h3', 'h4'])
+                if title:
+                    news_items.append({'title': title.get_text(strip=True), 'url': link['href']})
+
+        # Estratégia 2: Procurar por títulos que parecem notícias
+        if len(news_items) < 5:
+            for heading in soup.find_all(['h2', 'h3', 'h4']):
+                text = heading.get_text(strip=True)
+                if text and len(text) > 20:
+                    parent_link = heading.find_parent('a', href=True)
+                    if parent_link and parent_link['href']:
+                        news_items.append({'title': text, 'url': parent_link['href']})
+
+        return news_items
+
+    def _links_lxml(self, html):
+        root = lxml.html.fromstring(html)
+
+        news_items = []
+        for article in root.iter('article'):
+            link = next((a for a in article.iter('a') if a.get('href') is not None), None)
+            if link is not None and link.get('href'):
+                title = next(article.iter('h2', 'h3', 'h4'), None)
+                if title is not None:
+                    news_items.append({'title': self._texto_lxml(title), 'url': link.get('href')})
+
+        if len(news_items) < 5:
+            for heading in root.iter('h2', 'h3', 'h4'):
+                text = self._texto_lxml(heading)
+                if text and len(text) > 20:
+                    parent_link = next((a for a in heading.iterancestors('a') if a.get('href') is not None), None)
+                    if parent_link is not None and parent_link.get('href'):
+                        news_items.append({'title': text, 'url': parent_link.get('href')})
+
+        return news_items
+
+    def _links_selectolax(self, html):
+        tree = LexborHTMLParser(html)
+
+        news_items = []
+        for article in tree.css('article'):
+            link = article.css_first('a[href]')
+            if link and link.attributes.get('href'):
+                title = article.css_first('h2, h3, h4')
+                if title:
+                    news_items.append({'title': self._texto_selectolax(title), 'url': link.attributes['href']})
+
+        if len(news_items) < 5:
+            for heading in tree.css('h2, h3, h4'):
+                text = self._texto_selectolax(heading)
+                if text and len(text) > 20:
+                    parent_link = heading.parent
+                    while parent_link is not None and not (parent_link.tag == 'a' and 'href' in parent_link.attributes):
+                        parent_link = parent_link.parent
+                    if parent_link is not None and parent_link.attributes.get('href'):
+                        news_items.append({'title': text, 'url': parent_link.attributes['href']})
+
+        return news_items
+
+    def _texto_lxml(self, element):
+        # Equivalente a get_text(strip=True) do BeautifulSoup
+        return "".join(text.strip() for text in element.itertext())
+
+    def _texto_selectolax(self, node):
+        # Equivalente a get_text(strip=True) do BeautifulSoup
+        return node.text(deep=True, separator='', strip=True)
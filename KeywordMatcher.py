@@ -0,0 +1,141 @@
+﻿import threading
+from collections import Counter, deque
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    # Autômato de Aho-Corasick compartilhado por todos os classificadores de palavras-chave
+    # Encontra todas as ocorrências de todos os termos (inclusive sobrepostas) em uma única passada,
+    # com custo proporcional ao tamanho do texto e não ao número de termos
+
+    def __init__(self):
+        # grupo -> rótulo -> lista de termos (a multiplicidade da lista é preservada na contagem)
+        self._dicionarios = {}
+        # (autômato, tags) montados juntos a partir dos dicionários; tags é termo -> lista de (grupo, rótulo)
+        # Trocados numa única atribuição, então quem lê nunca combina o autômato de uma versão com as tags de outra
+        self._indice = None
+        # Incrementada a cada mudança nos dicionários; permite invalidar ocorrências guardadas
+        self.versao = 0
+        self._lock = threading.Lock()
+
+    def registrar(self, grupo, dicionario):
+        # Registra (ou substitui) um dicionário rótulo -> palavras-chave; o autômato é refeito sob demanda
+        with self._lock:
+            novo = {rotulo: [termo.lower() for termo in termos] for rotulo, termos in dicionario.items()}
+            if self._dicionarios.get(grupo) != novo:
+                self._dicionarios[grupo] = novo
+                self._indice = None
+                self.versao += 1
+
+    def buscar(self, texto):
+        # Retorna todas as ocorrências como (posição inicial, termo), em ordem de término no texto
+        automato, _ = self._atual()
+        if ahocorasick is not None:
+            return [(fim - len(termo) + 1, termo) for fim, termo in automato.iter(texto)]
+
+        goto, fail, saida = automato
+        ocorrencias = []
+        estado = 0
+        for i, ch in enumerate(texto):
+            while estado and ch not in goto[estado]:
+                estado = fail[estado]
+            estado = goto[estado].get(ch, 0)
+            if saida[estado]:
+                for termo in saida[estado]:
+                    ocorrencias.append((i - len(termo) + 1, termo))
+        return ocorrencias
+
+    def agrupar(self, ocorrencias, grupo):
+        # Conta, por rótulo do grupo, quantas palavras-chave da sua lista apareceram no texto
+        _, tags = self._atual()
+        contagem = Counter()
+        for termo in {termo for _, termo in ocorrencias}:
+            for grupo_termo, rotulo in tags.get(termo, ()):
+                if grupo_termo == grupo:
+                    contagem[rotulo] += 1
+        return contagem
+
+    def contar(self, ocorrencias, grupo):
+        # Conta, por rótulo do grupo, todas as ocorrências das suas palavras-chave no texto (com repetição)
+        _, tags = self._atual()
+        contagem = Counter()
+        for _, termo in ocorrencias:
+            for grupo_termo, rotulo in tags.get(termo, ()):
+                if grupo_termo == grupo:
+                    contagem[rotulo] += 1
+        return contagem
+
+    def _atual(self):
+        # (autômato, tags) da versão atual dos dicionários, montados se algum dicionário mudou
+        indice = self._indice
+        return indice if indice is not None else self._construir()
+
+    def _construir(self):
+        # Monta o autômato e as tags a partir de todos os dicionários registrados
+        with self._lock:
+            if self._indice is not None:
+                return self._indice
+
+            tags = {}
+            for grupo, dicionario in self._dicionarios.items():
+                for rotulo, termos in dicionario.items():
+                    for termo in termos:
+                        tags.setdefault(termo, []).append((grupo, rotulo))
+
+            if ahocorasick is not None:
+                automato = ahocorasick.Automaton()
+                for termo in tags:
+                    automato.add_word(termo, termo)
+                if tags:
+                    automato.make_automaton()
+                else:
+                    automato = _AutomatoVazio()
+            else:
+                automato = self._construir_python(tags)
+
+            self._indice = (automato, tags)
+            return self._indice
+
+    def _construir_python(self, tags):
+        # Implementação em Python puro: trie + links de falha calculados em largura
+        goto, fail, saida = [{}], [0], [[]]
+        for termo in tags:
+            estado = 0
+            for ch in termo:
+                proximo = goto[estado].get(ch)
+                if proximo is None:
+                    proximo = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    saida.append([])
+                    goto[estado][ch] = proximo
+                estado = proximo
+            saida[estado].append(termo)
+
+        fila = deque(goto[0].values())
+        while fila:
+            estado = fila.popleft()
+            for ch, proximo in goto[estado].items():
+                fila.append(proximo)
+                falha = fail[estado]
+                while falha and ch not in goto[falha]:
+                    falha = fail[falha]
+                destino = goto[falha].get(ch, 0)
+                fail[proximo] = destino if destino != proximo else 0
+                saida[proximo] = saida[proximo] + saida[fail[proximo]]
+
+        return goto, fail, saida
+
+
+class _AutomatoVazio:
+    # pyahocorasick não aceita iter() antes de make_automaton; sem termos não há ocorrências
+    def iter(self, texto):
+        return iter(())
+
+
+# Instância única compartilhada pelo scraper e pelos agentes
+keyword_matcher = KeywordMatcher()
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class MetricsRegistry:
+    # Coleta métricas de cada estágio (agentes e scraper) e de cada requisição HTTP de uma execução
+    # Exporta um relatório JSON e um arquivo no formato texto do Prometheus
+
+    def __init__(self, rastrear_memoria=None):
+        # O rastreamento de memória (tracemalloc) deixa o processo várias vezes mais lento, então só é ligado
+        # por parâmetro ou pela variável de ambiente NEWSLETTER_TRACE_MEMORY=1
+        if rastrear_memoria is None:
+            rastrear_memoria = os.environ.get('NEWSLETTER_TRACE_MEMORY', '') == '1'
+        self.rastrear_memoria = rastrear_memoria
+        self._lock = threading.Lock()
+        self.stages = []
+        self.http_requests = []
+        # Estágios em andamento (cada um marcado se teve o processo só para si) e se o tracemalloc foi ligado aqui
+        self._ativos = []
+        self._iniciou_rastreamento = False
+
+    def reiniciar(self):
+        # Descarta as métricas da execução anterior
+        with self._lock:
+            self.stages = []
+            self.http_requests = []
+
+    @contextmanager
+    def medir_etapa(self, nome, items_in=0):
+        # Mede tempo de parede, tempo de CPU da thread e, com rastrear_memoria, o pico de memória alocada
+        # O pico do tracemalloc é do processo inteiro: só é informado para estágios que não se sobrepuseram a
+        # nenhum outro (em paralelo ou aninhado); nos demais peak_memory_bytes fica None
+        registro = {'stage': nome, 'items_in': items_in, 'items_out': 0, 'status': 'ok'}
+        estado = {'sozinho': True, 'memoria_inicial': 0}
+        if self.rastrear_memoria:
+            with self._lock:
+                if not self._ativos and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._iniciou_rastreamento = True
+                if self._ativos:
+                    estado['sozinho'] = False
+                    for outro in self._ativos:
+                        outro['sozinho'] = False
+                else:
+                    tracemalloc.reset_peak()
+                    estado['memoria_inicial'] = tracemalloc.get_traced_memory()[0]
+                self._ativos.append(estado)
+
+        inicio_parede = time.perf_counter()
+        inicio_cpu = time.thread_time()
+        try:
+            yield registro
+        except Exception:
+            registro['status'] = 'error'
+            raise
+        finally:
+            registro['wall_seconds'] = time.perf_counter() - inicio_parede
+            registro['cpu_seconds'] = time.thread_time() - inicio_cpu
+            registro['peak_memory_bytes'] = None
+            registro['finished_at'] = datetime.now().isoformat()
+            with self._lock:
+                if estado in self._ativos:
+                    if estado['sozinho']:
+                        registro['peak_memory_bytes'] = max(
+                            tracemalloc.get_traced_memory()[1] - estado['memoria_inicial'], 0)
+                    self._ativos.remove(estado)
+                    # O último estágio a terminar desliga o rastreamento que o primeiro ligou
+                    if not self._ativos and self._iniciou_rastreamento:
+                        tracemalloc.stop()
+                        self._iniciou_rastreamento = False
+                self.stages.append(registro)
+
+    def registrar_http(self, url, wall_seconds, status_code, tamanho, from_cache):
+        # Registra uma requisição HTTP (ou uma resposta servida pelo cache)
+        with self._lock:
+            self.http_requests.append({
+                'url': url,
+                'wall_seconds': wall_seconds,
+                'status_code': status_code,
+                'bytes': tamanho,
+                'from_cache': from_cache
+            })
+
+    def relatorio(self):
+        # Relatório estruturado da execução, com totais por estágio
+        with self._lock:
+            stages = list(self.stages)
+            http_requests = list(self.http_requests)
+
+        totais = {}
+        for registro in stages:
+            total = totais.setdefault(registro['stage'], {
+                'calls': 0, 'errors': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                'items_in': 0, 'items_out': 0, 'peak_memory_bytes': None
+            })
+            total['calls'] += 1
+            total['errors'] += registro['status'] != 'ok'
+            total['wall_seconds'] += registro['wall_seconds']
+            total['cpu_seconds'] += registro['cpu_seconds']
+            total['items_in'] += registro['items_in']
+            total['items_out'] += registro['items_out']
+            if registro['peak_memory_bytes'] is not None:
+                total['peak_memory_bytes'] = max(total['peak_memory_bytes'] or 0, registro['peak_memory_bytes'])
+
+        for total in totais.values():
+            total['items_per_second'] = total['items_in'] / total['wall_seconds'] if total['wall_seconds'] else 0.0
+
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'stage_totals': totais,
+            'stages': stages,
+            'http': {
+                'requests': len(http_requests),
+                'cache_hits': sum(1 for r in http_requests if r['from_cache']),
+                'wall_seconds': sum(r['wall_seconds'] for r in http_requests),
+                'bytes': sum(r['bytes'] for r in http_requests),
+                'errors': sum(1 for r in http_requests if r['status_code'] is None or r['status_code'] >= 400),
+                'details': http_requests
+            }
+        }
+
+    def formato_prometheus(self, relatorio=None):
+        # Converte o relatório para o formato texto de exposição do Prometheus
+        relatorio = relatorio or self.relatorio()
+        metricas = [
+            ('newsletter_stage_wall_seconds', 'Tempo de parede por estágio', 'wall_seconds'),
+            ('newsletter_stage_cpu_seconds', 'Tempo de CPU por estágio', 'cpu_seconds'),
+            ('newsletter_stage_items_in', 'Itens recebidos por estágio', 'items_in'),
+            ('newsletter_stage_items_out', 'Itens produzidos por estágio', 'items_out'),
+            ('newsletter_stage_peak_memory_bytes', 'Pico de memória alocada por estágio', 'peak_memory_bytes'),
+            ('newsletter_stage_errors', 'Execuções com erro por estágio', 'errors'),
+        ]
+
+        linhas = []
+        for nome, descricao, campo in metricas:
+            linhas.append(f"# HELP {nome} {descricao}")
+            linhas.append(f"# TYPE {nome} gauge")
+            for stage, total in sorted(relatorio['stage_totals'].items()):
+                # Estágios sem medição (pico de memória não rastreado ou sobreposto) ficam sem amostra
+                if total[campo] is not None:
+                    linhas.append(f'{nome}{{stage="{stage}"}} {total[campo]}')
+
+        http = relatorio['http']
+        for nome, descricao, valor in [
+            ('newsletter_http_requests', 'Requisições HTTP na execução', http['requests']),
+            ('newsletter_http_cache_hits', 'Respostas servidas pelo cache HTTP', http['cache_hits']),
+            ('newsletter_http_errors', 'Requisições HTTP com erro', http['errors']),
+            ('newsletter_http_wall_seconds', 'Tempo total gasto em requisições HTTP', http['wall_seconds']),
+            ('newsletter_http_bytes', 'Bytes recebidos por HTTP', http['bytes']),
+        ]:
+            linhas.append(f"# HELP {nome} {descricao}")
+            linhas.append(f"# TYPE {nome} gauge")
+            linhas.append(f"{nome} {valor}")
+
+        return "\n".join(linhas) + "\n"
+
+    def exportar(self, diretorio='metrics'):
+        # Salva o relatório JSON e o arquivo .prom (sobrescrito a cada execução, para o node_exporter)
+        os.makedirs(diretorio, exist_ok=True)
+        relatorio = self.relatorio()
+
+        json_path = os.path.join(diretorio, 'pipeline_metrics.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+        # Escrita atômica: o coletor nunca lê um arquivo .prom pela metade
+        prom_path = os.path.join(diretorio, 'pipeline_metrics.prom')
+        with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.formato_prometheus(relatorio))
+        os.replace(prom_path + '.tmp', prom_path)
+
+        return json_path, prom_path
+
+
+# Instância única compartilhada pelo scraper e pelos agentes
+metrics = MetricsRegistry()
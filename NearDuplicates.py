@@ -0,0 +1,142 @@
+import hashlib
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+from NewsDocument import TOKEN_PATTERN, remover_acentos
+from NewsItem import NewsItem
+
+# Maior primo abaixo de 2^32: (a * h + b) mod PRIMO com a, h < 2^32 cabe em 64 bits sem estouro
+PRIMO = np.uint64(4294967291)
+
+
+class NearDuplicateDetector:
+    # Detecta quase-duplicatas (matérias replicadas, atualizações de ao vivo, republicações com outra URL)
+    # com shingles de palavras + MinHash; o índice LSH por bandas fica no banco, ao lado de noticias,
+    # e cada notícia nova é comparada só com as candidatas que colidem em alguma banda
+
+    def __init__(self, db_path='news.db', num_perm=128, bandas=16, limiar=0.8, tamanho_shingle=5, semente=1):
+        if num_perm % bandas:
+            raise ValueError("num_perm deve ser múltiplo de bandas")
+        self.num_perm = num_perm
+        self.bandas = bandas
+        self.linhas_por_banda = num_perm // bandas
+        self.limiar = limiar
+        self.tamanho_shingle = tamanho_shingle
+        # Notícias descartadas como duplicatas desde a criação do detector
+        self.descartadas = 0
+
+        gerador = np.random.RandomState(semente)
+        self._a = gerador.randint(1, int(PRIMO), num_perm, dtype=np.uint64)
+        self._b = gerador.randint(0, int(PRIMO), num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Um commit por notícia: com o banco em WAL (ativado pelo NewsWriter), synchronous=NORMAL
+        # evita um fsync a cada commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_database()
+
+    def _create_database(self):
+        # Assinatura, notícia canônica e URL de cada notícia vista, e o índice LSH (banda, chave) -> notícia
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS duplicatas_assinaturas (
+                news_id TEXT PRIMARY KEY,
+                canonica TEXT NOT NULL,
+                assinatura BLOB NOT NULL,
+                url TEXT
+            );
+            CREATE TABLE IF NOT EXISTS duplicatas_bandas (
+                banda INTEGER NOT NULL,
+                chave INTEGER NOT NULL,
+                news_id TEXT NOT NULL,
+                PRIMARY KEY (banda, chave, news_id)
+            ) WITHOUT ROWID;
+        ''')
+        colunas = [row[1] for row in self.conn.execute("PRAGMA table_info(duplicatas_assinaturas)")]
+        if 'url' not in colunas:
+            self.conn.execute("ALTER TABLE duplicatas_assinaturas ADD COLUMN url TEXT")
+        self.conn.commit()
+
+    def assinatura(self, item):
+        # Assinatura MinHash do conteúdo (sem título, que costuma mudar entre republicações)
+        tokens = TOKEN_PATTERN.findall(remover_acentos(item.content.lower()))
+        k = self.tamanho_shingle
+        shingles = {' '.join(tokens[i:i + k]) for i in range(max(len(tokens) - k + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles)) % PRIMO
+        # Uma função de hash universal (a * h + b) mod PRIMO por permutação; o mínimo de cada uma é a assinatura
+        return ((np.outer(hashes, self._a) + self._b) % PRIMO).min(axis=0).astype(np.uint32)
+
+    def _chaves_bandas(self, assinatura):
+        # Uma chave de 64 bits por banda de linhas_por_banda valores da assinatura
+        r = self.linhas_por_banda
+        return [(banda, int.from_bytes(hashlib.blake2b(assinatura[banda * r:(banda + 1) * r].tobytes(),
+                                                       digest_size=8).digest(), 'big', signed=True))
+                for banda in range(self.bandas)]
+
+    def canonica(self, item):
+        # Retorna o id da notícia canônica do grupo da notícia, registrando-a no índice se for nova
+        with self._lock:
+            row = self.conn.execute("SELECT canonica FROM duplicatas_assinaturas WHERE news_id = ?",
+                                    (item.id,)).fetchone()
+            if row:
+                return row[0]
+
+            assinatura = self.assinatura(item)
+            chaves = self._chaves_bandas(assinatura)
+            placeholders = ", ".join("(?, ?)" for _ in chaves)
+            # Busca pela chave primária (banda, chave): o custo depende das colisões, não do tamanho do histórico
+            candidatas = self.conn.execute(
+                f"""WITH chaves (banda, chave) AS (VALUES {placeholders})
+                SELECT a.news_id, a.canonica, a.assinatura FROM duplicatas_assinaturas a
+                WHERE a.news_id IN (SELECT b.news_id FROM chaves
+                                    JOIN duplicatas_bandas b ON b.banda = chaves.banda AND b.chave = chaves.chave)""",
+                [valor for chave in chaves for valor in chave]
+            ).fetchall()
+
+            # Confirma as candidatas pela similaridade de Jaccard estimada (fração de valores iguais)
+            canonica, melhor = item.id, self.limiar
+            for _, canonica_candidata, blob in candidatas:
+                similaridade = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == assinatura))
+                if similaridade >= melhor:
+                    canonica, melhor = canonica_candidata, similaridade
+
+            with self.conn:
+                self.conn.execute("INSERT INTO duplicatas_assinaturas VALUES (?, ?, ?, ?)",
+                                  (item.id, canonica, assinatura.tobytes(), item.url))
+                self.conn.executemany("INSERT OR IGNORE INTO duplicatas_bandas VALUES (?, ?, ?)",
+                                      [(banda, chave, item.id) for banda, chave in chaves])
+            return canonica
+
+    def armazenada(self, news_id):
+        # Se a notícia ainda está no banco: na tabela noticias (pela URL registrada) ou nos agregados
+        with self._lock:
+            tabelas = {row[0] for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('noticias', 'agregado_noticias')")}
+            row = self.conn.execute("SELECT url FROM duplicatas_assinaturas WHERE news_id = ?", (news_id,)).fetchone()
+            if 'noticias' in tabelas and row and row[0] is not None and self.conn.execute(
+                    "SELECT 1 FROM noticias WHERE url = ?", (row[0],)).fetchone():
+                return True
+            return 'agregado_noticias' in tabelas and self.conn.execute(
+                "SELECT 1 FROM agregado_noticias WHERE news_id = ?", (news_id,)).fetchone() is not None
+
+    def filtrar(self, items):
+        # Gera só a primeira notícia de cada grupo de quase-duplicatas; as demais são descartadas
+        # Também descarta a republicação de uma notícia de execuções anteriores que ainda está no banco
+        # Aceita lista ou fluxo de notícias (o modo streaming filtra à medida que elas chegam)
+        vistas = set()
+        for news in items:
+            item = NewsItem.coerce(news)
+            canonica = self.canonica(item)
+            if canonica in vistas or (canonica != item.id and self.armazenada(canonica)):
+                self.descartadas += 1
+                continue
+            vistas.add(canonica)
+            yield item
+
+    def close(self):
+        # Fecha a conexão com o índice de assinaturas
+        self.conn.close()
@@ -0,0 +1,352 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from NewsItem import NewsItem
+from NewsStore import epoch_publicacao
+from ValueExtractor import value_extractor
+
+
+class NewsAggregates:
+    # Agregados persistidos do modo incremental: contagens por tema e categoria, relevância e entidades
+    # Cada notícia entra uma única vez (adicionar) e sai quando expira da janela (remover), ajustando os contadores
+    # O custo de uma execução depende só das notícias novas, não do tamanho da janela
+    # A janela termina na notícia mais recente (limitada ao instante atual), não no relógio: um histórico antigo
+    # também tem janela; o texto das notícias não é copiado, vem da tabela noticias pela URL
+
+    def __init__(self, db_path='news.db', janela_dias=7):
+        self.janela_dias = janela_dias
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_database()
+
+    def _create_database(self):
+        # Notícias dentro da janela, sua pontuação por categoria e os contadores agregados
+        # agregado_ignoradas guarda as notícias analisadas que já chegaram fora da janela, para não analisá-las
+        # de novo a cada execução
+        colunas = [row[1] for row in self.conn.execute("PRAGMA table_info(agregado_noticias)")]
+        if 'texto' in colunas:
+            # Versão anterior guardava uma cópia do título e do texto; a migração mantém só a chave
+            self.conn.executescript('''
+                CREATE TABLE agregado_noticias_nova (
+                    news_id TEXT PRIMARY KEY,
+                    url TEXT,
+                    publicado_em REAL NOT NULL,
+                    tema TEXT NOT NULL,
+                    entidades TEXT NOT NULL
+                );
+                INSERT INTO agregado_noticias_nova
+                    SELECT news_id, url, publicado_em, tema, entidades FROM agregado_noticias ORDER BY rowid;
+                DROP TABLE agregado_noticias;
+                ALTER TABLE agregado_noticias_nova RENAME TO agregado_noticias;
+            ''')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS agregado_noticias (
+                news_id TEXT PRIMARY KEY,
+                url TEXT,
+                publicado_em REAL NOT NULL,
+                tema TEXT NOT NULL,
+                entidades TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_agregado_noticias_publicado ON agregado_noticias (publicado_em);
+
+            CREATE TABLE IF NOT EXISTS agregado_ignoradas (
+                news_id TEXT PRIMARY KEY,
+                publicado_em REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS agregado_categorias (
+                categoria TEXT NOT NULL,
+                news_id TEXT NOT NULL,
+                pontuacao INTEGER NOT NULL,
+                tema TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (categoria, news_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_agregado_categorias_ranking
+                ON agregado_categorias (categoria, pontuacao DESC, seq);
+            CREATE INDEX IF NOT EXISTS idx_agregado_categorias_noticia ON agregado_categorias (news_id);
+
+            CREATE TABLE IF NOT EXISTS agregado_contadores (
+                grupo TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                valor INTEGER NOT NULL,
+                PRIMARY KEY (grupo, chave)
+            );
+
+            CREATE TABLE IF NOT EXISTS agregado_estado (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+        ''')
+        self.conn.commit()
+
+    def novas(self, items):
+        # Filtra as notícias que ainda não foram analisadas (nem estão nos agregados nem foram ignoradas)
+        conhecidas = set()
+        ids = [item.id for item in items]
+        with self._lock:
+            for inicio in range(0, len(ids), 500):
+                lote = ids[inicio:inicio + 500]
+                placeholders = ", ".join("?" * len(lote))
+                conhecidas.update(row[0] for row in self.conn.execute(
+                    f"SELECT news_id FROM agregado_noticias WHERE news_id IN ({placeholders}) "
+                    f"UNION ALL SELECT news_id FROM agregado_ignoradas WHERE news_id IN ({placeholders})", lote + lote))
+
+        vistas = set()
+        novas = []
+        for item in items:
+            if item.id not in conhecidas and item.id not in vistas:
+                vistas.add(item.id)
+                novas.append(item)
+        return novas
+
+    def adicionar(self, analises):
+        # Soma aos contadores as notícias novas; analises é uma lista de (item, tema, entidades, pontuacoes)
+        # entidades segue o formato de Agent2.entidades_da_noticia e pontuacoes o de Agent3.pontuar_noticia
+        # Retorna os ids das notícias que entraram (as publicadas antes da janela são registradas como ignoradas)
+        if not analises:
+            return []
+        publicacoes = [epoch_publicacao(item.timestamp) for item, _, _, _ in analises]
+        with self._lock, self.conn:
+            referencia = self._referencia(publicacoes)
+            limite = self._limite(referencia)
+            seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM agregado_categorias").fetchone()[0]
+            noticias = []
+            ignoradas = []
+            categorias = []
+            deltas = {}
+            for (item, tema, entidades, pontuacoes), publicado_em in zip(analises, publicacoes):
+                if limite is not None and publicado_em is not None and publicado_em < limite:
+                    # Já nasceu fora da janela
+                    ignoradas.append((item.id, publicado_em))
+                    continue
+                noticias.append((item.id, item.url, publicado_em if publicado_em is not None else referencia, tema,
+                                 json.dumps(entidades, ensure_ascii=False)))
+                for categoria, pontuacao in pontuacoes.items():
+                    seq += 1
+                    categorias.append((categoria, item.id, pontuacao, tema, seq))
+                self._acumular(deltas, tema, entidades, pontuacoes, 1)
+
+            self.conn.executemany("INSERT OR IGNORE INTO agregado_noticias VALUES (?, ?, ?, ?, ?)", noticias)
+            self.conn.executemany("INSERT OR IGNORE INTO agregado_ignoradas VALUES (?, ?)", ignoradas)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO agregado_categorias VALUES (?, ?, ?, ?, ?)", categorias)
+            self._aplicar(deltas)
+        return [news_id for news_id, _, _, _, _ in noticias]
+
+    def repontuar(self, assinatura, pontuar, lote=500):
+        # Pontuações de categoria só podem ser somadas quando vêm do mesmo pontuador (o modelo dá percentuais, as
+        # palavras-chave dão contagens): quando a assinatura do pontuador muda (Agent3.assinatura_pontuacao), as
+        # notícias da janela são pontuadas de novo com pontuar(items) e os contadores de categoria, refeitos
+        # O texto vem da tabela noticias, em lotes; notícias que não estão mais nela ficam sem categoria
+        # Retorna quantas notícias foram pontuadas de novo
+        with self._lock:
+            atual = self.conn.execute("SELECT valor FROM agregado_estado WHERE chave = 'pontuador'").fetchone()
+            if atual is not None and atual[0] == assinatura:
+                return 0
+
+            categorias = []
+            deltas = {}
+            repontuadas = 0
+            cursor = self.conn.execute(
+                "SELECT a.news_id, a.tema, n.url, n.titulo, n.texto, n.data, n.fonte FROM agregado_noticias a "
+                "JOIN noticias n ON n.url = a.url ORDER BY a.rowid")
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    break
+                items = [NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte, id=news_id)
+                         for news_id, _, url, titulo, texto, data, fonte in linhas]
+                for (news_id, tema, *_), pontuacoes in zip(linhas, pontuar(items)):
+                    for categoria, pontuacao in pontuacoes.items():
+                        categorias.append((categoria, news_id, pontuacao, tema, len(categorias) + 1))
+                        deltas[('categoria_noticias', categoria)] = deltas.get(('categoria_noticias', categoria), 0) + 1
+                        deltas[('categoria_relevancia', categoria)] = (
+                            deltas.get(('categoria_relevancia', categoria), 0) + pontuacao)
+                repontuadas += len(linhas)
+
+            with self.conn:
+                self.conn.execute("DELETE FROM agregado_categorias")
+                self.conn.execute("DELETE FROM agregado_contadores "
+                                  "WHERE grupo IN ('categoria_noticias', 'categoria_relevancia')")
+                self.conn.executemany("INSERT INTO agregado_categorias VALUES (?, ?, ?, ?, ?)", categorias)
+                self._aplicar(deltas)
+                self.conn.execute("INSERT OR REPLACE INTO agregado_estado VALUES ('pontuador', ?)", (assinatura,))
+        return repontuadas
+
+    def expirar(self, agora=None):
+        # Remove dos agregados as notícias publicadas antes do início da janela; retorna quantas saíram
+        # A janela termina em `agora` ou, sem ele, na notícia mais recente dos agregados
+        with self._lock:
+            limite = self._limite(agora if agora is not None else self._referencia())
+            if limite is None:
+                return 0
+            ids = [row[0] for row in self.conn.execute(
+                "SELECT news_id FROM agregado_noticias WHERE publicado_em < ?", (limite,))]
+            # Ignoradas muito antigas deixam de ser lembradas (se voltarem, são analisadas e ignoradas de novo)
+            with self.conn:
+                self.conn.execute("DELETE FROM agregado_ignoradas WHERE publicado_em < ?",
+                                  (limite - self.janela_dias * 86400,))
+        return self.remover(ids)
+
+    def _referencia(self, publicacoes=()):
+        # Fim da janela: a publicação mais recente entre os agregados e `publicacoes`, no máximo o instante atual
+        # (datas futuras não empurram a janela); sem nenhuma, o instante atual
+        agora = time.time()
+        mais_recente = self.conn.execute("SELECT MAX(publicado_em) FROM agregado_noticias").fetchone()[0]
+        candidatas = [publicado_em for publicado_em in (mais_recente, *publicacoes) if publicado_em is not None]
+        return min(max(candidatas), agora) if candidatas else agora
+
+    def _limite(self, referencia):
+        # Início da janela em segundos desde a época (None = janela ilimitada)
+        return referencia - self.janela_dias * 86400 if self.janela_dias is not None else None
+
+    def remover(self, news_ids):
+        # Subtrai dos contadores as notícias informadas e apaga suas linhas
+        removidas = 0
+        with self._lock, self.conn:
+            deltas = {}
+            for inicio in range(0, len(news_ids), 500):
+                lote = news_ids[inicio:inicio + 500]
+                placeholders = ", ".join("?" * len(lote))
+                pontuacoes = {}
+                for news_id, categoria, pontuacao in self.conn.execute(
+                        f"SELECT news_id, categoria, pontuacao FROM agregado_categorias "
+                        f"WHERE news_id IN ({placeholders})", lote):
+                    pontuacoes.setdefault(news_id, {})[categoria] = pontuacao
+
+                for news_id, tema, entidades in self.conn.execute(
+                        f"SELECT news_id, tema, entidades FROM agregado_noticias WHERE news_id IN ({placeholders})",
+                        lote).fetchall():
+                    self._acumular(deltas, tema, json.loads(entidades), pontuacoes.get(news_id, {}), -1)
+                    removidas += 1
+
+                self.conn.execute(f"DELETE FROM agregado_categorias WHERE news_id IN ({placeholders})", lote)
+                self.conn.execute(f"DELETE FROM agregado_noticias WHERE news_id IN ({placeholders})", lote)
+            self._aplicar(deltas)
+        return removidas
+
+    def _acumular(self, deltas, tema, entidades, pontuacoes, sinal):
+        # Variação dos contadores causada por uma notícia (sinal = 1 ao entrar, -1 ao sair)
+        def somar(grupo, chave, valor):
+            deltas[(grupo, chave)] = deltas.get((grupo, chave), 0) + sinal * valor
+
+        somar('total', 'noticias', 1)
+        somar('tema', tema, 1)
+        for categoria, pontuacao in pontuacoes.items():
+            somar('categoria_noticias', categoria, 1)
+            somar('categoria_relevancia', categoria, pontuacao)
+        for tipo, nomes in entidades.items():
+            if tipo in ('structured', 'mentions'):
+                # Valores normalizados e menções não são contadores; entidades() lê os valores das próprias notícias
+                continue
+            for nome in nomes:
+                somar(f'entidade_{tipo}', nome, 1)
+
+    def _aplicar(self, deltas):
+        # Grava as variações e descarta contadores zerados (chamado dentro da transação)
+        self.conn.executemany(
+            """INSERT INTO agregado_contadores (grupo, chave, valor) VALUES (?, ?, ?)
+            ON CONFLICT(grupo, chave) DO UPDATE SET valor = valor + excluded.valor""",
+            [(grupo, chave, valor) for (grupo, chave), valor in deltas.items() if valor]
+        )
+        self.conn.execute("DELETE FROM agregado_contadores WHERE valor <= 0")
+
+    def contadores(self, grupo):
+        # Contadores de um grupo, do maior para o menor
+        with self._lock:
+            return dict(self.conn.execute(
+                "SELECT chave, valor FROM agregado_contadores WHERE grupo = ? ORDER BY valor DESC, chave",
+                (grupo,)))
+
+    def temas(self, theme_names):
+        # Distribuição de temas no formato de Agent1_ThemeSummarizer.process_news
+        distribuicao = self.contadores('tema')
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'total_news': self.contadores('total').get('noticias', 0),
+            'themes_distribution': {theme: distribuicao.get(theme, 0) for theme in theme_names}
+        }
+
+    def entidades(self, entity_types=('companies', 'people', 'locations', 'values', 'dates', 'percentages',
+                                      'tickers')):
+        # Contagem de entidades no formato de Agent2_EntityExtractor.extract_entities
+        tallies = {tipo: self.contadores(f'entidade_{tipo}') for tipo in entity_types}
+        entities = {}
+        for tipo, contagem in tallies.items():
+            if tipo in ('values', 'dates', 'percentages'):
+                # Valores, datas e percentuais são listas com repetição, como no agente
+                entities[tipo] = [nome for nome, valor in contagem.items() for _ in range(valor)]
+            elif tipo == 'tickers':
+                entities[tipo] = sorted(contagem)
+            else:
+                entities[tipo] = [nome.title() for nome in contagem]
+
+        # Valores normalizados das notícias da janela (coluna 'noticia' = rowid em agregado_noticias)
+        with self._lock:
+            linhas = self.conn.execute("SELECT rowid, entidades FROM agregado_noticias ORDER BY rowid").fetchall()
+        structured_values = value_extractor.tabela([json.loads(entidades).get('structured', [])
+                                                    for _, entidades in linhas], [rowid for rowid, _ in linhas])
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'entities': entities,
+            'entity_count': {tipo: len(nomes) for tipo, nomes in entities.items()},
+            'top_entities': {tipo: entities[tipo][:5] for tipo in ('companies', 'people', 'locations')
+                             if tipo in entities},
+            'entity_tallies': tallies,
+            'structured_values': structured_values,
+            'value_stats': value_extractor.estatisticas(structured_values)
+        }
+
+    def classificacao(self, categories, limite=5):
+        # Classificação no formato de Agent3_NewsClassifier.classify_news
+        # Cada categoria traz só as `limite` notícias mais relevantes, além da contagem total em 'news_count'
+        contagens = self.contadores('categoria_noticias')
+        relevancias = self.contadores('categoria_relevancia')
+
+        classified_news = {}
+        ids = []
+        with self._lock:
+            for category, config in categories.items():
+                news = [{'news_id': news_id, 'relevance_score': pontuacao, 'original_theme': tema}
+                        for news_id, pontuacao, tema in self.conn.execute(
+                            """SELECT news_id, pontuacao, tema FROM agregado_categorias
+                            WHERE categoria = ? ORDER BY pontuacao DESC, seq LIMIT ?""", (category, limite))]
+                ids.extend(entry['news_id'] for entry in news)
+                classified_news[category] = {
+                    'news': news,
+                    'news_count': contagens.get(category, 0),
+                    'priority': config['priority'],
+                    'relevance_score': relevancias.get(category, 0)
+                }
+
+            # Título e texto vêm da tabela noticias, pela URL
+            items = {}
+            placeholders = ", ".join("?" * len(set(ids)))
+            for news_id, url, titulo, texto, data, fonte in self.conn.execute(
+                    f"SELECT a.news_id, n.url, n.titulo, n.texto, n.data, n.fonte FROM agregado_noticias a "
+                    f"JOIN noticias n ON n.url = a.url WHERE a.news_id IN ({placeholders})", list(set(ids))):
+                items[news_id] = NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte,
+                                          id=news_id)
+        # Notícias que não estão no banco (removidas ou nunca gravadas) ficam fora do ranking
+        for data in classified_news.values():
+            data['news'] = [entry for entry in data['news'] if entry['news_id'] in items]
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'classified_categories': classified_news,
+            'items': items,
+            'category_distribution': {cat: data['news_count'] for cat, data in classified_news.items()},
+            'high_priority_count': sum(data['news_count'] for data in classified_news.values()
+                                       if data['priority'] == 'alta'),
+            'top_categories': sorted([(cat, data['relevance_score']) for cat, data in classified_news.items()
+                                      if data['news_count'] > 0], key=lambda x: x[1], reverse=True)[:3]
+        }
+
+    def close(self):
+        # Fecha a conexão com o banco dos agregados
+        self.conn.close()
@@ -0,0 +1,64 @@
+﻿import hashlib
+import re
+import unicodedata
+
+from KeywordMatcher import keyword_matcher
+
+TOKEN_PATTERN = re.compile(r'\w+')
+SENTENCE_PATTERN = re.compile(r'[^.!?]+(?:[.!?]+|$)')
+
+
+def remover_acentos(texto):
+    # Remove acentos e cedilhas ("inflação" -> "inflacao")
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(ch for ch in decomposto if not unicodedata.combining(ch))
+
+
+class NewsDocument:
+    # Representação pré-processada de uma notícia, criada uma vez na ingestão e reutilizada por todos os estágios
+    # O texto em minúsculas e o hash são calculados na criação; o resto é calculado no primeiro uso
+
+    __slots__ = ('texto', 'inicio_conteudo', 'hash', '_texto_sem_acento', '_tokens', '_sentencas',
+                 '_ocorrencias')
+
+    def __init__(self, title, content):
+        title_lower = title.lower()
+        # Texto normalizado: título + espaço + conteúdo, em minúsculas
+        self.texto = title_lower + ' ' + content.lower()
+        # Posição em que o conteúdo começa dentro de self.texto
+        self.inicio_conteudo = len(title_lower) + 1
+        self.hash = hashlib.sha1(f"{title}\n{content}".encode('utf-8')).hexdigest()
+        self._texto_sem_acento = None
+        self._tokens = None
+        self._sentencas = None
+        self._ocorrencias = None
+
+    @property
+    def texto_sem_acento(self):
+        if self._texto_sem_acento is None:
+            self._texto_sem_acento = remover_acentos(self.texto)
+        return self._texto_sem_acento
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = TOKEN_PATTERN.findall(self.texto)
+        return self._tokens
+
+    @property
+    def sentencas(self):
+        # Lista de (início, fim) de cada sentença dentro de self.texto
+        if self._sentencas is None:
+            self._sentencas = [(m.start(), m.end()) for m in SENTENCE_PATTERN.finditer(self.texto)
+                               if m.group().strip()]
+        return self._sentencas
+
+    def ocorrencias(self, somente_conteudo=False):
+        # Ocorrências de palavras-chave do KeywordMatcher, calculadas uma única vez por documento
+        if self._ocorrencias is None or self._ocorrencias[0] != keyword_matcher.versao:
+            self._ocorrencias = (keyword_matcher.versao, keyword_matcher.buscar(self.texto))
+        ocorrencias = self._ocorrencias[1]
+        if somente_conteudo:
+            return [(inicio, termo) for inicio, termo in ocorrencias if inicio >= self.inicio_conteudo]
+        return ocorrencias
+
@@ -0,0 +1,67 @@
+import hashlib
+
+from NewsDocument import NewsDocument
+
+
+class NewsItem:
+    # Registro canônico de uma notícia, usado do scraper até o renderizador
+    # Os estágios guardam apenas o id e buscam o item no catálogo em vez de copiar o texto
+    # O id é derivado de URL + título + conteúdo, então é estável entre execuções
+
+    __slots__ = ('id', 'url', 'title', 'content', 'timestamp', 'source', 'sentiment', 'sentiment_sentences',
+                 'category', '_doc')
+
+    def __init__(self, url, title, content, timestamp='', source='CNN Brasil', sentiment=None, category=None,
+                 id=None, doc=None, sentiment_sentences=None):
+        self.id = id if id is not None else hashlib.sha1(f"{url}\n{title}\n{content}".encode('utf-8')).hexdigest()[:16]
+        self.url = url
+        self.title = title
+        self.content = content
+        self.timestamp = timestamp
+        self.source = source
+        self.sentiment = sentiment
+        # Polaridade de cada sentença do conteúdo (Sentiment.SentimentAnalyzer), quando analisada
+        self.sentiment_sentences = sentiment_sentences
+        self.category = category
+        self._doc = doc
+
+    @property
+    def doc(self):
+        # NewsDocument criado uma única vez por notícia
+        if self._doc is None:
+            self._doc = NewsDocument(self.title, self.content)
+        return self._doc
+
+    def liberar_documento(self):
+        # Descarta o NewsDocument (tokens, sentenças, ocorrências); ele é recriado se for pedido de novo
+        self._doc = None
+
+    def resumo(self, tamanho):
+        # Trecho inicial do conteúdo, com reticências quando cortado
+        return self.content[:tamanho] + '...' if len(self.content) > tamanho else self.content
+
+    def __repr__(self):
+        return f"NewsItem(id={self.id}, url={self.url!r}, title={self.title!r})"
+
+    @classmethod
+    def from_dict(cls, data):
+        # Converte tanto o formato antigo dos agentes (title/content) quanto o do banco (titulo/texto)
+        return cls(
+            url=data.get('url', '#'),
+            title=data.get('title') or data.get('titulo', ''),
+            content=data.get('content') or data.get('texto', ''),
+            timestamp=data.get('timestamp') or data.get('data', ''),
+            source=data.get('source') or data.get('fonte', 'CNN Brasil'),
+            sentiment=data.get('sentiment', data.get('sentimento')),
+            category=data.get('category') or data.get('categoria')
+        )
+
+    @classmethod
+    def coerce(cls, news):
+        # Aceita um NewsItem ou um dicionário
+        return news if isinstance(news, NewsItem) else cls.from_dict(news)
+
+
+def catalogo(items):
+    # Dicionário id -> NewsItem compartilhado pelos estágios do pipeline
+    return {item.id: item for item in items}
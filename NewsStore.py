@@ -0,0 +1,609 @@
+﻿import argparse
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import json
+
+import numpy as np
+
+from NewsItem import NewsItem
+from Sentiment import SentimentAnalyzer
+
+# Formatos aceitos além de ISO 8601 para a data de publicação
+FORMATOS_DATA = ('%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+
+def epoch_publicacao(data):
+    # Converte a data de publicação (string ISO, com ou sem 'Z', ou dd/mm/aaaa) em segundos desde a época
+    # Datas sem fuso são tratadas como UTC; retorna None para datas ausentes ou inválidas
+    if isinstance(data, datetime):
+        valor = data
+    else:
+        if not isinstance(data, str) or not data.strip():
+            return None
+        texto = data.strip()
+        try:
+            valor = datetime.fromisoformat(texto.replace('Z', '+00:00'))
+        except ValueError:
+            for formato in FORMATOS_DATA:
+                try:
+                    valor = datetime.strptime(texto, formato)
+                    break
+                except ValueError:
+                    continue
+            else:
+                return None
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    return int(valor.timestamp())
+
+
+def preparar_banco(conn):
+    # Migrações da tabela noticias: data de publicação normalizada, índices, índice de busca textual
+    # e índice de entidades
+    colunas = [row[1] for row in conn.execute("PRAGMA table_info(noticias)")]
+    if 'publicado_em' not in colunas:
+        conn.execute("ALTER TABLE noticias ADD COLUMN publicado_em INTEGER")
+        _preencher_publicado_em(conn)
+    # Versão do analisador que calculou o sentimento (NULL = TextBlob, anterior ao léxico) e a polaridade de
+    # cada sentença em JSON; linhas antigas são recalculadas offline (python Sentiment.py)
+    if 'sentimento_versao' not in colunas:
+        conn.execute("ALTER TABLE noticias ADD COLUMN sentimento_versao TEXT")
+    if 'sentimento_sentencas' not in colunas:
+        conn.execute("ALTER TABLE noticias ADD COLUMN sentimento_sentencas TEXT")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_noticias_publicado_categoria ON noticias (publicado_em, categoria)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_noticias_data_coleta ON noticias (data_coleta)")
+    conn.commit()
+    criar_indice_busca(conn)
+    criar_indice_entidades(conn)
+
+
+def _preencher_publicado_em(conn, lote=1000):
+    # Converte a data textual das linhas já existentes, em lotes
+    cursor = conn.execute("SELECT id, data FROM noticias WHERE publicado_em IS NULL")
+    while True:
+        linhas = cursor.fetchmany(lote)
+        if not linhas:
+            break
+        conn.executemany("UPDATE noticias SET publicado_em = ? WHERE id = ?",
+                         [(epoch_publicacao(data), rowid) for rowid, data in linhas])
+    conn.commit()
+
+
+def criar_indice_busca(conn):
+    # Cria o índice FTS5 sobre título e texto, mantido em sincronia com a tabela noticias por triggers
+    # Em um banco que já tinha notícias, o índice é preenchido uma única vez (rebuild)
+    existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'noticias_fts'").fetchone()
+    conn.executescript('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS noticias_fts USING fts5(
+            titulo, texto,
+            content='noticias', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS noticias_fts_insert AFTER INSERT ON noticias BEGIN
+            INSERT INTO noticias_fts (rowid, titulo, texto) VALUES (new.id, new.titulo, new.texto);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS noticias_fts_delete AFTER DELETE ON noticias BEGIN
+            INSERT INTO noticias_fts (noticias_fts, rowid, titulo, texto)
+            VALUES ('delete', old.id, old.titulo, old.texto);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS noticias_fts_update AFTER UPDATE OF titulo, texto ON noticias BEGIN
+            INSERT INTO noticias_fts (noticias_fts, rowid, titulo, texto)
+            VALUES ('delete', old.id, old.titulo, old.texto);
+            INSERT INTO noticias_fts (rowid, titulo, texto) VALUES (new.id, new.titulo, new.texto);
+        END;
+    ''')
+    if not existia:
+        conn.execute("INSERT INTO noticias_fts (noticias_fts) VALUES ('rebuild')")
+    conn.commit()
+
+
+def criar_indice_entidades(conn):
+    # Índice invertido entidade -> notícias (postings), preenchido por NewsStore.indexar_mencoes
+    # (notícias analisadas no pipeline) e NewsStore.indexar_entidades (histórico, offline)
+    # entidade_noticias é ordenada por (entidade, data): as notícias de uma entidade num período são uma faixa
+    # contígua da chave primária; entidade_dias guarda os totais diários, para comparar períodos sem ler postings
+    # O trigger tira do índice as notícias apagadas da tabela noticias
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS entidades (
+            id INTEGER PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            nome TEXT NOT NULL,
+            UNIQUE (tipo, nome)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entidades_nome ON entidades (nome);
+
+        CREATE TABLE IF NOT EXISTS entidade_noticias (
+            entidade_id INTEGER NOT NULL,
+            publicado_em INTEGER NOT NULL,
+            noticia_id INTEGER NOT NULL,
+            mencoes INTEGER NOT NULL,
+            PRIMARY KEY (entidade_id, publicado_em, noticia_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_entidade_noticias_noticia ON entidade_noticias (noticia_id);
+
+        CREATE TABLE IF NOT EXISTS entidade_dias (
+            dia INTEGER NOT NULL,
+            entidade_id INTEGER NOT NULL,
+            mencoes INTEGER NOT NULL,
+            noticias INTEGER NOT NULL,
+            PRIMARY KEY (dia, entidade_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS entidade_indice_estado (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            ultima_noticia INTEGER NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS noticias_entidades_delete AFTER DELETE ON noticias BEGIN
+            UPDATE entidade_dias SET
+                mencoes = mencoes - (SELECT p.mencoes FROM entidade_noticias p
+                                     WHERE p.noticia_id = old.id AND p.entidade_id = entidade_dias.entidade_id),
+                noticias = noticias - 1
+            WHERE dia = (SELECT publicado_em / 86400 FROM entidade_noticias WHERE noticia_id = old.id LIMIT 1)
+              AND entidade_id IN (SELECT entidade_id FROM entidade_noticias WHERE noticia_id = old.id);
+            DELETE FROM entidade_dias WHERE noticias <= 0;
+            DELETE FROM entidade_noticias WHERE noticia_id = old.id;
+        END;
+    ''')
+    conn.commit()
+
+
+def _termo_fts(texto):
+    # Coloca o termo entre aspas para a sintaxe do FTS5 (operadores digitados pelo usuário viram texto)
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def _data_filtro(valor):
+    # Aceita datetime, string de data ou epoch (int/float) e devolve o epoch usado na coluna publicado_em
+    if isinstance(valor, (int, float)):
+        return int(valor)
+    epoch = epoch_publicacao(valor)
+    if epoch is None:
+        raise ValueError(f"Data inválida: {valor!r}")
+    return epoch
+
+
+class NewsStore:
+    # Consultas sobre as notícias salvas: busca textual ranqueada (FTS5) com filtros de data e categoria,
+    # leitura de janelas de tempo pela coluna indexada publicado_em e consultas ao índice de entidades
+
+    COLUNAS = "n.fonte, n.url, n.titulo, n.texto, n.data, n.sentimento, n.categoria"
+    SENTIMENTO_ATUAL = "CASE WHEN n.sentimento_versao = ? THEN n.sentimento END"
+
+    def __init__(self, db_path='news.db'):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        preparar_banco(self.conn)
+
+    def buscar(self, termos=None, frase=None, desde=None, ate=None, categorias=None, qualquer_termo=False,
+               limite=50):
+        # Busca notícias pelas palavras de `termos` (todas, ou qualquer uma com qualquer_termo=True)
+        # e/ou pela `frase` exata; sem texto, lista as notícias mais recentes que passam nos filtros
+        # Retorna NewsItems, os mais relevantes (BM25, com peso maior no título) primeiro
+        expressoes = []
+        if termos:
+            palavras = [_termo_fts(palavra) for palavra in termos.split()]
+            expressoes.append("(" + (" OR " if qualquer_termo else " AND ").join(palavras) + ")")
+        if frase:
+            expressoes.append(_termo_fts(frase))
+
+        condicoes = []
+        parametros = []
+        if expressoes:
+            condicoes.append("noticias_fts MATCH ?")
+            parametros.append(" AND ".join(expressoes))
+        if desde is not None:
+            condicoes.append("n.publicado_em >= ?")
+            parametros.append(_data_filtro(desde))
+        if ate is not None:
+            condicoes.append("n.publicado_em <= ?")
+            parametros.append(_data_filtro(ate))
+        if categorias:
+            condicoes.append(f"n.categoria IN ({', '.join('?' * len(categorias))})")
+            parametros.extend(categorias)
+
+        if expressoes:
+            consulta = f"SELECT {self.COLUNAS} FROM noticias_fts JOIN noticias n ON n.id = noticias_fts.rowid"
+            ordem = "bm25(noticias_fts, 10.0, 1.0)"
+        else:
+            consulta = f"SELECT {self.COLUNAS} FROM noticias n"
+            ordem = "n.publicado_em DESC"
+        if condicoes:
+            consulta += " WHERE " + " AND ".join(condicoes)
+        consulta += f" ORDER BY {ordem} LIMIT ?"
+        parametros.append(limite)
+
+        return [self._item(row) for row in self.conn.execute(consulta, parametros)]
+
+    def intervalo(self, inicio, fim=None, categorias=None, lote=500):
+        # Gera, em ordem de publicação, as notícias publicadas entre inicio (inclusive) e fim (exclusive)
+        # As linhas são lidas em lotes pelo índice (publicado_em, categoria), sem carregar a janela inteira
+        condicoes = ["n.publicado_em >= ?"]
+        parametros = [_data_filtro(inicio)]
+        if fim is not None:
+            condicoes.append("n.publicado_em < ?")
+            parametros.append(_data_filtro(fim))
+        if categorias:
+            condicoes.append(f"n.categoria IN ({', '.join('?' * len(categorias))})")
+            parametros.extend(categorias)
+
+        cursor = self.conn.execute(
+            f"SELECT {self.COLUNAS} FROM noticias n WHERE {' AND '.join(condicoes)} ORDER BY n.publicado_em, n.id",
+            parametros
+        )
+        try:
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    break
+                for row in linhas:
+                    yield self._item(row)
+        finally:
+            cursor.close()
+
+    def contagens_diarias(self, inicio, fim, termos=None):
+        # Séries diárias (dias UTC) das notícias publicadas entre inicio (inclusive) e fim (exclusive):
+        # quantidade de notícias, soma dos sentimentos e quantas têm sentimento
+        # Com `termos`, conta só as notícias que citam algum deles (pelo índice FTS5, sem varrer o texto)
+        # Retorna arrays NumPy com um elemento por dia; dias sem notícias ficam com zero
+        dia_inicio = _data_filtro(inicio) // 86400
+        dia_fim = -(-_data_filtro(fim) // 86400)
+        parametros = [dia_inicio * 86400, dia_fim * 86400]
+        if termos:
+            consulta = ("FROM noticias_fts JOIN noticias n ON n.id = noticias_fts.rowid "
+                        "WHERE noticias_fts MATCH ? AND n.publicado_em >= ? AND n.publicado_em < ?")
+            parametros.insert(0, " OR ".join(_termo_fts(termo) for termo in termos))
+        else:
+            consulta = "FROM noticias n WHERE n.publicado_em >= ? AND n.publicado_em < ?"
+
+        # Uma linha por dia com notícias: (dia, notícias, soma dos sentimentos, notícias com sentimento)
+        # Só entram sentimentos da versão atual do analisador, para a série não misturar escalas
+        linhas = np.array(self.conn.execute(
+            f"SELECT n.publicado_em / 86400, COUNT(*), TOTAL({self.SENTIMENTO_ATUAL}), "
+            f"COUNT({self.SENTIMENTO_ATUAL}) {consulta} GROUP BY n.publicado_em / 86400",
+            [SentimentAnalyzer.VERSION, SentimentAnalyzer.VERSION, *parametros]).fetchall(),
+            dtype=float).reshape(-1, 4)
+        posicao = linhas[:, 0].astype(np.int64) - dia_inicio
+        tamanho = dia_fim - dia_inicio
+        return {
+            'inicio': dia_inicio * 86400,
+            'noticias': np.bincount(posicao, weights=linhas[:, 1], minlength=tamanho),
+            'soma_sentimento': np.bincount(posicao, weights=linhas[:, 2], minlength=tamanho),
+            'com_sentimento': np.bincount(posicao, weights=linhas[:, 3], minlength=tamanho)
+        }
+
+    def indexar_mencoes(self, mencoes_por_url):
+        # Acrescenta ao índice de entidades as notícias já analisadas pelo Agente 2 nesta execução
+        # mencoes_por_url é {url: {tipo: {nome: menções}}} (o 'mentions' de Agent2.extract_entities); notícias
+        # que ainda não estão no banco ou já estão no índice são ignoradas
+        # Retorna quantas notícias foram indexadas
+        urls = list(mencoes_por_url)
+        linhas = []
+        for inicio in range(0, len(urls), 400):
+            lote = urls[inicio:inicio + 400]
+            linhas.extend(self.conn.execute(
+                f"SELECT n.id, n.publicado_em, n.data_coleta, n.url FROM noticias n "
+                f"WHERE n.url IN ({', '.join('?' * len(lote))})", lote))
+        return self._gravar_postings([(rowid, publicado_em, data_coleta, mencoes_por_url[url])
+                                      for rowid, publicado_em, data_coleta, url in linhas])
+
+    def indexar_entidades(self, mencoes_da_noticia, lote=500):
+        # Indexação do histórico: acrescenta ao índice as notícias com id maior que o marcador, recalculando as
+        # menções com mencoes_da_noticia(item) -> {tipo: {nome: menções}} (ex.: Agent2.mencoes_da_noticia)
+        # Lê e analisa o texto de cada notícia, então roda offline (python NewsStore.py --indexar-entidades), fora
+        # do pipeline; cada lote é gravado numa transação junto com o marcador
+        # Retorna quantas notícias foram indexadas
+        indexadas = 0
+        while True:
+            linha = self.conn.execute("SELECT ultima_noticia FROM entidade_indice_estado WHERE id = 1").fetchone()
+            ultima = linha[0] if linha else 0
+            linhas = self.conn.execute(
+                f"SELECT n.id, n.publicado_em, n.data_coleta, {self.COLUNAS} FROM noticias n "
+                f"WHERE n.id > ? ORDER BY n.id LIMIT ?", (ultima, lote)).fetchall()
+            if not linhas:
+                return indexadas
+            indexadas += self._gravar_postings(
+                [(rowid, publicado_em, data_coleta, mencoes_da_noticia(self._item(row)))
+                 for rowid, publicado_em, data_coleta, *row in linhas], ultima_noticia=linhas[-1][0])
+
+    def _gravar_postings(self, noticias, ultima_noticia=None):
+        # Grava numa transação os postings e os totais diários de (id, publicado_em, data_coleta, menções)
+        # Notícias que já têm postings são puladas, então uma notícia nunca é contada duas vezes
+        # ultima_noticia, quando informado, avança o marcador da indexação do histórico na mesma transação
+        with self.conn:
+            ids_noticias = [rowid for rowid, _, _, _ in noticias]
+            ja_indexadas = set()
+            for inicio in range(0, len(ids_noticias), 400):
+                lote = ids_noticias[inicio:inicio + 400]
+                ja_indexadas.update(row[0] for row in self.conn.execute(
+                    f"SELECT DISTINCT noticia_id FROM entidade_noticias "
+                    f"WHERE noticia_id IN ({', '.join('?' * len(lote))})", lote))
+
+            # Nomes que diferem só na caixa são a mesma entidade: as menções são somadas antes de virar postings,
+            # para que entidade_noticias e entidade_dias contem a notícia uma única vez
+            somadas = {}
+            for rowid, publicado_em, data_coleta, mencoes in noticias:
+                if rowid in ja_indexadas:
+                    continue
+                if publicado_em is None:
+                    # Sem data de publicação válida, vale a data da coleta
+                    publicado_em = epoch_publicacao(data_coleta) or 0
+                for tipo, nomes in mencoes.items():
+                    for nome, quantidade in nomes.items():
+                        chave = (tipo, nome.lower(), publicado_em, rowid)
+                        somadas[chave] = somadas.get(chave, 0) + quantidade
+            postings = [(*chave, quantidade) for chave, quantidade in somadas.items()]
+
+            self.conn.executemany("INSERT OR IGNORE INTO entidades (tipo, nome) VALUES (?, ?)",
+                                  {(tipo, nome) for tipo, nome, _, _, _ in postings})
+            ids = self._ids_entidades({(tipo, nome) for tipo, nome, _, _, _ in postings})
+            postings = [(ids[(tipo, nome)], publicado_em, rowid, quantidade)
+                        for tipo, nome, publicado_em, rowid, quantidade in postings]
+            self.conn.executemany("INSERT OR IGNORE INTO entidade_noticias VALUES (?, ?, ?, ?)", postings)
+
+            dias = {}
+            for entidade_id, publicado_em, _, quantidade in postings:
+                total = dias.setdefault((publicado_em // 86400, entidade_id), [0, 0])
+                total[0] += quantidade
+                total[1] += 1
+            self.conn.executemany(
+                """INSERT INTO entidade_dias (dia, entidade_id, mencoes, noticias) VALUES (?, ?, ?, ?)
+                ON CONFLICT(dia, entidade_id) DO UPDATE SET mencoes = mencoes + excluded.mencoes,
+                                                            noticias = noticias + excluded.noticias""",
+                [(dia, entidade_id, mencoes, total) for (dia, entidade_id), (mencoes, total) in dias.items()])
+            if ultima_noticia is not None:
+                self.conn.execute(
+                    """INSERT INTO entidade_indice_estado (id, ultima_noticia) VALUES (1, ?)
+                    ON CONFLICT(id) DO UPDATE SET ultima_noticia = excluded.ultima_noticia""", (ultima_noticia,))
+        return len({rowid for _, _, rowid, _ in postings})
+
+    def _ids_entidades(self, chaves):
+        # {(tipo, nome): id} das entidades informadas
+        ids = {}
+        chaves = list(chaves)
+        for inicio in range(0, len(chaves), 400):
+            lote = chaves[inicio:inicio + 400]
+            condicoes = " OR ".join("(tipo = ? AND nome = ?)" for _ in lote)
+            ids.update(((tipo, nome), entidade_id) for entidade_id, tipo, nome in self.conn.execute(
+                f"SELECT id, tipo, nome FROM entidades WHERE {condicoes}", [valor for chave in lote for valor in chave]))
+        return ids
+
+    def noticias_com_entidade(self, nome, desde=None, ate=None, tipo=None, limite=50):
+        # Notícias que citam a entidade `nome` (de qualquer tipo, ou só do `tipo` informado), publicadas entre
+        # desde (inclusive) e ate (exclusive), das mais recentes para as mais antigas
+        # Retorna (NewsItem, menções) lidos pela faixa (entidade, data) da chave primária dos postings
+        condicoes = ["e.nome = ?"]
+        parametros = [nome.lower()]
+        if tipo is not None:
+            condicoes.append("e.tipo = ?")
+            parametros.append(tipo)
+        condicoes.append("p.publicado_em >= ?")
+        parametros.append(_data_filtro(desde) if desde is not None else 0)
+        if ate is not None:
+            condicoes.append("p.publicado_em < ?")
+            parametros.append(_data_filtro(ate))
+        parametros.append(limite)
+
+        return [(self._item(row[:-1]), row[-1]) for row in self.conn.execute(
+            f"""SELECT {self.COLUNAS}, p.mencoes FROM entidades e
+            JOIN entidade_noticias p ON p.entidade_id = e.id
+            JOIN noticias n ON n.id = p.noticia_id
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY p.publicado_em DESC, p.noticia_id DESC LIMIT ?""", parametros)]
+
+    def entidades_em_alta(self, dias=7, agora=None, tipo=None, minimo=3, limite=20):
+        # Entidades com maior crescimento de menções nos últimos `dias` dias (contando o dia de `agora`)
+        # em relação aos `dias` dias anteriores; só entram as com pelo menos `minimo` menções no período atual
+        # O crescimento é (atual + 1) / (anterior + 1), para que entidades novas não tenham razão infinita
+        # Lê apenas os totais diários (entidade_dias) dos dois períodos
+        fim = (_data_filtro(agora) if agora is not None else int(datetime.now(timezone.utc).timestamp())) // 86400 + 1
+        meio = fim - dias
+        condicoes = ["atual >= ?"]
+        parametros = [meio, meio, meio, fim - 2 * dias, fim, minimo]
+        if tipo is not None:
+            condicoes.append("e.tipo = ?")
+            parametros.append(tipo)
+        parametros.append(limite)
+
+        linhas = self.conn.execute(
+            f"""SELECT e.tipo, e.nome, atual, anterior, noticias, (atual + 1.0) / (anterior + 1.0) AS crescimento
+            FROM (SELECT entidade_id,
+                         TOTAL(CASE WHEN dia >= ? THEN mencoes END) AS atual,
+                         TOTAL(CASE WHEN dia < ? THEN mencoes END) AS anterior,
+                         TOTAL(CASE WHEN dia >= ? THEN noticias END) AS noticias
+                  FROM entidade_dias WHERE dia >= ? AND dia < ?
+                  GROUP BY entidade_id) t
+            JOIN entidades e ON e.id = t.entidade_id
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY crescimento DESC, atual DESC, e.nome LIMIT ?""", parametros).fetchall()
+        # Nomes como no Agente 2: tickers em maiúsculas, os demais com iniciais maiúsculas
+        return [{'tipo': tipo_entidade, 'nome': nome.upper() if tipo_entidade == 'tickers' else nome.title(),
+                 'mencoes': int(atual), 'mencoes_anteriores': int(anterior), 'noticias': int(noticias),
+                 'crescimento': round(crescimento, 3)}
+                for tipo_entidade, nome, atual, anterior, noticias, crescimento in linhas]
+
+    @staticmethod
+    def _item(row):
+        fonte, url, titulo, texto, data, sentimento, categoria = row
+        return NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte,
+                        sentiment=sentimento, category=categoria)
+
+    def close(self):
+        # Fecha a conexão de consulta
+        self.conn.close()
+
+
+class NewsWriter:
+    # Grava notícias em lote numa thread dedicada, com o banco em modo WAL
+    # Os produtores apenas enfileiram linhas; só a thread de escrita toca na conexão
+
+    _PARAR = object()
+    _INSERIR = """INSERT INTO noticias
+        (fonte, url, titulo, texto, data, publicado_em, sentimento, categoria, sentimento_versao,
+         sentimento_sentencas)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(url) DO NOTHING"""
+
+    def __init__(self, db_path='news.db', batch_size=500, flush_interval=1.0, tentativas=3):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Tentativas de gravar um lote antes de cair para a gravação linha a linha
+        self.tentativas = tentativas
+        self.queue = queue.Queue(maxsize=batch_size * 4)
+        # Linhas efetivamente inseridas (as que já existiam no banco não contam) e linhas perdidas por erro
+        self.rows_written = 0
+        self.rows_failed = 0
+        # Exceção que encerrou a thread de escrita, se houver
+        self.error = None
+        # O modo WAL fica gravado no arquivo; ativá-lo aqui, antes da thread, evita disputar o bloqueio
+        # exclusivo da troca de modo com os componentes que criam suas tabelas logo em seguida
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        self._thread = threading.Thread(target=self._run, name="NewsWriter", daemon=True)
+        self._thread.start()
+
+    def put(self, item):
+        # Enfileira um NewsItem para gravação no próximo lote
+        # O sentimento só leva a versão do analisador quando veio dele (com as sentenças)
+        analisado = item.sentiment_sentences is not None
+        self._enfileirar((item.source, item.url, item.title, item.content, item.timestamp,
+                          epoch_publicacao(item.timestamp), item.sentiment, item.category,
+                          SentimentAnalyzer.VERSION if analisado else None,
+                          json.dumps(item.sentiment_sentences) if analisado else None))
+
+    def flush(self, timeout=None):
+        # Bloqueia até que tudo o que foi enfileirado até agora esteja gravado
+        # Levanta RuntimeError se a thread de escrita morreu e TimeoutError se `timeout` segundos se passaram
+        gravado = threading.Event()
+        limite = time.monotonic() + timeout if timeout is not None else None
+        self._enfileirar(gravado, limite)
+        while not gravado.wait(self.flush_interval):
+            self._verificar_thread()
+            if limite is not None and time.monotonic() >= limite:
+                raise TimeoutError(f"NewsWriter não gravou a fila em {timeout}s")
+
+    def _enfileirar(self, entrada, limite=None):
+        # Coloca na fila sem bloquear para sempre: com a fila cheia, confere se a thread ainda está viva
+        while True:
+            self._verificar_thread()
+            try:
+                self.queue.put(entrada, timeout=self.flush_interval)
+                return
+            except queue.Full:
+                if limite is not None and time.monotonic() >= limite:
+                    raise TimeoutError("NewsWriter não esvaziou a fila a tempo")
+
+    def _verificar_thread(self):
+        if not self._thread.is_alive():
+            raise RuntimeError(f"A thread do NewsWriter terminou: {self.error!r}")
+
+    def close(self):
+        # Grava o que restou na fila e encerra a thread de escrita
+        if self._thread.is_alive():
+            self.queue.put(self._PARAR)
+            self._thread.join()
+
+    def _run(self):
+        try:
+            self._executar()
+        except Exception as e:
+            self.error = e
+            print(f"Erro fatal no NewsWriter: {e}")
+
+    def _executar(self):
+        conn = sqlite3.connect(self.db_path)
+        # Em WAL, synchronous=NORMAL só faz fsync nos checkpoints
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        buffer = []
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._gravar(conn, buffer)
+                continue
+
+            if item is self._PARAR:
+                self._gravar(conn, buffer)
+                break
+            if isinstance(item, threading.Event):
+                self._gravar(conn, buffer)
+                item.set()
+                continue
+
+            buffer.append(item)
+            if len(buffer) >= self.batch_size:
+                self._gravar(conn, buffer)
+
+        conn.close()
+
+    def _gravar(self, conn, buffer):
+        # Grava o lote inteiro numa única transação; erros transitórios (banco ocupado) são repetidos com
+        # espera crescente e, se o lote ainda falhar, as linhas são gravadas uma a uma para perder só as ruins
+        if not buffer:
+            return
+        # Conta as linhas inseridas pelo rowcount do comando: conflitos (DO NOTHING) não contam, e, ao
+        # contrário de total_changes, as linhas que os gatilhos (busca textual, índice de entidades) mexem também não
+        for tentativa in range(self.tentativas):
+            try:
+                with conn:
+                    inseridas = conn.executemany(self._INSERIR, buffer).rowcount
+                self.rows_written += inseridas
+                buffer.clear()
+                return
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    print(f"Erro no banco de dados: {e}")
+                    break
+                print(f"Banco ocupado (tentativa {tentativa + 1}/{self.tentativas}): {e}")
+                time.sleep(0.1 * 2 ** tentativa)
+            except sqlite3.Error as e:
+                print(f"Erro no banco de dados: {e}")
+                break
+
+        for linha in buffer:
+            try:
+                with conn:
+                    self.rows_written += conn.execute(self._INSERIR, linha).rowcount
+            except sqlite3.Error as e:
+                self.rows_failed += 1
+                print(f"Erro ao gravar {linha[1]}: {e}")
+        buffer.clear()
+
+
+def main():
+    # Indexação offline das entidades do histórico: python NewsStore.py --indexar-entidades [--db news.db]
+    # O pipeline só indexa as notícias que analisa; esta etapa cobre as gravadas antes do índice existir
+    from Agents.Agent2_EntityExtractor import Agent2_EntityExtractor
+
+    parser = argparse.ArgumentParser(description="Manutenção do banco de notícias")
+    parser.add_argument('--db', default='news.db', help="banco com a tabela noticias")
+    parser.add_argument('--indexar-entidades', action='store_true',
+                        help="indexa as entidades das notícias que ainda não estão no índice")
+    args = parser.parse_args()
+    if not args.indexar_entidades:
+        parser.print_help()
+        return
+
+    store = NewsStore(args.db)
+    try:
+        indexadas = store.indexar_entidades(Agent2_EntityExtractor().mencoes_da_noticia)
+    finally:
+        store.close()
+    print(f"Índice de entidades: {indexadas} notícias indexadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class RespostaNaoEmCache(Exception):
+    # Lançada no modo offline quando a URL pedida nunca foi salva no cache
+    pass
+
+
+class RespostaEmCache:
+    # Resposta mínima compatível com o uso que o scraper faz de requests.Response
+
+    def __init__(self, url, text, status_code=200, from_cache=True):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        self.from_cache = from_cache
+
+
+class ResponseCache:
+    # Cache persistente de respostas HTTP com TTL por classe de URL, GET condicional e despejo LRU
+
+    # TTL em segundos para cada classe de URL
+    TTL_PADRAO = {
+        'landing': 10 * 60,
+        'artigo': 7 * 24 * 60 * 60
+    }
+
+    def __init__(self, db_path='http_cache.db', max_bytes=200 * 1024 * 1024, ttls=None, offline=False):
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.TTL_PADRAO, **(ttls or {}))
+        # offline=True nunca acessa a rede: serve apenas o que já está salvo (replay de uma coleta)
+        self.offline = offline
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_database()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+
+    def _create_database(self):
+        # Cria a tabela de respostas se não existir
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS respostas (
+                url TEXT PRIMARY KEY,
+                classe TEXT NOT NULL,
+                corpo BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                obtido_em REAL NOT NULL,
+                acessado_em REAL NOT NULL,
+                tamanho INTEGER NOT NULL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+        self.conn.commit()
+
+    def obter(self, url, classe, requisitar):
+        # Retorna a resposta do cache ou chama requisitar(headers) para buscar/revalidar na rede
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT corpo, etag, last_modified, obtido_em FROM respostas WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row:
+            corpo, etag, last_modified, obtido_em = row
+            if self.offline or time.time() - obtido_em < self.ttls.get(classe, 0):
+                self._marcar_acesso(url)
+                return RespostaEmCache(url, self._descomprimir(corpo))
+        elif self.offline:
+            raise RespostaNaoEmCache(url)
+
+        # Revalidação condicional quando já temos uma cópia expirada
+        headers = {}
+        if row:
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = requisitar(headers)
+
+        if response.status_code == 304 and row:
+            with self._lock:
+                self.conn.execute(
+                    """UPDATE respostas SET obtido_em = ?, acessado_em = ?,
+                    etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                    WHERE url = ?""",
+                    (time.time(), time.time(), response.headers.get('ETag'),
+                     response.headers.get('Last-Modified'), url)
+                )
+                self.conn.commit()
+            return RespostaEmCache(url, self._descomprimir(row[0]))
+
+        if response.status_code == 200:
+            self._salvar(url, classe, response)
+        return response
+
+    def _salvar(self, url, classe, response):
+        # Salva o corpo comprimido e despeja as entradas menos usadas se o orçamento estourar
+        corpo = zlib.compress(response.text.encode('utf-8'))
+        agora = time.time()
+        with self._lock:
+            antigo = self.conn.execute("SELECT tamanho FROM respostas WHERE url = ?", (url,)).fetchone()
+            self.conn.execute(
+                """INSERT OR REPLACE INTO respostas
+                (url, classe, corpo, etag, last_modified, obtido_em, acessado_em, tamanho)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (url, classe, corpo, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 agora, agora, len(corpo))
+            )
+            self.total_bytes += len(corpo) - (antigo[0] if antigo else 0)
+            self._despejar()
+            self.conn.commit()
+
+    def _despejar(self):
+        # Remove as respostas acessadas há mais tempo até caber em max_bytes (chamado com o lock)
+        if self.total_bytes <= self.max_bytes:
+            return
+        cursor = self.conn.execute("SELECT url, tamanho FROM respostas ORDER BY acessado_em")
+        removidas = []
+        for url, tamanho in cursor:
+            if self.total_bytes <= self.max_bytes:
+                break
+            removidas.append((url,))
+            self.total_bytes -= tamanho
+        self.conn.executemany("DELETE FROM respostas WHERE url = ?", removidas)
+
+    def _marcar_acesso(self, url):
+        with self._lock:
+            self.conn.execute("UPDATE respostas SET acessado_em = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+
+    def _descomprimir(self, corpo):
+        return zlib.decompress(corpo).decode('utf-8')
+
+    def close(self):
+        # Fecha a conexão com o banco do cache
+        self.conn.close()
@@ -0,0 +1,230 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from NewsDocument import TOKEN_PATTERN, remover_acentos
+from Summarizer import SENTENCE_PATTERN
+
+# Léxico de sentimento em português (palavras sem acento), de -3 a 3, com termos do noticiário econômico
+# PALAVRAS casa a palavra inteira; RADICAIS casa o começo da palavra ("cresc" -> crescimento, cresceu...)
+PALAVRAS = {
+    'bom': 1.5, 'boa': 1.5, 'bons': 1.5, 'boas': 1.5, 'otimo': 2.5, 'otima': 2.5, 'melhor': 1.5, 'melhores': 1.5,
+    'ruim': -1.5, 'ruins': -1.5, 'pior': -1.5, 'piores': -1.5, 'pessimo': -2.5, 'pessima': -2.5,
+    'forte': 1.0, 'fortes': 1.0, 'fraco': -1.0, 'fraca': -1.0, 'fracos': -1.0, 'fracas': -1.0,
+    'ganho': 1.5, 'ganhos': 1.5, 'perda': -1.5, 'perdas': -1.5, 'lucro': 2.0, 'lucros': 2.0,
+    'alivio': 1.5, 'sucesso': 2.0, 'recorde': 1.0, 'solido': 1.5, 'solida': 1.5, 'robusto': 1.5, 'robusta': 1.5,
+    'sobe': 1.0, 'sobem': 1.0, 'subiu': 1.0, 'subiram': 1.0, 'avanca': 1.0, 'avancam': 1.0, 'avancou': 1.0,
+    'cai': -1.0, 'caem': -1.0, 'caiu': -1.0, 'cairam': -1.0, 'queda': -1.0, 'quedas': -1.0, 'tombo': -2.0,
+    'recua': -1.0, 'recuam': -1.0, 'recuou': -1.0, 'recuo': -1.0, 'despenca': -2.5, 'despencou': -2.5,
+    'dispara': 1.0, 'disparou': 1.0, 'salto': 1.0, 'saltou': 1.0,
+    'risco': -1.0, 'riscos': -1.0, 'ameaca': -2.0, 'ameacas': -2.0, 'ameacou': -2.0, 'alerta': -1.0,
+    'guerra': -3.0, 'ataque': -2.5, 'ataques': -2.5, 'calote': -3.0, 'default': -2.5, 'fraude': -3.0,
+    'crise': -2.5, 'crises': -2.5, 'recessao': -3.0, 'deficit': -1.5, 'superavit': 1.5, 'rombo': -2.5,
+    'divida': -0.5, 'dividas': -0.5, 'multa': -1.5, 'golpe': -2.5, 'tensao': -2.0, 'tensoes': -2.0,
+    'incerteza': -1.5, 'incertezas': -1.5, 'volatilidade': -1.0, 'temor': -2.0, 'temores': -2.0,
+    'medo': -2.0, 'panico': -3.0, 'desemprego': -2.0, 'emprego': 1.0, 'empregos': 1.0, 'renda': 0.5,
+    'confianca': 1.5, 'credibilidade': 1.5, 'estabilidade': 1.0, 'oportunidade': 1.5, 'oportunidades': 1.5,
+    'beneficio': 1.5, 'beneficios': 1.5, 'favoravel': 1.5, 'desfavoravel': -1.5, 'positivo': 1.5,
+    'positiva': 1.5, 'negativo': -1.5, 'negativa': -1.5, 'inflacao': -0.5, 'encarece': -1.5, 'encarecem': -1.5,
+    'barateia': 1.0, 'aprova': 1.0, 'aprovou': 1.0, 'aprovacao': 1.0, 'rejeita': -1.0, 'rejeitou': -1.0,
+    'critica': -1.5, 'criticas': -1.5, 'mina': -1.5, 'onera': -1.5, 'desestimula': -1.5, 'desestimulam': -1.5,
+}
+RADICAIS = {
+    'cresc': 1.5, 'expans': 1.5, 'recupera': 1.5, 'valoriz': 1.5, 'desvaloriz': -1.5, 'otimis': 2.0,
+    'pessimis': -2.0, 'melhor': 1.5, 'pior': -1.5, 'fortalec': 1.5, 'enfraquec': -1.5, 'aquec': 1.0,
+    'desaquec': -1.0, 'desaceler': -1.0, 'contrac': -1.5, 'retrai': -1.5, 'retrac': -1.5, 'retraem': -1.5,
+    'prejuiz': -2.0, 'prejudic': -2.0, 'inadimpl': -2.0, 'falenc': -3.0, 'faliu': -3.0, 'rebaix': -2.0,
+    'preocup': -1.5, 'escalad': -2.0, 'estagn': -1.5, 'impuls': 1.0, 'estimul': 1.0, 'desestimul': -1.5, 'favorec': 1.0,
+    'benefic': 1.5, 'lucrat': 1.5, 'rentab': 1.0, 'sustent': 0.5, 'instab': -1.5, 'turbul': -2.0,
+    'conflit': -2.0, 'sancao': -2.0, 'sancoes': -2.0, 'demiss': -2.0, 'desempreg': -2.0, 'endivid': -1.5,
+    'calot': -3.0, 'colaps': -3.0, 'desaba': -2.5, 'desabou': -2.5, 'afund': -2.0, 'avanc': 1.0,
+    'dificuldad': -1.5, 'problem': -1.5, 'vulnerab': -1.5, 'resilien': 1.5, 'eficien': 1.0, 'inovac': 1.0,
+}
+# Palavras que invertem (com amortecimento) a polaridade das seguintes na mesma sentença
+NEGACOES = {'nao', 'nem', 'nunca', 'jamais', 'sem', 'nenhum', 'nenhuma', 'tampouco'}
+# Palavras que aumentam ou atenuam a polaridade da palavra seguinte
+INTENSIFICADORES = {'muito': 1.5, 'muita': 1.5, 'bastante': 1.5, 'extremamente': 2.0, 'altamente': 1.5,
+                    'fortemente': 1.5, 'grande': 1.3, 'enorme': 1.5, 'pouco': 0.5, 'pouca': 0.5,
+                    'levemente': 0.5, 'ligeiramente': 0.5, 'leve': 0.5, 'moderadamente': 0.7}
+
+
+class SentimentAnalyzer:
+    # Sentimento por léxico: cada palavra tem uma polaridade, invertida por negações até `janela_negacao`
+    # palavras antes e escalada por intensificadores imediatamente antes. A sentença soma as polaridades,
+    # normalizadas para [-1, 1] (s / sqrt(s² + alpha)); a notícia é a média das sentenças com sentimento
+    # Um lote inteiro é pontuado com arrays NumPy: o léxico é consultado uma vez por palavra distinta do lote
+    # Os resultados ficam memorizados pelo hash do texto (em memória e, opcionalmente, no AgentCache)
+
+    VERSION = '1.1'
+
+    # Fator aplicado à polaridade negada (a negação enfraquece além de inverter: "não é bom" != "ruim")
+    FATOR_NEGACAO = -0.74
+
+    def __init__(self, alpha=15.0, janela_negacao=3, tamanho_memoria=10000):
+        self.alpha = alpha
+        self.janela_negacao = janela_negacao
+        self.tamanho_memoria = tamanho_memoria
+        self._memoria = OrderedDict()
+        self._lexico = {}
+        self._lock = threading.Lock()
+
+    def polaridade(self, texto):
+        # Polaridade de um texto, de -1 (negativo) a 1 (positivo)
+        return self.analisar([texto])[0]['polaridade']
+
+    def analisar(self, textos, cache=None):
+        # Retorna, para cada texto, {'polaridade': float, 'sentencas': [float, ...]}
+        # As sentenças são as de Summarizer.SENTENCE_PATTERN, na ordem do texto
+        chaves = [f"sentimento:{self.VERSION}:{hashlib.sha1(texto.encode('utf-8')).hexdigest()}" for texto in textos]
+        resultados = {}
+        with self._lock:
+            for chave in chaves:
+                if chave in self._memoria:
+                    self._memoria.move_to_end(chave)
+                    resultados[chave] = self._memoria[chave]
+        if cache is not None:
+            resultados.update(cache.obter_varios([chave for chave in chaves if chave not in resultados]))
+
+        faltando = {chave: texto for chave, texto in zip(chaves, textos) if chave not in resultados}
+        novos = dict(zip(faltando, self._analisar_lote(list(faltando.values())))) if faltando else {}
+        if cache is not None:
+            cache.salvar_varios(novos)
+        resultados.update(novos)
+
+        with self._lock:
+            for chave in chaves:
+                self._memoria[chave] = resultados[chave]
+                self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.tamanho_memoria:
+                self._memoria.popitem(last=False)
+        return [resultados[chave] for chave in chaves]
+
+    def _valor_lexico(self, palavra):
+        # (polaridade, tipo, escala) de uma palavra sem acento: tipo 1 = negação, 2 = intensificador
+        if palavra in NEGACOES:
+            return 0.0, 1, 1.0
+        if palavra in INTENSIFICADORES:
+            return 0.0, 2, INTENSIFICADORES[palavra]
+        if palavra in PALAVRAS:
+            return PALAVRAS[palavra], 0, 1.0
+        # Radical mais longo que começa a palavra
+        for tamanho in range(min(len(palavra), 10), 3, -1):
+            if palavra[:tamanho] in RADICAIS:
+                return RADICAIS[palavra[:tamanho]], 0, 1.0
+        return 0.0, 0, 1.0
+
+    def _consultar(self, palavra):
+        # Consulta ao léxico memorizada por palavra (o vocabulário do noticiário é limitado)
+        valor = self._lexico.get(palavra)
+        if valor is None:
+            valor = self._lexico[palavra] = self._valor_lexico(remover_acentos(palavra))
+        return valor
+
+    def _analisar_lote(self, textos):
+        # Tokeniza sentença a sentença; o resto é vetorizado sobre todas as palavras do lote
+        sentencas_por_texto, sentenca_texto, palavras, sentenca_palavra = [], [], [], []
+        for t, texto in enumerate(textos):
+            sentencas = [m.group() for m in SENTENCE_PATTERN.finditer(texto)]
+            sentencas_por_texto.append(len(sentencas))
+            for sentenca in sentencas:
+                encontradas = TOKEN_PATTERN.findall(sentenca.lower())
+                sentenca_palavra.extend([len(sentenca_texto)] * len(encontradas))
+                palavras.extend(encontradas)
+                sentenca_texto.append(t)
+
+        num_sentencas = len(sentenca_texto)
+        pontuacao = np.zeros(num_sentencas)
+        if palavras:
+            # Índice de cada palavra distinta (um dict é mais rápido que np.unique sobre strings)
+            indices = {}
+            inverso = np.array([indices.setdefault(palavra, len(indices)) for palavra in palavras])
+            valores = np.array([self._consultar(palavra) for palavra in indices])
+            polaridade = valores[inverso, 0]
+            tipo = valores[inverso, 1].astype(np.int64)
+            escala = valores[inverso, 2]
+            sentenca = np.array(sentenca_palavra)
+
+            # Negação: número de negações nas `janela_negacao` palavras anteriores da mesma sentença
+            negacoes = np.zeros(len(palavras), dtype=np.int64)
+            for k in range(1, self.janela_negacao + 1):
+                mesma = sentenca[k:] == sentenca[:-k]
+                negacoes[k:] += mesma & (tipo[:-k] == 1)
+            polaridade = np.where(negacoes % 2 == 1, polaridade * self.FATOR_NEGACAO, polaridade)
+
+            # Intensificador imediatamente antes, na mesma sentença
+            anterior = np.ones(len(palavras))
+            anterior[1:] = np.where((sentenca[1:] == sentenca[:-1]) & (tipo[:-1] == 2), escala[:-1], 1.0)
+            polaridade = polaridade * anterior
+
+            soma = np.bincount(sentenca, weights=polaridade, minlength=num_sentencas)
+            pontuacao = soma / np.sqrt(soma ** 2 + self.alpha)
+
+        # Polaridade da notícia: média das sentenças com sentimento (0 quando nenhuma tem)
+        sentenca_texto = np.array(sentenca_texto, dtype=np.int64)
+        com_sentimento = pontuacao != 0
+        soma_textos = np.bincount(sentenca_texto[com_sentimento], weights=pontuacao[com_sentimento],
+                                  minlength=len(textos))
+        contagem = np.bincount(sentenca_texto[com_sentimento], minlength=len(textos))
+        polaridades = np.divide(soma_textos, contagem, out=np.zeros(len(textos)), where=contagem > 0)
+
+        resultados = []
+        inicio = 0
+        for t, quantidade in enumerate(sentencas_por_texto):
+            resultados.append({
+                'polaridade': round(float(polaridades[t]), 4),
+                'sentencas': [round(float(valor), 4) for valor in pontuacao[inicio:inicio + quantidade]]
+            })
+            inicio += quantidade
+        return resultados
+
+
+# Instância compartilhada pelo scraper e pelos agentes
+sentiment_analyzer = SentimentAnalyzer()
+
+
+def reprocessar_banco(conn, analisador=sentiment_analyzer, lote=500):
+    # Recalcula o sentimento das notícias gravadas por outra versão do analisador (ou pelo TextBlob, com
+    # versão NULL), em lotes pelo id; retorna quantas foram atualizadas
+    atualizadas = 0
+    ultimo_id = 0
+    while True:
+        linhas = conn.execute(
+            """SELECT id, texto FROM noticias
+            WHERE id > ? AND (sentimento_versao IS NULL OR sentimento_versao != ?)
+            ORDER BY id LIMIT ?""", (ultimo_id, analisador.VERSION, lote)).fetchall()
+        if not linhas:
+            return atualizadas
+        resultados = analisador.analisar([texto for _, texto in linhas])
+        with conn:
+            conn.executemany(
+                "UPDATE noticias SET sentimento = ?, sentimento_versao = ?, sentimento_sentencas = ? WHERE id = ?",
+                [(resultado['polaridade'], analisador.VERSION, json.dumps(resultado['sentencas']), rowid)
+                 for (rowid, _), resultado in zip(linhas, resultados)])
+        atualizadas += len(linhas)
+        ultimo_id = linhas[-1][0]
+
+
+def main():
+    # Recalcula offline o sentimento das notícias antigas: python Sentiment.py [--db news.db]
+    from NewsStore import preparar_banco
+
+    parser = argparse.ArgumentParser(description="Recalcula o sentimento das notícias com a versão atual do léxico")
+    parser.add_argument('--db', default='news.db', help="banco com a tabela noticias")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        preparar_banco(conn)
+        atualizadas = reprocessar_banco(conn)
+    finally:
+        conn.close()
+    print(f"Sentimento recalculado em {atualizadas} notícias (versão {sentiment_analyzer.VERSION})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from logger_config import logger
+
+
+class Stage:
+    # Estágio do pipeline: função, nomes dos resultados de que depende e tempo limite opcional
+
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Iterable[str] = (),
+                 timeout: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.timeout = timeout
+
+
+class StageScheduler:
+    # Executa estágios em ordem de dependência, rodando em paralelo os que já têm suas entradas prontas
+    # A falha de um estágio só impede os estágios que dependem dele
+
+    def __init__(self, stages: Iterable[Stage], max_workers: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+
+    def run(self, initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # Entradas que não são estágios (ex.: as notícias brutas) vêm em initial
+        # Retorna resultados, erros, estágios pulados e o tempo de parede de cada estágio
+        results = dict(initial or {})
+        errors = {}
+        skipped = []
+        timings = {}
+
+        pending = dict(self.stages)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                # Pular estágios cujas dependências falharam ou foram puladas
+                for name, stage in list(pending.items()):
+                    if any(dep in errors or dep in skipped for dep in stage.inputs):
+                        skipped.append(name)
+                        del pending[name]
+                        logger.warning(f"Estágio '{name}' pulado: dependência indisponível")
+
+                # Submeter estágios prontos
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.inputs):
+                        args = [results[dep] for dep in stage.inputs]
+                        running[executor.submit(self._executar, stage, args)] = (stage, time.perf_counter())
+                        del pending[name]
+
+                if not running:
+                    # Dependências que nunca serão satisfeitas
+                    for name in pending:
+                        errors[name] = f"Entradas ausentes: {[dep for dep in self.stages[name].inputs if dep not in results]}"
+                    break
+
+                done, _ = wait(running, timeout=self._proximo_limite(running), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage, _ = running.pop(future)
+                    try:
+                        results[stage.name], timings[stage.name] = future.result()
+                    except Exception as e:
+                        errors[stage.name] = str(e)
+                        logger.error(f"Estágio '{stage.name}' falhou: {str(e)}")
+
+                # Estágios que estouraram o tempo limite são abandonados (a thread termina sozinha)
+                now = time.perf_counter()
+                for future, (stage, started) in list(running.items()):
+                    if stage.timeout is not None and now - started > stage.timeout:
+                        running.pop(future)
+                        timings[stage.name] = now - started
+                        errors[stage.name] = f"tempo limite de {stage.timeout}s excedido"
+                        logger.error(f"Estágio '{stage.name}' excedeu o tempo limite de {stage.timeout}s")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for name, seconds in timings.items():
+            logger.info(f"Estágio '{name}': {seconds * 1000:.1f} ms")
+
+        return {
+            'results': results,
+            'errors': errors,
+            'skipped': skipped,
+            'timings': timings
+        }
+
+    def _executar(self, stage: Stage, args):
+        started = time.perf_counter()
+        result = stage.func(*args)
+        return result, time.perf_counter() - started
+
+    def _proximo_limite(self, running):
+        # Quanto esperar até o próximo estágio em execução atingir seu tempo limite
+        now = time.perf_counter()
+        limits = [stage.timeout - (now - started) for stage, started in running.values() if stage.timeout is not None]
+        return max(min(limits), 0) if limits else None
@@ -0,0 +1,117 @@
+import re
+
+import numpy as np
+
+from NewsDocument import TOKEN_PATTERN
+
+# Sentença: do primeiro caractere visível até a pontuação final seguida de espaço (não quebra "R$ 1.000" ou "3,5")
+SENTENCE_PATTERN = re.compile(r'\S.*?(?:[.!?]+(?=\s|$)|$)', re.S)
+
+# Palavras muito frequentes em português, ignoradas na pontuação das sentenças
+STOPWORDS = np.array(sorted({
+    'a', 'ao', 'aos', 'as', 'à', 'às', 'com', 'como', 'da', 'das', 'de', 'do', 'dos', 'e', 'é', 'ela', 'ele',
+    'em', 'entre', 'era', 'foi', 'há', 'isso', 'já', 'mais', 'mas', 'na', 'nas', 'não', 'no', 'nos', 'o', 'os',
+    'ou', 'para', 'pela', 'pelas', 'pelo', 'pelos', 'por', 'que', 'se', 'ser', 'seu', 'sua', 'são', 'também',
+    'um', 'uma', 'foram', 'segundo', 'sobre', 'até', 'após', 'ainda', 'está', 'vai', 'tem', 'nesta', 'neste'
+}))
+
+
+class ExtractiveSummarizer:
+    # Resumo extrativo por TF-IDF: escolhe as sentenças mais próximas do centróide da própria notícia
+    # Todas as notícias de uma execução são pontuadas de uma vez, com a matriz esparsa sentença x termo
+    # em formato COO (arrays NumPy); o IDF é calculado entre as sentenças de cada notícia, então o
+    # resumo depende só da notícia e pode ser guardado no cache pelo id (hash do conteúdo)
+
+    VERSION = '1.0'
+
+    def __init__(self, bonus_inicio=0.1, min_tokens=4):
+        # bonus_inicio favorece as primeiras sentenças (o lide); sentenças com menos de min_tokens são ignoradas
+        self.bonus_inicio = bonus_inicio
+        self.min_tokens = min_tokens
+
+    def resumir(self, items, num_sentencas=2, cache=None):
+        # Retorna {news_id: resumo}; com um AgentCache, só as notícias ainda não resumidas são processadas
+        items = list({item.id: item for item in items}.values())
+        prefixo = f"resumo:{self.VERSION}:{num_sentencas}:{self.bonus_inicio}:{self.min_tokens}"
+        resumos = {}
+        if cache is not None:
+            salvos = cache.obter_varios([f"{prefixo}:{item.id}" for item in items])
+            resumos = {item.id: salvos[f"{prefixo}:{item.id}"] for item in items if f"{prefixo}:{item.id}" in salvos}
+
+        faltando = [item for item in items if item.id not in resumos]
+        novos = self._resumir_lote(faltando, num_sentencas) if faltando else {}
+        if cache is not None:
+            cache.salvar_varios({f"{prefixo}:{news_id}": resumo for news_id, resumo in novos.items()})
+
+        resumos.update(novos)
+        return resumos
+
+    def _resumir_lote(self, items, num_sentencas):
+        sentencas = [[m.group().strip() for m in SENTENCE_PATTERN.finditer(item.content)] for item in items]
+
+        # Tokenização: uma chamada de regex por sentença; o resto é vetorizado
+        artigo, posicao, linhas, tokens = [], [], [], []
+        for a, frases in enumerate(sentencas):
+            for p, frase in enumerate(frases):
+                encontrados = TOKEN_PATTERN.findall(frase.lower())
+                linhas.extend([len(artigo)] * len(encontrados))
+                tokens.extend(encontrados)
+                artigo.append(a)
+                posicao.append(p)
+
+        resumos = {item.id: item.resumo(200) for item, frases in zip(items, sentencas) if not frases}
+        if not tokens:
+            return {item.id: item.resumo(200) for item in items}
+
+        artigo = np.array(artigo)
+        posicao = np.array(posicao)
+        num_sentencas_total = len(artigo)
+        linhas = np.array(linhas)
+        tokens = np.array(tokens)
+        tamanho = np.bincount(linhas, minlength=num_sentencas_total)
+
+        relevantes = ~np.isin(tokens, STOPWORDS)
+        vocabulario, colunas = np.unique(tokens[relevantes], return_inverse=True)
+        linhas = linhas[relevantes]
+        v = len(vocabulario)
+
+        # TF: entradas (sentença, termo) somadas
+        chave_st, tf = np.unique(linhas * v + colunas, return_counts=True)
+        s_linha = chave_st // v
+        s_artigo = artigo[s_linha]
+
+        # DF por (notícia, termo): quantas sentenças da notícia contêm o termo
+        chave_at, inv_at, df = np.unique(s_artigo * v + chave_st % v, return_inverse=True, return_counts=True)
+        sentencas_por_artigo = np.bincount(artigo, minlength=len(items))
+        idf = np.log((1 + sentencas_por_artigo[s_artigo]) / (1 + df[inv_at])) + 1
+        peso = tf * idf
+
+        # Similaridade de cosseno entre cada sentença e o centróide da sua notícia
+        centroide = np.bincount(inv_at, weights=peso)
+        norma_sentenca = np.sqrt(np.bincount(s_linha, weights=peso ** 2, minlength=num_sentencas_total))
+        norma_artigo = np.sqrt(np.bincount(chave_at // v, weights=centroide ** 2, minlength=len(items)))
+        produto = np.bincount(s_linha, weights=peso * centroide[inv_at], minlength=num_sentencas_total)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pontuacao = np.nan_to_num(produto / (norma_sentenca * norma_artigo[artigo]))
+        pontuacao *= 1 + self.bonus_inicio / (1 + posicao)
+        pontuacao[tamanho < self.min_tokens] = -1
+
+        # As num_sentencas melhores de cada notícia, depois recolocadas na ordem original do texto
+        ordem = np.lexsort((-pontuacao, artigo))
+        artigo_ordenado = artigo[ordem]
+        inicios = np.flatnonzero(np.r_[True, artigo_ordenado[1:] != artigo_ordenado[:-1]])
+        posto = np.arange(len(ordem)) - np.repeat(inicios, np.diff(np.r_[inicios, len(ordem)]))
+        escolhidas = ordem[posto < num_sentencas]
+        escolhidas = escolhidas[np.lexsort((posicao[escolhidas], artigo[escolhidas]))]
+
+        partes = {}
+        for indice in escolhidas:
+            partes.setdefault(artigo[indice], []).append(sentencas[artigo[indice]][posicao[indice]])
+        for a, item in enumerate(items):
+            if a in partes:
+                resumos[item.id] = " ".join(partes[a])
+        return resumos
+
+
+# Instância compartilhada pelo scraper e pelos agentes
+summarizer = ExtractiveSummarizer()
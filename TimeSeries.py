@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Quantil da normal padrão para intervalos de previsão de 90%
+Z_90 = 1.6449
+
+
+def soma_movel(valores, janela):
+    # Soma dos últimos `janela` dias em cada dia (as primeiras posições somam o que houver)
+    # valores tem uma série por linha; o cálculo é feito para todas as linhas de uma vez
+    soma = np.cumsum(valores, axis=-1)
+    soma[..., janela:] = soma[..., janela:] - soma[..., :-janela]
+    return soma
+
+
+def soma_exponencial(valores, meia_vida, precisao=1e-4):
+    # Soma com pesos exponencialmente decrescentes para trás (EWMA sem normalização); a média
+    # exponencial de uma razão é a razão das somas. O núcleo é truncado quando o peso fica abaixo
+    # de `precisao`, e a convolução é feita como produto das janelas deslizantes pelos pesos
+    decaimento = 0.5 ** (1 / meia_vida)
+    tamanho = max(1, min(valores.shape[-1], math.ceil(math.log(precisao) / math.log(decaimento))))
+    pesos = decaimento ** np.arange(tamanho)[::-1]
+    largura = [(0, 0)] * (valores.ndim - 1) + [(tamanho - 1, 0)]
+    return sliding_window_view(np.pad(valores, largura), tamanho, axis=-1) @ pesos
+
+
+def razao(numerador, denominador):
+    # Divisão elemento a elemento; NaN onde o denominador é zero
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominador > 0, numerador / np.where(denominador > 0, denominador, 1), np.nan)
+
+
+def ajustar_tendencia(valores, pesos):
+    # Regressão linear ponderada valor ~ a + b * dia para cada linha (dias com peso 0 ou valor NaN são ignorados)
+    # Retorna nível no último dia, inclinação por dia, desvio-padrão dos resíduos e o necessário para
+    # o erro da previsão; linhas com menos de 3 dias válidos ficam com NaN
+    dias = np.arange(valores.shape[-1], dtype=float)
+    validos = (pesos > 0) & ~np.isnan(valores)
+    n = validos.sum(axis=-1)
+    # Pesos relativos (média 1 entre os dias válidos), para que o erro não dependa da escala dos pesos
+    pesos = np.where(validos, pesos, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pesos = pesos / (pesos.sum(axis=-1, keepdims=True) / n[..., None])
+        valores = np.where(validos, valores, 0.0)
+
+        total = pesos.sum(axis=-1)
+        media_dia = (pesos * dias).sum(axis=-1) / total
+        media_valor = (pesos * valores).sum(axis=-1) / total
+        desvio_dia = dias - media_dia[..., None]
+        sxx = (pesos * desvio_dia ** 2).sum(axis=-1)
+        inclinacao = (pesos * desvio_dia * (valores - media_valor[..., None])).sum(axis=-1) / sxx
+        intercepto = media_valor - inclinacao * media_dia
+        residuos = valores - intercepto[..., None] - inclinacao[..., None] * dias
+        sigma = np.sqrt((pesos * residuos ** 2).sum(axis=-1) / (n - 2))
+
+    insuficiente = n < 3
+    return {
+        'nivel': np.where(insuficiente, np.nan, intercepto + inclinacao * dias[-1]),
+        'inclinacao': np.where(insuficiente, np.nan, inclinacao),
+        'sigma': np.where(insuficiente, np.nan, sigma),
+        'n': n,
+        'media_dia': media_dia,
+        'sxx': sxx,
+        'ultimo_dia': dias[-1]
+    }
+
+
+def prever(ajuste, passos, z=Z_90):
+    # Previsão `passos` dias depois do último, com intervalo de previsão (valor, inferior, superior)
+    dia = ajuste['ultimo_dia'] + passos
+    valor = ajuste['nivel'] + ajuste['inclinacao'] * passos
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erro = ajuste['sigma'] * np.sqrt(1 + 1 / ajuste['n'] + (dia - ajuste['media_dia']) ** 2 / ajuste['sxx'])
+    return valor, valor - z * erro, valor + z * erro
+
+
+def probabilidade_acima(valor, inferior, superior, limite, z=Z_90):
+    # P(previsão > limite), supondo erro normal com o desvio implícito no intervalo de previsão
+    erro = (superior - inferior) / (2 * z)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        padronizado = (limite - valor) / erro
+    return 0.5 * np.vectorize(math.erfc)(padronizado / math.sqrt(2))
@@ -0,0 +1,298 @@
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from NewsDocument import TOKEN_PATTERN, remover_acentos
+from NewsItem import NewsItem
+from Summarizer import STOPWORDS
+
+# Palavras ignoradas, já sem acento (o texto é comparado sem acentos)
+_STOPWORDS = {remover_acentos(palavra) for palavra in STOPWORDS}
+
+
+class TopicClusterer:
+    # Agrupa as notícias em histórias (clusters) por similaridade de cosseno entre vetores TF-IDF esparsos
+    # K-means esférico em mini-lotes: cada lote é comparado de uma vez com todos os centróides; a notícia
+    # entra no cluster mais próximo se a similaridade passa do limiar, senão forma um cluster novo com as
+    # notícias parecidas do mesmo lote. Os termos passam por hashing (vocabulário de tamanho fixo) e cada
+    # centróide guarda só seus termos mais fortes, então a memória é limitada por max_clusters e não pelo
+    # volume de notícias. Centróides, frequências de documento e a atribuição das notícias ficam no banco,
+    # e as notícias de execuções seguintes continuam os mesmos clusters
+
+    def __init__(self, db_path='news.db', limiar=0.2, max_clusters=2000, dimensoes=2 ** 18,
+                 termos_por_noticia=48, termos_por_centroide=64, memoria=50, tamanho_lote=256):
+        self.limiar = limiar
+        self.max_clusters = max_clusters
+        self.dimensoes = dimensoes
+        self.termos_por_noticia = termos_por_noticia
+        self.termos_por_centroide = termos_por_centroide
+        # Peso máximo do centróide atual na atualização (taxa de aprendizado mínima de 1/memoria)
+        self.memoria = memoria
+        self.tamanho_lote = tamanho_lote
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_database()
+        self._carregar()
+
+    def _create_database(self):
+        # Centróides (termos e pesos em BLOB), cluster de cada notícia e frequências de documento
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS topicos_clusters (
+                cluster_id INTEGER PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL,
+                termos BLOB NOT NULL,
+                pesos BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS topicos_membros (
+                news_id TEXT PRIMARY KEY,
+                cluster_id INTEGER NOT NULL,
+                similaridade REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_topicos_membros_cluster ON topicos_membros (cluster_id);
+            CREATE TABLE IF NOT EXISTS topicos_estado (
+                chave TEXT PRIMARY KEY,
+                valor BLOB NOT NULL
+            );
+        ''')
+        self.conn.commit()
+
+    def _carregar(self):
+        # Lê centróides e frequências de documento salvos (um vocabulário de outro tamanho é descartado)
+        self.clusters = {}
+        for cluster_id, tamanho, atualizado_em, termos, pesos in self.conn.execute(
+                "SELECT cluster_id, tamanho, atualizado_em, termos, pesos FROM topicos_clusters"):
+            self.clusters[cluster_id] = (np.frombuffer(termos, dtype=np.int32),
+                                         np.frombuffer(pesos, dtype=np.float32), tamanho, atualizado_em)
+        self._proximo_id = max(self.clusters, default=0) + 1
+
+        estado = dict(self.conn.execute("SELECT chave, valor FROM topicos_estado"))
+        df = np.frombuffer(estado['df'], dtype=np.int32) if 'df' in estado else None
+        if df is not None and len(df) == self.dimensoes:
+            self.df = df.copy()
+            self.total_documentos = int(estado['total_documentos'])
+        else:
+            self.df = np.zeros(self.dimensoes, dtype=np.int32)
+            self.total_documentos = 0
+
+    def agrupar(self, items):
+        # Repassa as notícias (lista ou fluxo) atribuindo cada uma a um cluster, em lotes de tamanho_lote
+        # As notícias seguem adiante sem esperar o lote; as que já têm cluster não são reprocessadas
+        lote = []
+        for news in items:
+            item = NewsItem.coerce(news)
+            lote.append(item)
+            if len(lote) >= self.tamanho_lote:
+                self.atribuir(lote)
+                lote = []
+            yield item
+        if lote:
+            self.atribuir(lote)
+
+    def atribuir(self, items):
+        # Atribui um cluster a cada notícia ainda não agrupada; retorna {news_id: cluster_id} das novas
+        with self._lock:
+            items = list({item.id: item for item in items}.values())
+            placeholders = ", ".join("?" * len(items))
+            conhecidas = {row[0] for row in self.conn.execute(
+                f"SELECT news_id FROM topicos_membros WHERE news_id IN ({placeholders})",
+                [item.id for item in items])}
+            items = [item for item in items if item.id not in conhecidas]
+            if not items:
+                return {}
+
+            linhas, colunas, pesos = self._vetorizar(items)
+            if not len(linhas):
+                return {}
+            return self._atribuir_lote(items, linhas, colunas, pesos)
+
+    def _vetorizar(self, items):
+        # Vetores TF-IDF dos itens em formato COO (linha, termo, peso), com os termos mais fortes de cada
+        # notícia e norma 1; o título conta em dobro. Também soma o lote às frequências de documento
+        linhas, tokens = [], []
+        for linha, item in enumerate(items):
+            encontrados = [token for token in TOKEN_PATTERN.findall(f"{item.title} {item.title} {item.content}".lower())
+                           if len(token) > 2 and not token.isdigit()]
+            linhas.extend([linha] * len(encontrados))
+            tokens.extend(encontrados)
+
+        # Acentos, palavras ignoradas e hash tratados uma única vez por palavra distinta do lote
+        unicos, inverso = np.unique(np.array(tokens, dtype=str), return_inverse=True)
+        sem_acento = [remover_acentos(token) for token in unicos]
+        hashes = np.fromiter((-1 if token in _STOPWORDS else zlib.crc32(token.encode('utf-8')) % self.dimensoes
+                              for token in sem_acento), dtype=np.int64, count=len(unicos))
+        hashes = hashes[inverso]
+        validos = hashes >= 0
+        if not validos.any():
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+        chave, tf = np.unique(np.array(linhas)[validos] * self.dimensoes + hashes[validos], return_counts=True)
+        linhas, colunas = chave // self.dimensoes, chave % self.dimensoes
+
+        np.add.at(self.df, colunas, 1)
+        self.total_documentos += len(items)
+        pesos = (1 + np.log(tf)) * (np.log((1 + self.total_documentos) / (1 + self.df[colunas])) + 1)
+
+        linhas, colunas, pesos = self._truncar(linhas, colunas, pesos, self.termos_por_noticia)
+        return linhas, colunas, pesos
+
+    @staticmethod
+    def _truncar(linhas, colunas, pesos, limite):
+        # Mantém os `limite` maiores pesos de cada linha e normaliza cada linha (norma L2 = 1)
+        ordem = np.lexsort((-pesos, linhas))
+        linhas, colunas, pesos = linhas[ordem], colunas[ordem], pesos[ordem]
+        inicios = np.flatnonzero(np.r_[True, linhas[1:] != linhas[:-1]])
+        posto = np.arange(len(linhas)) - np.repeat(inicios, np.diff(np.r_[inicios, len(linhas)]))
+        manter = posto < limite
+        linhas, colunas, pesos = linhas[manter], colunas[manter], pesos[manter]
+        normas = np.sqrt(np.bincount(linhas, weights=pesos ** 2))
+        return linhas, colunas, pesos / normas[linhas]
+
+    def _similaridades(self, linhas, colunas, pesos, num_linhas):
+        # Cosseno de cada notícia do lote com cada centróide (matriz num_linhas x clusters)
+        # Junção pelos termos em comum: os termos dos centróides ficam ordenados e são achados com searchsorted
+        ids = list(self.clusters)
+        if not ids:
+            return ids, np.zeros((num_linhas, 0))
+        termos = np.concatenate([self.clusters[cluster_id][0] for cluster_id in ids])
+        valores = np.concatenate([self.clusters[cluster_id][1] for cluster_id in ids])
+        posicoes = np.repeat(np.arange(len(ids)), [len(self.clusters[cluster_id][0]) for cluster_id in ids])
+        ordem = np.argsort(termos, kind='stable')
+        termos, valores, posicoes = termos[ordem], valores[ordem], posicoes[ordem]
+
+        inicio = np.searchsorted(termos, colunas, 'left')
+        quantidade = np.searchsorted(termos, colunas, 'right') - inicio
+        deslocamento = np.arange(quantidade.sum()) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+        indices = np.repeat(inicio, quantidade) + deslocamento
+        produto = np.repeat(pesos, quantidade) * valores[indices]
+        celulas = np.repeat(linhas, quantidade) * len(ids) + posicoes[indices]
+        return ids, np.bincount(celulas, weights=produto, minlength=num_linhas * len(ids)).reshape(num_linhas, -1)
+
+    def _atribuir_lote(self, items, linhas, colunas, pesos):
+        num_linhas = len(items)
+        ids, similaridades = self._similaridades(linhas, colunas, pesos, num_linhas)
+        destino = np.full(num_linhas, -1, dtype=np.int64)
+        similaridade = np.zeros(num_linhas)
+        if ids:
+            melhores = similaridades.argmax(axis=1)
+            similaridade = similaridades[np.arange(num_linhas), melhores]
+            casadas = similaridade >= self.limiar
+            destino[casadas] = np.array(ids)[melhores[casadas]]
+
+        # As demais formam clusters novos entre si, pelo mesmo critério: cosseno com a soma normalizada dos
+        # membros de cada grupo, calculado sobre a matriz densa de similaridades do lote
+        com_termos = np.bincount(linhas, minlength=num_linhas) > 0
+        restantes = np.flatnonzero((destino < 0) & com_termos)
+        if len(restantes):
+            posicao = np.full(num_linhas, -1)
+            posicao[restantes] = np.arange(len(restantes))
+            vocabulario, coluna_local = np.unique(colunas, return_inverse=True)
+            densa = np.zeros((len(restantes), len(vocabulario)))
+            dentro = posicao[linhas] >= 0
+            densa[posicao[linhas[dentro]], coluna_local[dentro]] = pesos[dentro]
+            entre_si = densa @ densa.T
+
+            # Para cada grupo: membros e o quadrado da norma da soma dos seus vetores
+            grupos, normas = [], []
+            for i in range(len(restantes)):
+                produtos = [entre_si[i, membros].sum() for membros in grupos]
+                cossenos = [produto / np.sqrt(norma) for produto, norma in zip(produtos, normas)]
+                melhor = int(np.argmax(cossenos)) if cossenos else -1
+                if melhor >= 0 and cossenos[melhor] >= self.limiar:
+                    grupos[melhor].append(i)
+                    normas[melhor] += 2 * produtos[melhor] + 1
+                else:
+                    grupos.append([i])
+                    normas.append(1.0)
+            for membros, norma in zip(grupos, normas):
+                cluster_id = self._proximo_id
+                self._proximo_id += 1
+                destino[restantes[membros]] = cluster_id
+                similaridade[restantes[membros]] = entre_si[np.ix_(membros, membros)].sum(axis=1) / np.sqrt(norma)
+
+        atingidos = self._atualizar_centroides(destino, linhas, colunas, pesos)
+        self._salvar(items, destino, similaridade, atingidos)
+        return {item.id: int(cluster_id) for item, cluster_id in zip(items, destino) if cluster_id >= 0}
+
+    def _atualizar_centroides(self, destino, linhas, colunas, pesos):
+        # Centróide novo = normalização(centróide atual * min(tamanho, memoria) + soma dos vetores do lote)
+        # Retorna os ids dos clusters alterados
+        atingidos, posicao, contagem = np.unique(destino[destino >= 0], return_inverse=True, return_counts=True)
+        mapa = dict(zip(atingidos.tolist(), range(len(atingidos))))
+        dentro = destino[linhas] >= 0
+        partes_linhas = [np.array([mapa[c] for c in destino[linhas[dentro]].tolist()], dtype=np.int64)]
+        partes_colunas = [colunas[dentro]]
+        partes_pesos = [pesos[dentro]]
+        for cluster_id, indice in mapa.items():
+            if cluster_id in self.clusters:
+                termos, valores, tamanho, _ = self.clusters[cluster_id]
+                partes_linhas.append(np.full(len(termos), indice, dtype=np.int64))
+                partes_colunas.append(termos.astype(np.int64))
+                partes_pesos.append(valores * min(tamanho, self.memoria))
+
+        chave, inverso = np.unique(np.concatenate(partes_linhas) * self.dimensoes + np.concatenate(partes_colunas),
+                                   return_inverse=True)
+        soma = np.bincount(inverso, weights=np.concatenate(partes_pesos))
+        novas_linhas, novas_colunas, novos_pesos = self._truncar(chave // self.dimensoes, chave % self.dimensoes,
+                                                                 soma, self.termos_por_centroide)
+
+        agora = time.time()
+        inicios = np.searchsorted(novas_linhas, np.arange(len(atingidos) + 1))
+        for indice, cluster_id in enumerate(atingidos.tolist()):
+            trecho = slice(inicios[indice], inicios[indice + 1])
+            tamanho = self.clusters[cluster_id][2] if cluster_id in self.clusters else 0
+            self.clusters[cluster_id] = (novas_colunas[trecho].astype(np.int32),
+                                         novos_pesos[trecho].astype(np.float32),
+                                         tamanho + int(contagem[indice]), agora)
+        return atingidos.tolist()
+
+    def _salvar(self, items, destino, similaridade, atingidos):
+        # Grava atribuições, centróides alterados e frequências; descarta os clusters parados há mais tempo
+        excedentes = sorted(self.clusters, key=lambda cluster_id: self.clusters[cluster_id][3])
+        excedentes = excedentes[:max(len(self.clusters) - self.max_clusters, 0)]
+        for cluster_id in excedentes:
+            del self.clusters[cluster_id]
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO topicos_clusters VALUES (?, ?, ?, ?, ?)",
+                [(cluster_id, self.clusters[cluster_id][2], self.clusters[cluster_id][3],
+                  self.clusters[cluster_id][0].tobytes(), self.clusters[cluster_id][1].tobytes())
+                 for cluster_id in atingidos if cluster_id in self.clusters])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO topicos_membros VALUES (?, ?, ?)",
+                [(item.id, int(cluster_id), float(valor))
+                 for item, cluster_id, valor in zip(items, destino, similaridade) if cluster_id >= 0])
+            self.conn.executemany("DELETE FROM topicos_clusters WHERE cluster_id = ?",
+                                  [(cluster_id,) for cluster_id in excedentes])
+            self.conn.executemany("DELETE FROM topicos_membros WHERE cluster_id = ?",
+                                  [(cluster_id,) for cluster_id in excedentes])
+            self.conn.executemany("INSERT OR REPLACE INTO topicos_estado VALUES (?, ?)",
+                                  [('df', self.df.tobytes()), ('total_documentos', str(self.total_documentos))])
+
+    def grupos(self, news_ids):
+        # Cluster de cada notícia informada e o tamanho de cada cluster, no formato de entrada do Agente 5
+        # Notícias sem cluster (sem termos ou de clusters descartados) ficam de fora
+        news_ids = list(dict.fromkeys(news_ids))
+        assignments = {}
+        with self._lock:
+            for inicio in range(0, len(news_ids), 500):
+                lote = news_ids[inicio:inicio + 500]
+                placeholders = ", ".join("?" * len(lote))
+                assignments.update(self.conn.execute(
+                    f"SELECT news_id, cluster_id FROM topicos_membros WHERE news_id IN ({placeholders})", lote))
+            clusters = {cluster_id: {'news_count': self.clusters[cluster_id][2]}
+                        for cluster_id in set(assignments.values()) if cluster_id in self.clusters}
+        return {
+            'assignments': {news_id: cluster_id for news_id, cluster_id in assignments.items()
+                            if cluster_id in clusters},
+            'clusters': clusters
+        }
+
+    def close(self):
+        # Fecha a conexão com o banco dos clusters
+        self.conn.close()
@@ -0,0 +1,266 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from NewsStore import epoch_publicacao
+
+GRUPOS = ('palavras', 'categorias', 'entidades')
+
+
+def _fatores(meia_vida, instantes, referencia):
+    # Peso relativo de eventos em `instantes` vistos do instante `referencia` (1 quando não há decaimento)
+    if meia_vida is None:
+        return np.ones(len(instantes))
+    return 0.5 ** ((referencia - np.asarray(instantes, dtype=float)) / meia_vida)
+
+
+class CountMinSketch:
+    # Contagens aproximadas de um número ilimitado de chaves em memória fixa (profundidade x largura)
+    # A estimativa nunca fica abaixo do valor real e passa dele em no máximo e/largura do total, com
+    # probabilidade 1 - e^-profundidade. Com meia_vida (segundos), as contagens decaem exponencialmente:
+    # a tabela vale como uma janela deslizante com pesos maiores para os eventos recentes
+
+    def __init__(self, largura=2 ** 14, profundidade=4, meia_vida=None):
+        self.largura = largura
+        self.profundidade = profundidade
+        self.meia_vida = meia_vida
+        self.tabela = np.zeros((profundidade, largura))
+        # Instante a que as contagens da tabela se referem
+        self.instante = 0.0
+
+    def _posicoes(self, chaves):
+        # Colunas de cada chave em cada linha por hashing duplo (CRC32 é estável entre execuções, ao contrário de hash())
+        dados = [chave.encode('utf-8') for chave in chaves]
+        h1 = np.array([zlib.crc32(dado) for dado in dados], dtype=np.uint64)
+        h2 = np.array([zlib.crc32(dado, 0x9E3779B9) | 1 for dado in dados], dtype=np.uint64)
+        linhas = np.arange(self.profundidade, dtype=np.uint64)[:, None]
+        return ((h1 + linhas * h2) % np.uint64(self.largura)).astype(np.int64)
+
+    def avancar(self, instante):
+        # Traz a tabela até `instante`, aplicando o decaimento do tempo passado
+        if instante > self.instante:
+            if self.meia_vida is not None and self.instante:
+                self.tabela *= 0.5 ** ((instante - self.instante) / self.meia_vida)
+            self.instante = instante
+
+    def adicionar(self, chaves, pesos, instantes):
+        # Soma pesos às chaves; eventos anteriores ao instante da tabela entram já decaídos
+        if not chaves:
+            return
+        self.avancar(max(instantes))
+        pesos = np.asarray(pesos, dtype=float) * _fatores(self.meia_vida, instantes, self.instante)
+        posicoes = self._posicoes(chaves)
+        for linha in range(self.profundidade):
+            np.add.at(self.tabela[linha], posicoes[linha], pesos)
+
+    def estimar(self, chaves, instante=None):
+        # Contagem estimada de cada chave (o mínimo entre as linhas)
+        if instante is not None:
+            self.avancar(instante)
+        if not chaves:
+            return np.zeros(0)
+        posicoes = self._posicoes(chaves)
+        return self.tabela[np.arange(self.profundidade)[:, None], posicoes].min(axis=0)
+
+
+class SpaceSaving:
+    # As k chaves mais frequentes de um fluxo em memória fixa (Space-Saving ponderado): com o resumo cheio,
+    # uma chave nova substitui a de menor contagem e herda essa contagem como erro máximo
+    # Toda chave com contagem real acima de total/k está garantidamente no resumo
+
+    def __init__(self, k=100, meia_vida=None):
+        self.k = k
+        self.meia_vida = meia_vida
+        # chave -> [contagem, erro]
+        self.contagens = {}
+        self.instante = 0.0
+
+    def avancar(self, instante):
+        if instante > self.instante:
+            if self.meia_vida is not None and self.instante:
+                fator = 0.5 ** ((instante - self.instante) / self.meia_vida)
+                for entrada in self.contagens.values():
+                    entrada[0] *= fator
+                    entrada[1] *= fator
+            self.instante = instante
+
+    def adicionar(self, chaves, pesos, instantes):
+        if not chaves:
+            return
+        self.avancar(max(instantes))
+        pesos = (np.asarray(pesos, dtype=float) * _fatores(self.meia_vida, instantes, self.instante)).tolist()
+        for chave, peso in zip(chaves, pesos):
+            entrada = self.contagens.get(chave)
+            if entrada is not None:
+                entrada[0] += peso
+            elif len(self.contagens) < self.k:
+                self.contagens[chave] = [peso, 0.0]
+            else:
+                menor = min(self.contagens, key=lambda c: self.contagens[c][0])
+                minimo = self.contagens.pop(menor)[0]
+                self.contagens[chave] = [minimo + peso, minimo]
+
+    def topo(self, n=None, instante=None):
+        # [(chave, contagem, erro)] da maior para a menor contagem
+        if instante is not None:
+            self.avancar(instante)
+        ordenadas = sorted(self.contagens.items(), key=lambda par: -par[1][0])[:n]
+        return [(chave, contagem, erro) for chave, (contagem, erro) in ordenadas]
+
+
+class TrendTracker:
+    # Detecção de tendências no fluxo contínuo de notícias (palavras-chave, categorias e entidades)
+    # com memória fixa: dois Count-Min Sketches com decaimento exponencial medem cada chave numa janela
+    # recente (meia-vida de horas) e numa janela de base (dias); um Space-Saving por grupo guarda as
+    # chaves mais citadas na janela recente, que são as candidatas a "em alta". O surto é a razão entre a
+    # participação da chave no seu grupo na janela recente e na de base, o que neutraliza variações no volume
+    # total de notícias (e o início sem histórico). O estado inteiro é salvo no banco entre execuções (salvar),
+    # junto com os ids das notícias já observadas, para que cada notícia conte uma única vez em qualquer modo
+
+    def __init__(self, db_path='news.db', meia_vida_recente=6 * 3600, meia_vida_base=3 * 86400,
+                 largura=2 ** 14, profundidade=4, k=100):
+        self.meia_vida_recente = meia_vida_recente
+        self.meia_vida_base = meia_vida_base
+        self.recente = CountMinSketch(largura, profundidade, meia_vida_recente)
+        self.base = CountMinSketch(largura, profundidade, meia_vida_base)
+        self.topo = {grupo: SpaceSaving(k, meia_vida_recente) for grupo in GRUPOS}
+        # Notícias observadas desde o último salvar(): {news_id: instante}
+        self._pendentes = {}
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_database()
+        self._carregar()
+
+    def _create_database(self):
+        # Estado das estruturas (tabelas dos sketches em BLOB e resumos Space-Saving em JSON)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tendencias_estado (
+                chave TEXT PRIMARY KEY,
+                valor BLOB NOT NULL
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tendencias_noticias (
+                news_id TEXT PRIMARY KEY,
+                instante REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def _carregar(self):
+        estado = dict(self.conn.execute("SELECT chave, valor FROM tendencias_estado"))
+        for nome, sketch in (('recente', self.recente), ('base', self.base)):
+            if f'{nome}_tabela' in estado:
+                tabela = np.frombuffer(estado[f'{nome}_tabela'], dtype=np.float64)
+                if tabela.size == sketch.tabela.size:
+                    # Com outra largura ou profundidade o estado salvo não serve e os sketches recomeçam
+                    sketch.tabela = tabela.reshape(sketch.tabela.shape).copy()
+                    sketch.instante = float(estado[f'{nome}_instante'])
+        for grupo, resumo in self.topo.items():
+            if f'topo_{grupo}' in estado:
+                salvo = json.loads(estado[f'topo_{grupo}'])
+                resumo.contagens = dict(sorted(salvo['contagens'].items(), key=lambda par: -par[1][0])[:resumo.k])
+                resumo.instante = salvo['instante']
+
+    def salvar(self):
+        # Grava o estado atual no banco (chamado ao fim de cada execução)
+        # As notícias observadas são gravadas na mesma transação que as contagens a que elas somaram; as com
+        # peso desprezível na janela de base (mais de 10 meias-vidas) deixam de ser lembradas
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO tendencias_noticias VALUES (?, ?)", self._pendentes.items())
+            self._pendentes = {}
+            self.conn.execute("DELETE FROM tendencias_noticias WHERE instante < ?",
+                              (self.base.instante - 10 * self.meia_vida_base,))
+            linhas = []
+            for nome, sketch in (('recente', self.recente), ('base', self.base)):
+                linhas.append((f'{nome}_tabela', sketch.tabela.tobytes()))
+                linhas.append((f'{nome}_instante', str(sketch.instante)))
+            for grupo, resumo in self.topo.items():
+                linhas.append((f'topo_{grupo}', json.dumps({'contagens': resumo.contagens,
+                                                            'instante': resumo.instante}, ensure_ascii=False)))
+            self.conn.executemany("INSERT OR REPLACE INTO tendencias_estado VALUES (?, ?)", linhas)
+
+    def registrar(self, grupo, eventos):
+        # Soma eventos (chave, peso, instante em segundos desde a época) de um grupo aos sketches e ao resumo
+        if not eventos:
+            return
+        chaves, pesos, instantes = zip(*eventos)
+        # Cada evento também soma ao total do grupo (chave vazia), base das participações em surtos()
+        contadas = [f"{grupo}:{chave}" for chave in chaves] + [f"{grupo}:"] * len(chaves)
+        with self._lock:
+            self.recente.adicionar(contadas, pesos * 2, instantes * 2)
+            self.base.adicionar(contadas, pesos * 2, instantes * 2)
+            self.topo[grupo].adicionar(list(chaves), pesos, instantes)
+
+    def observar(self, items, entidades, pontuacoes):
+        # Alimenta os três grupos com notícias já analisadas: palavras-chave encontradas no texto, categorias
+        # do Agente 3 (pontuar_noticia) e entidades do Agente 2 (entidades_da_noticia); cada notícia conta uma
+        # vez por chave, no instante da publicação (ou agora, se a data é inválida ou futura)
+        # Notícias já observadas (nesta ou em execuções anteriores) são puladas; retorna quantas foram observadas
+        agora = time.time()
+        eventos = {grupo: [] for grupo in GRUPOS}
+        vistas = self._observadas([item.id for item in items])
+        observadas = {}
+        for item, encontradas, categorias in zip(items, entidades, pontuacoes):
+            if item.id in vistas or item.id in observadas:
+                continue
+            instante = min(epoch_publicacao(item.timestamp) or agora, agora)
+            observadas[item.id] = instante
+            eventos['palavras'].extend((termo, 1.0, instante) for termo in {termo for _, termo in item.doc.ocorrencias()})
+            eventos['categorias'].extend((categoria, 1.0, instante) for categoria in categorias)
+            eventos['entidades'].extend((nome.lower(), 1.0, instante)
+                                        for entity_type in ('companies', 'people', 'locations', 'tickers')
+                                        for nome in set(encontradas.get(entity_type, ())))
+        for grupo, lista in eventos.items():
+            self.registrar(grupo, lista)
+        with self._lock:
+            self._pendentes.update(observadas)
+        return len(observadas)
+
+    def _observadas(self, ids):
+        # Conjunto dos ids já observados, entre os informados
+        with self._lock:
+            vistas = {news_id for news_id in ids if news_id in self._pendentes}
+            for inicio in range(0, len(ids), 400):
+                lote = ids[inicio:inicio + 400]
+                vistas.update(row[0] for row in self.conn.execute(
+                    f"SELECT news_id FROM tendencias_noticias WHERE news_id IN ({', '.join('?' * len(lote))})",
+                    lote))
+        return vistas
+
+    def surtos(self, grupo, chaves, agora=None, minimo=3.0):
+        # {chave: surto} = participação da chave no grupo na janela recente / participação na janela de base
+        # (contagens com +1 de suavização). Chaves com menos de `minimo` ocorrências em ambas as janelas
+        # ficam neutras (1.0)
+        agora = agora if agora is not None else time.time()
+        contadas = [f"{grupo}:{chave}" for chave in chaves] + [f"{grupo}:"]
+        with self._lock:
+            *recente, total_recente = self.recente.estimar(contadas, agora)
+            *base, total_base = self.base.estimar(contadas, agora)
+        return {chave: float((r + 1) / (total_recente + 1) / ((b + 1) / (total_base + 1)))
+                if max(r, b) >= minimo else 1.0
+                for chave, r, b in zip(chaves, recente, base)}
+
+    def em_alta(self, grupo=None, limite=10, minimo=3.0, agora=None):
+        # O que está surgindo agora: chaves mais citadas na janela recente (Space-Saving) ordenadas pelo surto
+        # Só entram chaves com pelo menos `minimo` ocorrências recentes e surto acima de 1
+        agora = agora if agora is not None else time.time()
+        resultado = []
+        for nome in ([grupo] if grupo else GRUPOS):
+            with self._lock:
+                candidatos = [(chave, contagem) for chave, contagem, _ in self.topo[nome].topo(instante=agora)
+                              if contagem >= minimo]
+            surtos = self.surtos(nome, [chave for chave, _ in candidatos], agora, minimo)
+            resultado.extend({'grupo': nome, 'chave': chave, 'recente': round(contagem, 2),
+                              'surto': round(surtos[chave], 3)}
+                             for chave, contagem in candidatos if surtos[chave] > 1)
+        return sorted(resultado, key=lambda entrada: (-entrada['surto'], -entrada['recente']))[:limite]
+
+    def close(self):
+        # Fecha a conexão com o banco
+        self.conn.close()
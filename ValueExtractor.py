@@ -0,0 +1,219 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from NewsStore import epoch_publicacao
+
+MESES = ('janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho', 'agosto', 'setembro', 'outubro',
+         'novembro', 'dezembro')
+DIAS_SEMANA = ('segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'domingo')
+
+# Número no formato brasileiro: "1.234.567,89", "62,5" ou "2025"
+_NUMERO = r'(?<![\d.,])(?:\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:,\d+)?)'
+_ESCALA = r'(?:trilh(?:ões|ão|oes|ao)|bilh(?:ões|ão|oes|ao)|milh(?:ões|ão|oes|ao)|(?:tri|bi|mi|mil)(?![a-zà-ú]))'
+_MES = r'(?:janeiro|fevereiro|mar[çc]o|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)'
+_DIA_SEMANA = r'(?:segunda|ter[çc]a|quarta|quinta|sexta|s[áa]bado|domingo)(?:-feira)?'
+# Depois de um simples "na"/"no", "segunda" e "quarta" também são ordinais: exige "-feira"
+_DIA_SEMANA_EXPLICITO = r'(?:(?:segunda|ter[çc]a|quarta|quinta|sexta)-feira|s[áa]bado|domingo)'
+
+# Um único padrão com todas as formas; o grupo externo que casou (lastgroup) indica o tipo
+# A verificação inicial descarta em um passo as posições onde nenhuma forma pode começar (a maioria do texto),
+# em vez de tentar cada alternativa em cada caractere
+PADRAO_VALORES = re.compile(r'(?=[\d€]|R\$|US?\$|\b[ehanojfmsd]|(?-i:\b[A-Z]))(?:' + '|'.join([
+    rf'(?P<DINHEIRO>(?P<moeda>R\$|US\$|U\$|€|EUR)\s*(?P<quantia>{_NUMERO})(?:\s*(?P<escala>{_ESCALA}))?)',
+    # "2 milhões de reais" pede o "de"; depois de "mil" ou sem escala ele é opcional ("2 mil reais", "500 reais")
+    rf'(?P<DINHEIRO_EXTENSO>(?P<quantia_ext>{_NUMERO})(?:\s*(?P<escala_ext>{_ESCALA})\s+de'
+    rf'|\s*(?P<escala_mil>mil)(?:\s+de)?|(?:\s+de)?)\s+(?P<moeda_ext>reais|d[óo]lares|euros)\b)',
+    rf'(?P<DATA_NUMERICA>(?<![\d/])(?P<dia>\d{{1,2}})/(?P<mes>\d{{1,2}})/(?P<ano>\d{{4}}|\d{{2}})(?![\d/]))',
+    rf'(?P<DATA_ISO>(?<!\d)(?P<ano_iso>\d{{4}})-(?P<mes_iso>\d{{2}})-(?P<dia_iso>\d{{2}})(?!\d))',
+    rf'(?P<DATA_EXTENSO>(?<!\d)(?P<dia_ext>\d{{1,2}})\s*[º°]?\s+de\s+(?P<mes_ext>{_MES})'
+    rf'(?:\s+de\s+(?P<ano_ext>\d{{4}}))?\b)',
+    rf'(?P<MES_ANO>\b(?P<mes_ano>{_MES})\s+de\s+(?P<ano_mes>\d{{4}})\b)',
+    rf'(?P<PONTOS_PERCENTUAIS>(?P<pp>{_NUMERO})\s*(?:p\.\s?p\.|pontos?\s+percentua(?:l|is)))',
+    rf'(?P<PONTOS_BASE>(?P<pb>{_NUMERO})\s*(?:pontos?[-\s]base|bps\b|pontos?\s+b[áa]sicos?))',
+    rf'(?P<PERCENTUAL>(?P<pct>{_NUMERO})\s*(?:%|por\s+cento\b))',
+    rf'(?P<DIA_RELATIVO>\b(?P<relativo>anteontem|ontem|hoje|amanh[ãa])\b)',
+    rf'(?P<HA_DIAS>\bh[áa]\s+(?P<ha>\d+)\s+dias\b)',
+    rf'(?P<DIA_DA_SEMANA>\b(?:(?P<quando>nest[ae]|n[ao]\s+(?:pr[óo]xim[ao]|[úu]ltim[ao]))\s+(?P<semana>{_DIA_SEMANA})'
+    rf'|n[ao]\s+(?P<semana_explicita>{_DIA_SEMANA_EXPLICITO}))'
+    rf'(?:\s+(?P<passado>passad[ao]))?(?:\s*\((?P<dia_semana>\d{{1,2}})\))?)',
+    # Códigos de negociação da B3 (PETR4, VALE3, TAEE11); em maiúsculas mesmo com o padrão sem distinção de caixa
+    r'(?P<TICKER>(?-i:\b[A-Z]{4}(?:3[2-5]|11|[3-8])\b))',
+]) + ')', re.I)
+
+ESCALAS = {'tri': 1e12, 'bi': 1e9, 'mi': 1e6, 'mil': 1e3}
+MOEDAS = {'r$': 'BRL', 'reais': 'BRL', 'us$': 'USD', 'u$': 'USD', 'dólares': 'USD', 'dolares': 'USD',
+          '€': 'EUR', 'eur': 'EUR', 'euros': 'EUR'}
+
+# Tabela de cada tipo de valor: registros (tipo, valor, detalhe) de extrair() viram linhas destes tipos NumPy
+TIPOS = {
+    'dinheiro': np.dtype([('noticia', np.int64), ('valor', np.float64), ('moeda', 'U3')]),
+    'percentual': np.dtype([('noticia', np.int64), ('valor', np.float64), ('unidade', 'U3')]),
+    'pontos_base': np.dtype([('noticia', np.int64), ('valor', np.float64)]),
+    'data': np.dtype([('noticia', np.int64), ('dia', 'datetime64[D]'), ('relativa', np.bool_)]),
+    'ticker': np.dtype([('noticia', np.int64), ('codigo', 'U6')])
+}
+
+
+def _numero(texto):
+    return float(texto.replace('.', '').replace(',', '.'))
+
+
+def _escala(texto):
+    if not texto:
+        return 1.0
+    texto = texto.lower()
+    return ESCALAS['mil'] if texto == 'mil' else next(v for prefixo, v in ESCALAS.items() if texto.startswith(prefixo))
+
+
+def _data(ano, mes, dia):
+    try:
+        return date(ano, mes, dia)
+    except ValueError:
+        return None
+
+
+def _mes(nome):
+    return MESES.index(nome.lower().replace('marco', 'março')) + 1
+
+
+class ValueExtractor:
+    # Extrai valores estruturados do texto (dinheiro, percentuais, pontos-base, datas e tickers da B3)
+    # com uma única varredura por PADRAO_VALORES; os valores saem normalizados (R$ 1,5 bilhão -> 1.5e9 BRL,
+    # "nesta segunda-feira" -> data, resolvida pela data de publicação)
+    # tabela() junta os registros de várias notícias em arrays NumPy tipados (TIPOS), para agregação rápida
+
+    def extrair(self, texto, referencia=None):
+        # Retorna (trechos, registros): trechos por tipo de entidade ('values', 'dates', 'percentages', 'tickers')
+        # e registros (tipo, valor, detalhe) com os valores normalizados
+        # referencia é a data de publicação (date); sem ela, datas relativas ficam sem valor
+        trechos = {'values': [], 'dates': [], 'percentages': [], 'tickers': []}
+        registros = []
+        for m in PADRAO_VALORES.finditer(texto):
+            tipo = m.lastgroup
+            trecho = m.group()
+            if tipo == 'DINHEIRO':
+                trechos['values'].append(trecho)
+                registros.append(('dinheiro', _numero(m.group('quantia')) * _escala(m.group('escala')),
+                                  MOEDAS[m.group('moeda').lower()]))
+            elif tipo == 'DINHEIRO_EXTENSO':
+                trechos['values'].append(trecho)
+                escala = m.group('escala_ext') or m.group('escala_mil')
+                registros.append(('dinheiro', _numero(m.group('quantia_ext')) * _escala(escala),
+                                  MOEDAS[m.group('moeda_ext').lower()]))
+            elif tipo in ('PERCENTUAL', 'PONTOS_PERCENTUAIS'):
+                trechos['percentages'].append(trecho)
+                registros.append(('percentual', _numero(m.group('pct') or m.group('pp')),
+                                  '%' if tipo == 'PERCENTUAL' else 'p.p'))
+            elif tipo == 'PONTOS_BASE':
+                trechos['percentages'].append(trecho)
+                registros.append(('pontos_base', _numero(m.group('pb')), None))
+            elif tipo == 'TICKER':
+                trechos['tickers'].append(trecho)
+                registros.append(('ticker', trecho, None))
+            else:
+                trechos['dates'].append(trecho)
+                dia = self._resolver_data(m, tipo, referencia)
+                if dia is not None:
+                    registros.append(('data', dia.isoformat(),
+                                      tipo in ('DIA_RELATIVO', 'HA_DIAS', 'DIA_DA_SEMANA')))
+        return trechos, registros
+
+    def _resolver_data(self, m, tipo, referencia):
+        # Data (date) de uma ocorrência de data; None quando inválida ou relativa sem referência
+        if tipo == 'DATA_NUMERICA':
+            ano = int(m.group('ano'))
+            return _data(ano + 2000 if ano < 100 else ano, int(m.group('mes')), int(m.group('dia')))
+        if tipo == 'DATA_ISO':
+            return _data(int(m.group('ano_iso')), int(m.group('mes_iso')), int(m.group('dia_iso')))
+        if tipo == 'MES_ANO':
+            return _data(int(m.group('ano_mes')), _mes(m.group('mes_ano')), 1)
+        if tipo == 'DATA_EXTENSO':
+            if m.group('ano_ext'):
+                return _data(int(m.group('ano_ext')), _mes(m.group('mes_ext')), int(m.group('dia_ext')))
+            if referencia is None:
+                return None
+            # Sem ano: o da publicação, ou o vizinho quando a data fica a mais de seis meses dela
+            dia = _data(referencia.year, _mes(m.group('mes_ext')), int(m.group('dia_ext')))
+            if dia is not None and abs((dia - referencia).days) > 183:
+                dia = _data(referencia.year + (1 if dia < referencia else -1), dia.month, dia.day)
+            return dia
+
+        if referencia is None:
+            return None
+        if tipo == 'DIA_RELATIVO':
+            deslocamento = {'anteontem': -2, 'ontem': -1, 'hoje': 0, 'amanhã': 1, 'amanha': 1}
+            return referencia + timedelta(days=deslocamento[m.group('relativo').lower()])
+        if tipo == 'HA_DIAS':
+            return referencia - timedelta(days=int(m.group('ha')))
+
+        # Dia da semana: "nesta segunda-feira (23)" usa o dia do mês; senão o mais próximo na direção indicada
+        quando = (m.group('quando') or '').lower()
+        semana = (m.group('semana') or m.group('semana_explicita')).lower()
+        semana = semana.replace('terca', 'terça').replace('sabado', 'sábado')
+        alvo = DIAS_SEMANA.index(semana.replace('-feira', ''))
+        candidatos = [referencia + timedelta(days=d) for d in range(-7, 8)
+                      if (referencia + timedelta(days=d)).weekday() == alvo]
+        if m.group('dia_semana'):
+            candidatos = [dia for dia in candidatos if dia.day == int(m.group('dia_semana'))] or candidatos
+        if 'próxim' in quando or 'proxim' in quando:
+            candidatos = [dia for dia in candidatos if dia > referencia]
+        elif 'últim' in quando or 'ultim' in quando or m.group('passado'):
+            candidatos = [dia for dia in candidatos if dia < referencia]
+        return min(candidatos, key=lambda dia: abs((dia - referencia).days))
+
+    @staticmethod
+    def referencia(timestamp):
+        # Data de publicação (date, em UTC) a partir do timestamp de um NewsItem; None se inválido
+        segundos = epoch_publicacao(timestamp)
+        return datetime.fromtimestamp(segundos, timezone.utc).date() if segundos is not None else None
+
+    def tabela(self, registros_por_noticia, noticias=None):
+        # Arrays tipados (um por tipo de TIPOS) com os registros de cada notícia
+        # noticias dá o número de cada notícia na coluna 'noticia' (padrão: a posição na lista)
+        if noticias is None:
+            noticias = range(len(registros_por_noticia))
+        linhas = {tipo: [] for tipo in TIPOS}
+        for noticia, registros in zip(noticias, registros_por_noticia):
+            for tipo, valor, detalhe in registros:
+                linhas[tipo].append((noticia, valor, detalhe) if len(TIPOS[tipo]) == 3 else (noticia, valor))
+        return {tipo: np.array(linhas[tipo], dtype=dtype) for tipo, dtype in TIPOS.items()}
+
+    @staticmethod
+    def concatenar(tabelas):
+        # Junta tabelas de tabela() (por exemplo, de lotes diferentes do histórico)
+        return {tipo: np.concatenate([tabela[tipo] for tabela in tabelas] or [np.empty(0, dtype)])
+                for tipo, dtype in TIPOS.items()}
+
+    @staticmethod
+    def estatisticas(tabela, limite=10):
+        # Resumo das tabelas: dinheiro por moeda, distribuição de percentuais, período das datas e tickers mais citados
+        dinheiro = tabela['dinheiro']
+        resumo = {'dinheiro': {}}
+        for moeda in np.unique(dinheiro['moeda']).tolist():
+            valores = dinheiro['valor'][dinheiro['moeda'] == moeda]
+            resumo['dinheiro'][moeda] = {'mencoes': int(valores.size), 'total': float(valores.sum()),
+                                         'mediana': float(np.median(valores)), 'maximo': float(valores.max())}
+
+        for tipo, valores in (('percentual', tabela['percentual']['valor'][tabela['percentual']['unidade'] == '%']),
+                              ('pontos_base', tabela['pontos_base']['valor'])):
+            resumo[tipo] = {'mencoes': int(valores.size)}
+            if valores.size:
+                resumo[tipo].update({'mediana': float(np.median(valores)), 'minimo': float(valores.min()),
+                                     'maximo': float(valores.max())})
+
+        dias = tabela['data']['dia']
+        resumo['data'] = {'mencoes': int(dias.size),
+                          'primeira': str(dias.min()) if dias.size else None,
+                          'ultima': str(dias.max()) if dias.size else None}
+
+        codigos, contagens = np.unique(tabela['ticker']['codigo'], return_counts=True)
+        ordem = np.argsort(-contagens, kind='stable')[:limite]
+        resumo['ticker'] = {codigo: int(contagem) for codigo, contagem in
+                            zip(codigos[ordem].tolist(), contagens[ordem].tolist())}
+        return resumo
+
+
+# Instância compartilhada pelos agentes
+value_extractor = ValueExtractor()
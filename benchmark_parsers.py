@@ -0,0 +1,64 @@
+import argparse
+import glob
+import os
+import sqlite3
+import time
+import zlib
+
+from HtmlParser import HtmlParser, backends_disponiveis
+
+
+def carregar_paginas(caminho):
+    # Carrega as páginas salvas: um diretório de arquivos .html ou o banco do ResponseCache
+    if os.path.isdir(caminho):
+        paginas = []
+        for arquivo in sorted(glob.glob(os.path.join(caminho, '*.html'))):
+            with open(arquivo, encoding='utf-8') as f:
+                paginas.append(f.read())
+        return paginas
+
+    conn = sqlite3.connect(caminho)
+    rows = conn.execute("SELECT corpo FROM respostas WHERE classe = 'artigo' ORDER BY url").fetchall()
+    conn.close()
+    return [zlib.decompress(corpo).decode('utf-8') for (corpo,) in rows]
+
+
+def medir_backend(backend, paginas, repeticoes):
+    # Mede páginas/segundo de um backend e devolve também os artigos extraídos
+    parser = HtmlParser(backend)
+    artigos = [parser.extrair_artigo(html) for html in paginas]
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for html in paginas:
+            parser.extrair_artigo(html)
+    duracao = time.perf_counter() - inicio
+
+    return len(paginas) * repeticoes / duracao, artigos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de parsing de notícias da CNN Brasil")
+    parser.add_argument('fixtures', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                    'fixtures', 'paginas'),
+                        help="Diretório com páginas .html ou banco do ResponseCache (padrão: fixtures/paginas)")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    paginas = carregar_paginas(args.fixtures)
+    if not paginas:
+        print(f"Nenhuma página encontrada em {args.fixtures}")
+        return
+
+    print(f"{len(paginas)} páginas, {args.repeticoes} repetições")
+    referencia = None
+    for backend in reversed(backends_disponiveis()):
+        paginas_por_segundo, artigos = medir_backend(backend, paginas, args.repeticoes)
+        if referencia is None:
+            referencia = artigos
+        status = "ok" if artigos == referencia else "DIVERGE do html.parser"
+        print(f"{backend:12s} {paginas_por_segundo:10.1f} páginas/s  ({status})")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,10 @@ def main():
     print("🚀 Executando pipeline completo...\n")
     result = system.run_pipeline()
 
-    if result['status'] == 'success':
+    if result['status'] in ('success', 'partial'):
         print("\n Newsletter gerado com sucesso!")
+        if result['status'] == 'partial':
+            print(f" Atenção - estágios com erro: {', '.join(result['errors'])}")
         print(f" Estatísticas: {result['stats']['news_processed']} notícias processadas")
         print(f" Tópicos aprovados: {result['stats']['topics_approved']}")
         print(f" Confiança das predições: {result['stats']['predictions_confidence']:.1%}")
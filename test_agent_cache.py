@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from AgentCache import AUSENTE, AgentCache
+from Agents.Agent1_ThemeSummarizer import Agent1_ThemeSummarizer
+from NewsItem import NewsItem
+
+
+class TestAgentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        self.db_path = os.path.join(self.pasta, 'agent_cache.db')
+
+    def cache(self, **opcoes):
+        cache = AgentCache(self.db_path, **opcoes)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_none_e_um_resultado_valido(self):
+        cache = self.cache()
+        cache.salvar('a', None)
+        self.assertIsNone(cache.obter('a'))
+        self.assertIs(cache.obter('b'), AUSENTE)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_despeja_os_acessados_ha_mais_tempo(self):
+        cache = self.cache()
+        for chave in 'abc':
+            cache.salvar(chave, os.urandom(400))
+            time.sleep(0.01)
+        cache.obter('a')
+        time.sleep(0.01)
+        # Orçamento para três valores: 'b', o acessado há mais tempo, sai quando 'd' entra
+        cache.max_bytes = cache.total_bytes + 50
+        cache.salvar('d', os.urandom(400))
+
+        self.assertEqual(sorted(cache.obter_varios(list('abcd'))), ['a', 'c', 'd'])
+        self.assertEqual(cache.total_bytes,
+                         cache.conn.execute("SELECT SUM(tamanho) FROM resultados").fetchone()[0])
+
+    def test_substituir_nao_conta_o_tamanho_duas_vezes(self):
+        cache = self.cache()
+        cache.salvar('a', os.urandom(400))
+        total = cache.total_bytes
+        cache.salvar('a', os.urandom(400))
+        self.assertEqual(cache.total_bytes, total)
+        self.assertEqual(self.cache().total_bytes, total)
+
+    def test_agente_reaproveita_resultados_por_noticia(self):
+        agente = Agent1_ThemeSummarizer()
+        agente.cache = self.cache()
+        items = [NewsItem(url=f'https://exemplo.com/{i}', title=f'Notícia {i}', content='A Selic subiu.')
+                 for i in range(3)]
+        calculadas = []
+
+        def calcular(item):
+            calculadas.append(item.id)
+            return item.title
+
+        self.assertEqual(agente.memorizar_por_noticia(items[:2], calcular), ['Notícia 0', 'Notícia 1'])
+        self.assertEqual(agente.memorizar_por_noticia(items, calcular), ['Notícia 0', 'Notícia 1', 'Notícia 2'])
+        self.assertEqual(calculadas, [item.id for item in items])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,8 @@
 ﻿# Script de teste para verificar se o erro de importação circular foi resolvido
+# O sistema é inicializado numa pasta temporária: os bancos (news.db com suas migrações, caches) são criados lá,
+# e não no diretório de trabalho, inclusive quando o pytest coleta este arquivo
+import os
+import tempfile
 
 print("=== TESTE DE IMPORTAÇÃO - NEWSLETTER ECONÔMICO ===\n")
 
@@ -20,7 +24,13 @@ try:
     print("    EconomicNewsletterSystem importado com sucesso")
 
     print("\n5. Testando inicialização do sistema...")
-    system = EconomicNewsletterSystem()
+    diretorio = os.getcwd()
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as pasta:
+        os.chdir(pasta)
+        try:
+            system = EconomicNewsletterSystem()
+        finally:
+            os.chdir(diretorio)
     print("    Sistema inicializado com sucesso")
 
     print("\n TODOS OS TESTES PASSARAM!")
@@ -0,0 +1,96 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from Agents.Agent2_EntityExtractor import Agent2_EntityExtractor
+from Agents.Agent3_NewsClassifier import Agent3_NewsClassifier
+from BatchAnalysis import analisar_historico
+from HashingClassifier import HashingClassifier
+from NewsItem import NewsItem
+
+TEXTOS = [
+    ("Copom eleva a Selic", "O Copom elevou a taxa Selic em 0,5 p.p. e a inflação medida pelo IPCA preocupa. "
+                            "Os juros devem seguir altos, com impacto de R$ 2 bilhões."),
+    ("Petrobras tem lucro recorde", "A Petrobras divulgou lucro de R$ 30 bilhões no trimestre; o resultado e o "
+                                    "balanço superaram as expectativas. PETR4 subiu 3%."),
+    ("Ibovespa fecha em alta", "O Ibovespa subiu 1,2% e a bolsa B3 fechou em 130 mil pontos com ações de "
+                               "bancos; investimento estrangeiro voltou. VALE3 avançou 2%."),
+    ("Governo revisa meta fiscal", "O governo revisou a meta fiscal e o orçamento; o déficit e a despesa do INSS "
+                                   "pressionam a receita. Haddad falou em R$ 15 bilhões."),
+    ("Petróleo dispara com conflito", "O petróleo disparou 7% com o conflito entre Irã e Israel; o barril do "
+                                      "Brent passou de US$ 80 e o ataque no Oriente Médio preocupa."),
+    ("Soja e café em alta", "A soja e o café subiram na bolsa de Chicago; commodity agrícola teve alta de 2% "
+                            "e o minério de ferro caiu 1%."),
+]
+
+
+class TestAnaliseHistorica(unittest.TestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, True)
+        self.db_path = os.path.join(pasta, 'news.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE noticias (id INTEGER PRIMARY KEY, fonte TEXT, url TEXT UNIQUE, titulo TEXT, "
+                     "texto TEXT, data TEXT, sentimento REAL, categoria TEXT)")
+        linhas = [('CNN Brasil', f'https://exemplo.com/{i}/{j}', titulo, texto, '2025-06-23T10:00:00Z')
+                  for j in range(3) for i, (titulo, texto) in enumerate(TEXTOS)]
+        conn.executemany("INSERT INTO noticias (fonte, url, titulo, texto, data) VALUES (?, ?, ?, ?, ?)", linhas)
+        conn.commit()
+        conn.close()
+        self.items = [NewsItem(url=url, title=titulo, content=texto, timestamp=data, source=fonte)
+                      for fonte, url, titulo, texto, data in linhas]
+
+    def classificacao_do_agente(self, classifier):
+        pontuacoes = classifier.pontuar_lote(self.items, registrar=False)
+        distribuicao = {category: 0 for category in classifier.categorias_ativas()}
+        relevancia = dict(distribuicao)
+        for pontuacao in pontuacoes:
+            for category, valor in pontuacao.items():
+                distribuicao[category] += 1
+                relevancia[category] += valor
+        return distribuicao, relevancia
+
+    def assert_classificacao(self, classifier, resultado):
+        distribuicao, relevancia = self.classificacao_do_agente(classifier)
+        categorias = resultado['classifications']['classified_categories']
+        self.assertEqual(resultado['classifications']['category_distribution'], distribuicao)
+        self.assertEqual({category: data['relevance_score'] for category, data in categorias.items()}, relevancia)
+
+    def test_palavras_chave_como_no_pipeline(self):
+        resultado = analisar_historico(self.db_path, processos=1, tamanho_lote=4)
+        self.assertEqual(resultado['themes']['total_news'], len(self.items))
+        self.assert_classificacao(Agent3_NewsClassifier(), resultado)
+
+    def test_usa_o_modelo_salvo_no_banco(self):
+        classifier = Agent3_NewsClassifier()
+
+        def rotular(item):
+            pontuacao = classifier.pontuar_noticia(item)
+            return max(pontuacao, key=pontuacao.get) if pontuacao else None
+
+        HashingClassifier.treinar(rotular, self.db_path, minimo=1).salvar(self.db_path)
+        self.assertIsNotNone(classifier.carregar_modelo(self.db_path))
+
+        resultado = analisar_historico(self.db_path, processos=1, tamanho_lote=4)
+        self.assertEqual(set(resultado['classifications']['classified_categories']), set(classifier.model.categorias))
+        self.assert_classificacao(classifier, resultado)
+
+    def test_entidades_no_formato_do_agente(self):
+        resultado = analisar_historico(self.db_path, processos=1, tamanho_lote=4)['entities']
+        agente = Agent2_EntityExtractor()
+        esperado = agente.agregar_entidades([agente.entidades_da_noticia(item) for item in self.items])
+
+        for entity_type in ('values', 'dates', 'percentages'):
+            # Listas com repetição (a ordem depende da ordem dos lotes)
+            self.assertEqual(sorted(resultado['entities'][entity_type]), sorted(esperado['entities'][entity_type]))
+        for entity_type in ('companies', 'people', 'locations'):
+            self.assertEqual(sorted(resultado['entities'][entity_type]), sorted(esperado['entities'][entity_type]))
+        self.assertEqual(resultado['entities']['tickers'], esperado['entities']['tickers'])
+        self.assertEqual(resultado['entity_count'], esperado['entity_count'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from Agents.Agent3_NewsClassifier import Agent3_NewsClassifier
+from HashingClassifier import HashingClassifier, ler_configuracao
+from NewsItem import NewsItem
+
+# (título, texto, categoria do site)
+TEXTOS = [
+    ("Ibovespa fecha em alta", "O Ibovespa subiu e a bolsa fechou em alta com ações de bancos e investidores "
+                               "estrangeiros comprando papéis na B3.", 'mercado'),
+    ("Petrobras reajusta gasolina", "A Petrobras anunciou reajuste da gasolina e do diesel nas refinarias; "
+                                    "o combustível deve subir nos postos.", 'energia'),
+    ("Startup levanta rodada", "A startup de tecnologia levantou uma rodada de investimento para o aplicativo "
+                               "de pagamentos digitais.", 'tecnologia'),
+    ("Notícia sem categoria", "Um texto qualquer que o site não classificou.", 'outras'),
+]
+
+
+def noticia(titulo, texto):
+    return NewsItem(url='https://exemplo.com/nova', title=titulo, content=texto, timestamp='', source='')
+
+
+class TestHashingClassifier(unittest.TestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pasta, True)
+        self.db_path = os.path.join(pasta, 'news.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE noticias (id INTEGER PRIMARY KEY, fonte TEXT, url TEXT UNIQUE, titulo TEXT, "
+                     "texto TEXT, data TEXT, sentimento REAL, categoria TEXT)")
+        conn.executemany("INSERT INTO noticias (fonte, url, titulo, texto, categoria) VALUES (?, ?, ?, ?, ?)",
+                         [('CNN Brasil', f'https://exemplo.com/{i}/{j}', titulo, texto, categoria)
+                          for j in range(3) for i, (titulo, texto, categoria) in enumerate(TEXTOS)])
+        conn.commit()
+        conn.close()
+
+    def test_rotulos_vem_da_categoria_do_site(self):
+        modelo = HashingClassifier.treinar(db_path=self.db_path, minimo=1)
+        # 'energia' vale pelas duas categorias do mapeamento padrão; 'outras' fica fora do treino
+        self.assertEqual(sorted(modelo.categorias),
+                         ['commodities', 'energia', 'mercado_capitais', 'tecnologia'])
+        pontuacao = modelo.pontuar([noticia("Bolsa sobe", "O Ibovespa e as ações subiram na bolsa.")])[0]
+        self.assertEqual(max(pontuacao, key=pontuacao.get), 'mercado_capitais')
+
+    def test_rotular_pode_dar_varias_categorias(self):
+        modelo = HashingClassifier.treinar(lambda item: ['a', 'b'] if item.category == 'mercado' else None,
+                                           self.db_path, minimo=1)
+        self.assertEqual(modelo.categorias, ['a', 'b'])
+        probabilidades = modelo.probabilidades([noticia(*TEXTOS[0][:2])])
+        self.assertAlmostEqual(probabilidades[0, 0], probabilidades[0, 1])
+
+    def test_categoria_sem_palavras_chave_usa_prioridade_configurada(self):
+        HashingClassifier.treinar(db_path=self.db_path, minimo=1).salvar(self.db_path)
+        classifier = Agent3_NewsClassifier()
+        self.assertIsNotNone(classifier.carregar_modelo(self.db_path))
+        ativas = classifier.categorias_ativas()
+        _, prioridades = ler_configuracao(self.db_path)
+        self.assertEqual(ativas['tecnologia']['priority'], prioridades['tecnologia'])
+        self.assertEqual(ativas['mercado_capitais'], classifier.current_categories['mercado_capitais'])
+
+    def test_categoria_sem_prioridade_e_recusada(self):
+        # Cria as tabelas de configuração com os valores padrão e acrescenta um rótulo sem prioridade
+        ler_configuracao(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("INSERT INTO classificador_rotulos VALUES ('outras', 'diversos')")
+        conn.close()
+        HashingClassifier.treinar(db_path=self.db_path, minimo=1).salvar(self.db_path)
+        with self.assertRaises(ValueError):
+            HashingClassifier.carregar(self.db_path, categorias=Agent3_NewsClassifier().current_categories)
+
+    def test_versao_muda_com_o_modelo(self):
+        modelo = HashingClassifier.treinar(db_path=self.db_path, minimo=1)
+        modelo.salvar(self.db_path)
+        self.assertEqual(HashingClassifier.carregar(self.db_path).versao, modelo.versao)
+        outro = HashingClassifier.treinar(lambda item: item.category, self.db_path, minimo=1)
+        outro.salvar(self.db_path)
+        self.assertNotEqual(outro.versao, modelo.versao)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import glob
+import os
+import unittest
+
+from HtmlParser import HtmlParser, backends_disponiveis, remover_blocos_ignorados
+
+PAGINAS = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'paginas', '*.html')))
+
+
+class TestBlocosIgnorados(unittest.TestCase):
+
+    def test_remove_blocos(self):
+        html = ('<HEAD><title>x</title></head><body><script type="x">var a = "<p>";</SCRIPT >'
+                '<h1>Título</h1><style>p{}</style><p>Texto</p></body>')
+        self.assertEqual(remover_blocos_ignorados(html), '<body><h1>Título</h1><p>Texto</p></body>')
+
+    def test_bloco_sem_fechamento_fica(self):
+        html = '<p>a</p><script>sem fim<p>b</p>'
+        self.assertEqual(remover_blocos_ignorados(html), html)
+
+    def test_tag_parecida_nao_e_removida(self):
+        html = '<header><p>menu</p></header><p>Texto</p>'
+        self.assertEqual(remover_blocos_ignorados(html), html)
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_fixtures_existem(self):
+        self.assertTrue(PAGINAS)
+
+    def test_backends_extraem_o_mesmo_artigo(self):
+        referencia = HtmlParser('html.parser')
+        for caminho in PAGINAS:
+            with open(caminho, encoding='utf-8') as f:
+                html = f.read()
+            esperado = referencia.extrair_artigo(html)
+            self.assertNotEqual(esperado['title'], "Título não encontrado")
+            self.assertTrue(esperado['content'])
+            for backend in backends_disponiveis():
+                with self.subTest(pagina=os.path.basename(caminho), backend=backend):
+                    self.assertEqual(HtmlParser(backend).extrair_artigo(html), esperado)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+import KeywordMatcher
+from KeywordMatcher import KeywordMatcher as Matcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = Matcher()
+        self.matcher.registrar('temas', {'juros': ['selic', 'juros'], 'fiscal': ['meta fiscal', 'fiscal']})
+
+    def test_ocorrencias_sobrepostas(self):
+        ocorrencias = self.matcher.buscar('a meta fiscal e a selic; selic')
+        self.assertEqual(sorted(ocorrencias), [(2, 'meta fiscal'), (7, 'fiscal'), (18, 'selic'), (25, 'selic')])
+        self.assertEqual(self.matcher.agrupar(ocorrencias, 'temas'), {'fiscal': 2, 'juros': 1})
+        self.assertEqual(self.matcher.contar(ocorrencias, 'temas'), {'fiscal': 2, 'juros': 2})
+
+    def test_agrupar_usa_tags_do_registro_mais_recente(self):
+        ocorrencias = self.matcher.buscar('a selic subiu')
+        # Sem nova busca, as tags já refletem o dicionário substituído
+        self.matcher.registrar('temas', {'politica_monetaria': ['selic']})
+        self.assertEqual(self.matcher.agrupar(ocorrencias, 'temas'), {'politica_monetaria': 1})
+        self.assertEqual(self.matcher.buscar('a selic subiu'), [(2, 'selic')])
+
+    def test_versao_muda_so_quando_o_dicionario_muda(self):
+        versao = self.matcher.versao
+        self.matcher.registrar('temas', {'juros': ['selic', 'juros'], 'fiscal': ['meta fiscal', 'fiscal']})
+        self.assertEqual(self.matcher.versao, versao)
+        self.matcher.registrar('outro', {'x': ['y']})
+        self.assertEqual(self.matcher.versao, versao + 1)
+
+    def test_implementacao_em_python(self):
+        with mock.patch.object(KeywordMatcher, 'ahocorasick', None):
+            matcher = Matcher()
+            matcher.registrar('temas', {'juros': ['selic', 'juros'], 'fiscal': ['meta fiscal', 'fiscal']})
+            self.assertEqual(sorted(matcher.buscar('a meta fiscal e a selic; selic')),
+                             [(2, 'meta fiscal'), (7, 'fiscal'), (18, 'selic'), (25, 'selic')])
+
+    def test_sem_termos(self):
+        self.assertEqual(Matcher().buscar('qualquer texto'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
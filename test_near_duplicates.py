@@ -0,0 +1,87 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from NearDuplicates import NearDuplicateDetector
+from NewsItem import NewsItem
+
+TEXTO = ("O petróleo disparou após o ataque no Oriente Médio e o barril do Brent superou os 80 dólares, "
+         "enquanto analistas avaliam o impacto sobre a inflação brasileira e a política de preços da Petrobras "
+         "nas próximas semanas, com reflexos no câmbio, nos juros futuros e nas ações do setor de energia.")
+OUTRO_TEXTO = ("O Copom manteve a taxa Selic e sinalizou cautela diante das expectativas de inflação, "
+               "com o mercado revisando projeções para o câmbio e para o crescimento da economia neste ano, "
+               "enquanto o governo discute medidas fiscais para cumprir a meta do orçamento.")
+
+
+def noticia(url, texto, titulo='Título'):
+    return NewsItem(url=url, title=titulo, content=texto, timestamp='2025-06-23T10:00:00Z')
+
+
+class TestNearDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        self.db_path = os.path.join(self.pasta, 'news.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE noticias (id INTEGER PRIMARY KEY, url TEXT UNIQUE, titulo TEXT, texto TEXT)")
+        conn.commit()
+        conn.close()
+
+    def detector(self):
+        detector = NearDuplicateDetector(self.db_path)
+        self.addCleanup(detector.close)
+        return detector
+
+    def gravar(self, item):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO noticias (url, titulo, texto) VALUES (?, ?, ?)", (item.url, item.title, item.content))
+        conn.commit()
+        conn.close()
+
+    def test_quase_copia_no_mesmo_lote(self):
+        original = noticia('https://exemplo.com/a', TEXTO)
+        copia = noticia('https://exemplo.com/a?republicado', TEXTO + ' Atualizado.', 'Outro título')
+        outra = noticia('https://exemplo.com/b', OUTRO_TEXTO)
+        detector = self.detector()
+        self.assertEqual([item.id for item in detector.filtrar([original, copia, outra])], [original.id, outra.id])
+        self.assertEqual(detector.descartadas, 1)
+
+    def test_republicacao_de_execucao_anterior(self):
+        original = noticia('https://exemplo.com/a', TEXTO)
+        list(self.detector().filtrar([original]))
+        self.gravar(original)
+
+        # Nova execução (novo detector) recebe só a republicação
+        detector = self.detector()
+        copia = noticia('https://exemplo.com/a?republicado', TEXTO + ' Atualizado.')
+        self.assertEqual(list(detector.filtrar([copia])), [])
+        self.assertEqual(detector.descartadas, 1)
+
+    def test_republicacao_de_noticia_que_saiu_do_banco(self):
+        # Sem a canônica no banco, a republicação é a única cópia e segue para o pipeline
+        list(self.detector().filtrar([noticia('https://exemplo.com/a', TEXTO)]))
+        copia = noticia('https://exemplo.com/a?republicado', TEXTO + ' Atualizado.')
+        self.assertEqual([item.id for item in self.detector().filtrar([copia])], [copia.id])
+
+    def test_mesma_noticia_em_nova_execucao_passa(self):
+        original = noticia('https://exemplo.com/a', TEXTO)
+        list(self.detector().filtrar([original]))
+        self.gravar(original)
+        self.assertEqual([item.id for item in self.detector().filtrar([original])], [original.id])
+
+    def test_migra_tabela_sem_url(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE duplicatas_assinaturas (news_id TEXT PRIMARY KEY, canonica TEXT NOT NULL, "
+                     "assinatura BLOB NOT NULL)")
+        conn.commit()
+        conn.close()
+        detector = self.detector()
+        self.assertEqual(detector.canonica(noticia('https://exemplo.com/a', TEXTO)),
+                         noticia('https://exemplo.com/a', TEXTO).id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from NewsAggregates import NewsAggregates
+from NewsItem import NewsItem
+
+DIA = 86400
+
+
+def noticia(numero, data):
+    return NewsItem(url=f'https://exemplo.com/{numero}', title=f'Notícia {numero}', content=f'Texto {numero}',
+                    timestamp=data, source='CNN Brasil')
+
+
+def analise(item, tema='empresas', empresas=('petrobras',), pontuacoes=None):
+    entidades = {'companies': list(empresas), 'values': [], 'structured': [], 'mentions': {}}
+    return item, tema, entidades, pontuacoes if pontuacoes is not None else {'commodities': 2}
+
+
+class TestNewsAggregates(unittest.TestCase):
+
+    def setUp(self):
+        pasta = tempfile.mkdtemp()
+        self.db_path = os.path.join(pasta, 'news.db')
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE noticias (id INTEGER PRIMARY KEY, fonte TEXT, url TEXT UNIQUE, titulo TEXT, "
+                     "texto TEXT, data TEXT, sentimento REAL, categoria TEXT)")
+        conn.commit()
+        conn.close()
+        self.aggregates = NewsAggregates(self.db_path, janela_dias=7)
+        self.addCleanup(self.aggregates.close)
+
+    def gravar(self, *items):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany("INSERT INTO noticias (fonte, url, titulo, texto, data) VALUES (?, ?, ?, ?, ?)",
+                         [(item.source, item.url, item.title, item.content, item.timestamp) for item in items])
+        conn.commit()
+        conn.close()
+
+    def test_adicionar_e_remover_sao_simetricos(self):
+        items = [noticia(i, f'2025-06-2{i}T10:00:00Z') for i in range(3)]
+        self.assertEqual(self.aggregates.adicionar([analise(item) for item in items]), [item.id for item in items])
+        self.assertEqual(self.aggregates.contadores('categoria_relevancia'), {'commodities': 6})
+        self.assertEqual(self.aggregates.contadores('entidade_companies'), {'petrobras': 3})
+
+        self.assertEqual(self.aggregates.remover([item.id for item in items]), 3)
+        for grupo in ('total', 'tema', 'categoria_noticias', 'categoria_relevancia', 'entidade_companies'):
+            self.assertEqual(self.aggregates.contadores(grupo), {})
+
+    def test_janela_termina_na_noticia_mais_recente(self):
+        # Histórico antigo: a janela é medida a partir da notícia mais recente, não do relógio
+        recente, antiga = noticia(1, '2025-06-23T10:00:00Z'), noticia(2, '2025-06-01T10:00:00Z')
+        self.assertEqual(self.aggregates.adicionar([analise(recente), analise(antiga)]), [recente.id])
+        self.assertEqual(self.aggregates.contadores('total'), {'noticias': 1})
+
+    def test_noticia_fora_da_janela_nao_volta_como_nova(self):
+        recente, antiga = noticia(1, '2025-06-23T10:00:00Z'), noticia(2, '2025-06-01T10:00:00Z')
+        self.aggregates.adicionar([analise(recente), analise(antiga)])
+        nova = noticia(3, '2025-06-23T12:00:00Z')
+        self.assertEqual([item.id for item in self.aggregates.novas([recente, antiga, nova])], [nova.id])
+
+    def test_expirar_remove_as_que_sairam_da_janela(self):
+        items = [noticia(1, '2025-06-10T10:00:00Z'), noticia(2, '2025-06-16T10:00:00Z')]
+        self.aggregates.adicionar([analise(item) for item in items])
+        self.aggregates.adicionar([analise(noticia(3, '2025-06-20T10:00:00Z'))])
+        self.assertEqual(self.aggregates.expirar(), 1)
+        self.assertEqual(self.aggregates.contadores('total'), {'noticias': 2})
+
+    def test_novo_pontuador_repontua_a_janela(self):
+        items = [noticia(i, f'2025-06-2{i}T10:00:00Z') for i in range(3)]
+        self.gravar(*items)
+        self.aggregates.adicionar([analise(item) for item in items])
+        self.assertEqual(self.aggregates.repontuar('palavras-chave:x', lambda lote: [{} for _ in lote]), 3)
+        self.assertEqual(self.aggregates.contadores('categoria_relevancia'), {})
+
+        # Percentuais do modelo substituem as contagens de palavras-chave, sem somar as duas escalas
+        self.assertEqual(self.aggregates.repontuar('modelo:y', lambda lote: [{'commodities': 80} for _ in lote]), 3)
+        self.assertEqual(self.aggregates.contadores('categoria_relevancia'), {'commodities': 240})
+        self.assertEqual(self.aggregates.contadores('categoria_noticias'), {'commodities': 3})
+        self.assertEqual(self.aggregates.repontuar('modelo:y', lambda lote: self.fail("repontuou de novo")), 0)
+
+        self.aggregates.remover([item.id for item in items])
+        self.assertEqual(self.aggregates.contadores('categoria_relevancia'), {})
+
+    def test_classificacao_le_o_texto_da_tabela_noticias(self):
+        items = [noticia(i, f'2025-06-2{i}T10:00:00Z') for i in range(3)]
+        self.gravar(*items[:2])
+        self.aggregates.adicionar([analise(item, pontuacoes={'commodities': i + 1}) for i, item in enumerate(items)])
+        resultado = self.aggregates.classificacao({'commodities': {'priority': 'média'}})
+
+        categoria = resultado['classified_categories']['commodities']
+        # A notícia que não está no banco fica fora do ranking, mas continua na contagem
+        self.assertEqual([entry['news_id'] for entry in categoria['news']], [items[1].id, items[0].id])
+        self.assertEqual(categoria['news_count'], 3)
+        self.assertEqual(resultado['items'][items[1].id].content, 'Texto 1')
+        colunas = [row[1] for row in self.aggregates.conn.execute("PRAGMA table_info(agregado_noticias)")]
+        self.assertNotIn('texto', colunas)
+
+    def test_migra_tabela_com_copia_do_texto(self):
+        self.aggregates.close()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TABLE agregado_noticias")
+        conn.execute("CREATE TABLE agregado_noticias (news_id TEXT PRIMARY KEY, url TEXT, titulo TEXT, texto TEXT, "
+                     "data TEXT, fonte TEXT, publicado_em REAL NOT NULL, tema TEXT NOT NULL, entidades TEXT NOT NULL)")
+        conn.execute("INSERT INTO agregado_noticias VALUES ('a', 'u', 't', 'x', 'd', 'f', 1.0, 'outros', '{}')")
+        conn.commit()
+        conn.close()
+
+        self.aggregates = NewsAggregates(self.db_path)
+        self.assertEqual(self.aggregates.conn.execute("SELECT * FROM agregado_noticias").fetchall(),
+                         [('a', 'u', 1.0, 'outros', '{}')])
+
+
+if __name__ == '__main__':
+    unittest.main()
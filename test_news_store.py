@@ -0,0 +1,202 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from NewsItem import NewsItem
+from NewsStore import NewsStore, NewsWriter, epoch_publicacao, preparar_banco
+
+
+def criar_banco(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS noticias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fonte TEXT NOT NULL,
+            url TEXT UNIQUE NOT NULL,
+            titulo TEXT NOT NULL,
+            texto TEXT NOT NULL,
+            data TEXT,
+            sentimento REAL,
+            categoria TEXT,
+            data_coleta TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    preparar_banco(conn)
+    conn.close()
+
+
+def gravar(db_path, url, titulo, texto, data='2025-06-23T10:00:00Z', categoria=None):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO noticias (fonte, url, titulo, texto, data, publicado_em, categoria) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?)", ('teste', url, titulo, texto, data, epoch_publicacao(data), categoria))
+    conn.commit()
+    conn.close()
+
+
+class TestBaseNewsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        self.db_path = os.path.join(self.pasta, 'news.db')
+        criar_banco(self.db_path)
+
+    def store(self):
+        store = NewsStore(self.db_path)
+        self.addCleanup(store.close)
+        return store
+
+
+class TestBusca(TestBaseNewsStore):
+
+    def setUp(self):
+        super().setUp()
+        gravar(self.db_path, 'https://exemplo.com/1', 'Copom mantém a Selic',
+               'O Banco Central manteve os juros e citou a inflação.', '2025-06-18T10:00:00Z', 'juros')
+        gravar(self.db_path, 'https://exemplo.com/2', 'Ibovespa fecha em alta',
+               'A bolsa subiu apesar da Selic elevada e do dólar.', '2025-06-20T10:00:00Z', 'mercado')
+        gravar(self.db_path, 'https://exemplo.com/3', 'Petróleo dispara',
+               'O barril passou de 80 dólares com o conflito no Oriente Médio.', '2025-06-22T10:00:00Z',
+               'commodities')
+
+    def urls(self, items):
+        return [item.url for item in items]
+
+    def test_titulo_pesa_mais_no_ranking(self):
+        self.assertEqual(self.urls(self.store().buscar('selic')),
+                         ['https://exemplo.com/1', 'https://exemplo.com/2'])
+
+    def test_termos_sem_acento_e_frase_exata(self):
+        store = self.store()
+        self.assertEqual(self.urls(store.buscar('petroleo')), ['https://exemplo.com/3'])
+        self.assertEqual(self.urls(store.buscar(frase='oriente médio')), ['https://exemplo.com/3'])
+        self.assertEqual(store.buscar(frase='médio oriente'), [])
+        self.assertEqual(len(store.buscar('selic barril', qualquer_termo=True)), 3)
+
+    def test_filtros_de_data_e_categoria(self):
+        store = self.store()
+        self.assertEqual(self.urls(store.buscar('selic', desde='2025-06-19T00:00:00Z')), ['https://exemplo.com/2'])
+        self.assertEqual(self.urls(store.buscar(categorias=['juros', 'commodities'])),
+                         ['https://exemplo.com/3', 'https://exemplo.com/1'])
+
+    def test_operadores_digitados_viram_texto(self):
+        self.assertEqual(self.store().buscar('selic OR "'), [])
+
+    def test_contagens_diarias_pelo_indice(self):
+        contagens = self.store().contagens_diarias('2025-06-18T00:00:00Z', '2025-06-23T00:00:00Z', termos=['selic'])
+        self.assertEqual(contagens['noticias'].tolist(), [1, 0, 1, 0, 0])
+
+
+class TestIndiceEntidades(TestBaseNewsStore):
+
+    def test_nomes_que_diferem_na_caixa_sao_uma_entidade(self):
+        gravar(self.db_path, 'https://exemplo.com/a', 'Petrobras sobe', 'texto')
+        store = self.store()
+        mencoes = {'empresas': {'Petrobras': 2, 'PETROBRAS': 1}, 'tickers': {'PETR4': 1}}
+        self.assertEqual(store.indexar_mencoes({'https://exemplo.com/a': mencoes}), 1)
+
+        postings = store.conn.execute(
+            "SELECT e.nome, p.mencoes FROM entidade_noticias p JOIN entidades e ON e.id = p.entidade_id "
+            "WHERE e.tipo = 'empresas'").fetchall()
+        self.assertEqual(postings, [('petrobras', 3)])
+        dias = store.conn.execute(
+            "SELECT d.mencoes, d.noticias FROM entidade_dias d JOIN entidades e ON e.id = d.entidade_id "
+            "WHERE e.tipo = 'empresas'").fetchall()
+        self.assertEqual(dias, [(3, 1)])
+
+    def test_noticia_indexada_nao_conta_duas_vezes(self):
+        gravar(self.db_path, 'https://exemplo.com/a', 'Petrobras sobe', 'texto')
+        store = self.store()
+        mencoes = {'https://exemplo.com/a': {'empresas': {'Petrobras': 1}}}
+        store.indexar_mencoes(mencoes)
+        self.assertEqual(store.indexar_mencoes(mencoes), 0)
+
+        alta = store.entidades_em_alta(dias=7, agora='2025-06-24T00:00:00Z', minimo=1)
+        self.assertEqual([(entidade['nome'], entidade['mencoes'], entidade['noticias']) for entidade in alta],
+                         [('Petrobras', 1, 1)])
+        self.assertEqual([mencoes for _, mencoes in store.noticias_com_entidade('PETROBRAS')], [1])
+
+
+
+class ConexaoOcupada:
+    # Conexão cujos primeiros `falhas` lotes encontram o banco bloqueado
+
+    def __init__(self, conn, falhas):
+        self.conn = conn
+        self.falhas = falhas
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *excecao):
+        return self.conn.__exit__(*excecao)
+
+    def executemany(self, sql, linhas):
+        if self.falhas:
+            self.falhas -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.conn.executemany(sql, linhas)
+
+    def execute(self, sql, parametros=()):
+        return self.conn.execute(sql, parametros)
+
+
+class TestNewsWriter(TestBaseNewsStore):
+
+    def writer(self, **opcoes):
+        writer = NewsWriter(self.db_path, flush_interval=0.05, **opcoes)
+        self.addCleanup(writer.close)
+        return writer
+
+    def noticias(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute("SELECT url FROM noticias ORDER BY id")]
+        finally:
+            conn.close()
+
+    def test_grava_em_lote_sem_contar_repetidas(self):
+        writer = self.writer(batch_size=2)
+        for i in (1, 2, 3, 1):
+            writer.put(NewsItem(url=f'https://exemplo.com/{i}', title=f'Notícia {i}', content='texto',
+                                timestamp='2025-06-23T10:00:00Z'))
+        writer.flush(timeout=5)
+        self.assertEqual(writer.rows_written, 3)
+        self.assertEqual(self.noticias(), [f'https://exemplo.com/{i}' for i in (1, 2, 3)])
+
+    def test_linha_ruim_nao_perde_o_lote(self):
+        writer = self.writer()
+        writer.put(NewsItem(url='https://exemplo.com/1', title='Notícia', content='texto'))
+        writer.put(NewsItem(url='https://exemplo.com/2', title=None, content='texto'))
+        writer.put(NewsItem(url='https://exemplo.com/3', title='Notícia', content='texto'))
+        writer.flush(timeout=5)
+        self.assertEqual((writer.rows_written, writer.rows_failed), (2, 1))
+        self.assertEqual(self.noticias(), ['https://exemplo.com/1', 'https://exemplo.com/3'])
+
+    def test_banco_ocupado_repete_o_lote(self):
+        writer = self.writer(tentativas=3)
+        writer.close()
+        def linhas(prefixo):
+            return [('teste', f'{prefixo}/{i}', 'Notícia', 'texto', None, None, None, None, None, None)
+                    for i in range(3)]
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+
+        writer._gravar(ConexaoOcupada(conn, falhas=2), linhas('https://exemplo.com/a'))
+        self.assertEqual(writer.rows_written, 3)
+        # Sempre bloqueado: as tentativas se esgotam e as linhas são gravadas uma a uma
+        writer._gravar(ConexaoOcupada(conn, falhas=3), linhas('https://exemplo.com/b'))
+        self.assertEqual((writer.rows_written, writer.rows_failed), (6, 0))
+
+    def test_flush_com_a_thread_encerrada_nao_trava(self):
+        writer = self.writer()
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.flush(timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
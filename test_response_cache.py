@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from ResponseCache import ResponseCache, RespostaNaoEmCache
+
+
+class Resposta:
+    # Resposta HTTP mínima, como a de requests
+
+    def __init__(self, text='', status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Rede:
+    # Registra os cabeçalhos de cada requisição e devolve as respostas na ordem
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.pedidos = []
+
+    def __call__(self, headers):
+        self.pedidos.append(headers)
+        return self.respostas.pop(0)
+
+
+def corpo(tamanho):
+    # Texto aleatório (hexadecimal), que a compressão reduz pouco: 500 bytes salvam perto de 560
+    return os.urandom(tamanho).hex()
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        self.db_path = os.path.join(self.pasta, 'http_cache.db')
+
+    def cache(self, **opcoes):
+        cache = ResponseCache(self.db_path, **opcoes)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_dentro_do_ttl_nao_vai_a_rede(self):
+        cache = self.cache()
+        rede = Rede(Resposta('<html>artigo</html>'))
+        cache.obter('https://exemplo.com/a', 'artigo', rede)
+        resposta = cache.obter('https://exemplo.com/a', 'artigo', rede)
+        self.assertTrue(resposta.from_cache)
+        self.assertEqual(resposta.text, '<html>artigo</html>')
+        self.assertEqual(len(rede.pedidos), 1)
+
+    def test_expirada_revalida_com_get_condicional(self):
+        cache = self.cache(ttls={'landing': 0})
+        rede = Rede(Resposta('<html>capa</html>', headers={'ETag': '"v1"', 'Last-Modified': 'ontem'}),
+                    Resposta(status_code=304))
+        cache.obter('https://exemplo.com/', 'landing', rede)
+        resposta = cache.obter('https://exemplo.com/', 'landing', rede)
+        self.assertEqual(rede.pedidos[1], {'If-None-Match': '"v1"', 'If-Modified-Since': 'ontem'})
+        self.assertEqual(resposta.text, '<html>capa</html>')
+
+    def test_offline_serve_so_o_que_foi_salvo(self):
+        self.cache(ttls={'artigo': 0}).obter('https://exemplo.com/a', 'artigo', Rede(Resposta('salvo')))
+        offline = self.cache(offline=True)
+        self.assertEqual(offline.obter('https://exemplo.com/a', 'artigo', Rede()).text, 'salvo')
+        with self.assertRaises(RespostaNaoEmCache):
+            offline.obter('https://exemplo.com/b', 'artigo', Rede())
+
+    def test_despeja_as_acessadas_ha_mais_tempo(self):
+        cache = self.cache(max_bytes=2000)
+        for nome in 'abc':
+            cache.obter(f'https://exemplo.com/{nome}', 'artigo', Rede(Resposta(corpo(500))))
+            time.sleep(0.01)
+        # 'a' é lida de novo e passa a ser a mais recente; 'b' sai quando 'd' não cabe
+        cache.obter('https://exemplo.com/a', 'artigo', Rede())
+        time.sleep(0.01)
+        cache.obter('https://exemplo.com/d', 'artigo', Rede(Resposta(corpo(500))))
+
+        urls = [row[0] for row in cache.conn.execute("SELECT url FROM respostas ORDER BY url")]
+        self.assertEqual(urls, ['https://exemplo.com/a', 'https://exemplo.com/c', 'https://exemplo.com/d'])
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+        self.assertEqual(cache.total_bytes, cache.conn.execute("SELECT SUM(tamanho) FROM respostas").fetchone()[0])
+        self.assertEqual(self.cache().total_bytes, cache.total_bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import threading
+import time
+import unittest
+
+from StageScheduler import Stage, StageScheduler
+
+
+class TestStageScheduler(unittest.TestCase):
+
+    def test_resultados_seguem_as_dependencias(self):
+        run = StageScheduler([
+            Stage('soma', lambda a, b: a + b, ['a', 'b']),
+            Stage('a', lambda x: x * 2, ['x']),
+            Stage('b', lambda x: x + 1, ['x'])
+        ]).run({'x': 3})
+        self.assertEqual(run['results']['soma'], 10)
+        self.assertEqual(run['errors'], {})
+        self.assertEqual(set(run['timings']), {'a', 'b', 'soma'})
+
+    def test_estagios_independentes_rodam_em_paralelo(self):
+        # Cada estágio espera o outro começar: em série, a barreira estouraria o tempo
+        barreira = threading.Barrier(2, timeout=5)
+        run = StageScheduler([
+            Stage('a', lambda: barreira.wait()),
+            Stage('b', lambda: barreira.wait())
+        ]).run()
+        self.assertEqual(run['errors'], {})
+
+    def test_falha_so_pula_os_dependentes(self):
+        def falhar(x):
+            raise ValueError("sem dados")
+
+        run = StageScheduler([
+            Stage('quebrado', falhar, ['x']),
+            Stage('depois', lambda quebrado: quebrado, ['quebrado']),
+            Stage('independente', lambda x: x, ['x'])
+        ]).run({'x': 1})
+        self.assertEqual(run['errors'], {'quebrado': 'sem dados'})
+        self.assertEqual(run['skipped'], ['depois'])
+        self.assertEqual(run['results']['independente'], 1)
+
+    def test_tempo_limite_abandona_o_estagio(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        inicio = time.perf_counter()
+        run = StageScheduler([
+            Stage('lento', lambda: liberar.wait(5), timeout=0.1),
+            Stage('depois', lambda lento: lento, ['lento']),
+            Stage('rapido', lambda: 'ok')
+        ]).run()
+        self.assertLess(time.perf_counter() - inicio, 2)
+        self.assertIn('tempo limite', run['errors']['lento'])
+        self.assertEqual(run['skipped'], ['depois'])
+        self.assertEqual(run['results']['rapido'], 'ok')
+
+    def test_entrada_inexistente_e_erro(self):
+        run = StageScheduler([Stage('a', lambda fantasma: fantasma, ['fantasma'])]).run()
+        self.assertIn('fantasma', run['errors']['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from NewsItem import NewsItem
+from TopicClustering import TopicClusterer
+
+PETROLEO = ["O petróleo disparou com o conflito entre Irã e Israel; o barril do Brent passou de 80 dólares.",
+            "Barril de petróleo Brent sobe com ataque de Israel ao Irã e tensão no estreito de Ormuz.",
+            "Conflito entre Israel e Irã leva o petróleo Brent a 80 dólares o barril."]
+SELIC = ["Copom mantém a Selic em 15% e sinaliza juros altos por mais tempo para conter a inflação.",
+         "Selic fica em 15%: Copom diz que juros seguem altos enquanto a inflação não cede.",
+         "Inflação alta faz o Copom manter a Selic e os juros em patamar elevado."]
+
+
+def noticias(textos, prefixo):
+    return [NewsItem(url=f'https://exemplo.com/{prefixo}/{i}', title='', content=texto)
+            for i, texto in enumerate(textos)]
+
+
+class TestTopicClusterer(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        self.db_path = os.path.join(self.pasta, 'news.db')
+
+    def clusterer(self, **opcoes):
+        clusterer = TopicClusterer(self.db_path, **opcoes)
+        self.addCleanup(clusterer.close)
+        return clusterer
+
+    def test_historias_diferentes_em_clusters_diferentes(self):
+        petroleo, selic = noticias(PETROLEO, 'p'), noticias(SELIC, 's')
+        atribuidas = self.clusterer().atribuir(petroleo + selic)
+        self.assertEqual(len({atribuidas[item.id] for item in petroleo}), 1)
+        self.assertEqual(len({atribuidas[item.id] for item in selic}), 1)
+        self.assertNotEqual(atribuidas[petroleo[0].id], atribuidas[selic[0].id])
+
+    def test_execucao_seguinte_continua_os_clusters(self):
+        petroleo = noticias(PETROLEO, 'p')
+        primeira = self.clusterer().atribuir(petroleo[:2])
+        # Outra instância (nova execução) lê os centróides do banco
+        reaberto = self.clusterer()
+        segunda = reaberto.atribuir(petroleo)
+        self.assertEqual(list(segunda), [petroleo[2].id])
+        self.assertEqual(segunda[petroleo[2].id], primeira[petroleo[0].id])
+
+        grupos = reaberto.grupos([item.id for item in petroleo])
+        self.assertEqual(set(grupos['assignments']), {item.id for item in petroleo})
+        self.assertEqual(grupos['clusters'], {primeira[petroleo[0].id]: {'news_count': 3}})
+
+    def test_agrupar_repassa_o_fluxo_na_ordem(self):
+        items = noticias(PETROLEO + SELIC, 'f')
+        clusterer = self.clusterer(tamanho_lote=2)
+        self.assertEqual([item.id for item in clusterer.agrupar(iter(items))], [item.id for item in items])
+        self.assertEqual(set(clusterer.grupos([item.id for item in items])['assignments']),
+                         {item.id for item in items})
+
+    def test_limite_de_clusters_descarta_os_parados(self):
+        clusterer = self.clusterer(max_clusters=1)
+        petroleo, selic = noticias(PETROLEO, 'p'), noticias(SELIC, 's')
+        clusterer.atribuir(petroleo)
+        clusterer.atribuir(selic)
+        self.assertEqual(len(clusterer.clusters), 1)
+        # As notícias do cluster descartado saem das atribuições
+        self.assertEqual(set(clusterer.grupos([item.id for item in petroleo + selic])['assignments']),
+                         {item.id for item in selic})
+
+
+if __name__ == '__main__':
+    unittest.main()
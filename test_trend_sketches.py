@@ -0,0 +1,124 @@
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from NewsItem import NewsItem
+from TrendSketches import CountMinSketch, SpaceSaving, TrendTracker
+
+TEXTO = "A Petrobras anunciou reajuste da gasolina e o petróleo subiu com a alta do dólar."
+
+
+def noticia(numero, data, texto=TEXTO):
+    return NewsItem(url=f'https://exemplo.com/{numero}', title=f'Notícia {numero}', content=texto,
+                    timestamp=data, source='CNN Brasil')
+
+
+def observar(tracker, items):
+    entidades = [{'companies': ['petrobras']} for _ in items]
+    pontuacoes = [{'commodities': 2} for _ in items]
+    return tracker.observar(items, entidades, pontuacoes)
+
+
+class TestSketches(unittest.TestCase):
+
+    def test_count_min_nunca_subestima(self):
+        sketch = CountMinSketch(largura=64, profundidade=4)
+        chaves = [f'chave{i}' for i in range(200)]
+        pesos = np.arange(1, 201, dtype=float)
+        sketch.adicionar(chaves, pesos, [0.0] * len(chaves))
+        self.assertTrue(np.all(sketch.estimar(chaves) >= pesos))
+
+    def test_count_min_decai_pela_meia_vida(self):
+        sketch = CountMinSketch(largura=64, meia_vida=3600)
+        sketch.adicionar(['a'], [8.0], [3600.0])
+        self.assertAlmostEqual(sketch.estimar(['a'], instante=3 * 3600)[0], 2.0)
+
+    def test_space_saving_guarda_as_frequentes(self):
+        resumo = SpaceSaving(k=3)
+        # 'a' passa de total / k, então tem de estar no resumo qualquer que seja a ordem do fluxo
+        chaves = ['a'] * 20 + [f'rara{i}' for i in range(20)]
+        resumo.adicionar(chaves, [1.0] * len(chaves), [0.0] * len(chaves))
+        self.assertEqual(len(resumo.contagens), 3)
+        self.assertIn('a', [chave for chave, _, _ in resumo.topo()])
+
+
+class TestTrendTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        self.db_path = os.path.join(self.pasta, 'news.db')
+
+    def tracker(self):
+        tracker = TrendTracker(self.db_path, largura=256)
+        self.addCleanup(tracker.close)
+        return tracker
+
+    def total(self, tracker, grupo='categorias'):
+        return tracker.base.estimar([f'{grupo}:'])[0]
+
+    def test_noticia_observada_conta_uma_vez(self):
+        tracker = self.tracker()
+        items = [noticia(i, f'2025-06-2{i}T10:00:00Z') for i in range(3)]
+        self.assertEqual(observar(tracker, items + items[:1]), 3)
+        total = self.total(tracker)
+        self.assertEqual(observar(tracker, items), 0)
+        self.assertEqual(self.total(tracker), total)
+
+    def test_observadas_valem_entre_execucoes(self):
+        items = [noticia(i, f'2025-06-2{i}T10:00:00Z') for i in range(3)]
+        tracker = self.tracker()
+        observar(tracker, items)
+        tracker.salvar()
+        total = self.total(tracker)
+
+        reaberto = self.tracker()
+        self.assertEqual(observar(reaberto, items + [noticia(9, '2025-06-23T12:00:00Z')]), 1)
+        self.assertGreater(self.total(reaberto), total)
+        reaberto.salvar()
+        self.assertEqual(self.tracker()._observadas([item.id for item in items]),
+                         {item.id for item in items})
+
+
+class TestTendenciasIncrementais(unittest.TestCase):
+    # Execuções incrementais repetidas sobre as mesmas notícias não podem inflar os sketches
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+        diretorio = os.getcwd()
+        os.chdir(self.pasta)
+        self.addCleanup(os.chdir, diretorio)
+        conn = sqlite3.connect('news.db')
+        conn.execute("CREATE TABLE noticias (id INTEGER PRIMARY KEY AUTOINCREMENT, fonte TEXT NOT NULL, "
+                     "url TEXT UNIQUE NOT NULL, titulo TEXT NOT NULL, texto TEXT NOT NULL, data TEXT, "
+                     "sentimento REAL, categoria TEXT, data_coleta TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.commit()
+        conn.close()
+
+        from EconomyNewsletterSystem import EconomicNewsletterSystem
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.system = EconomicNewsletterSystem()
+
+    def test_noticias_fora_da_janela_nao_sao_observadas_de_novo(self):
+        items = [noticia(1, '2025-06-23T10:00:00Z'), noticia(2, '2025-06-22T10:00:00Z'),
+                 noticia(3, '2025-05-01T10:00:00Z')]
+        self.system.update_aggregates(items)
+        totais = [self.total(grupo) for grupo in ('palavras', 'categorias', 'entidades')]
+        self.assertGreater(totais[0], 0)
+
+        self.system.update_aggregates(items)
+        self.assertEqual([self.total(grupo) for grupo in ('palavras', 'categorias', 'entidades')], totais)
+
+    def total(self, grupo):
+        return self.system.trends.base.estimar([f'{grupo}:'])[0]
+
+
+if __name__ == '__main__':
+    unittest.main()
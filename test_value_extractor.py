@@ -0,0 +1,76 @@
+import unittest
+from datetime import date
+
+from ValueExtractor import value_extractor
+
+
+def registros(texto, referencia=None, tipo=None):
+    _, encontrados = value_extractor.extrair(texto, referencia)
+    return [registro for registro in encontrados if tipo is None or registro[0] == tipo]
+
+
+class TestDinheiro(unittest.TestCase):
+
+    def test_escalas_com_simbolo(self):
+        self.assertEqual(registros("lucro de R$ 1,5 bilhão"), [('dinheiro', 1.5e9, 'BRL')])
+        self.assertEqual(registros("US$ 200 mi em títulos"), [('dinheiro', 2e8, 'USD')])
+        self.assertEqual(registros("R$ 1.234.567,89"), [('dinheiro', 1234567.89, 'BRL')])
+
+    def test_escalas_por_extenso(self):
+        self.assertEqual(registros("3 milhões de dólares"), [('dinheiro', 3e6, 'USD')])
+        self.assertEqual(registros("2 mil reais"), [('dinheiro', 2e3, 'BRL')])
+        self.assertEqual(registros("2 mil de reais"), [('dinheiro', 2e3, 'BRL')])
+        self.assertEqual(registros("500 reais"), [('dinheiro', 500.0, 'BRL')])
+        self.assertEqual(registros("1.200 euros"), [('dinheiro', 1200.0, 'EUR')])
+
+    def test_escala_sem_de_nao_e_dinheiro(self):
+        self.assertEqual(registros("2 milhões reais", tipo='dinheiro'), [])
+
+
+class TestPercentuais(unittest.TestCase):
+
+    def test_pontos_percentuais_e_pontos_base(self):
+        self.assertEqual(registros("alta de 0,5 p.p."), [('percentual', 0.5, 'p.p')])
+        self.assertEqual(registros("queda de 2 pontos percentuais"), [('percentual', 2.0, 'p.p')])
+        self.assertEqual(registros("corte de 50 pontos-base"), [('pontos_base', 50.0, None)])
+        self.assertEqual(registros("corte de 25 bps"), [('pontos_base', 25.0, None)])
+        self.assertEqual(registros("inflação de 4,5%"), [('percentual', 4.5, '%')])
+
+
+class TestDatas(unittest.TestCase):
+
+    def test_dia_da_semana_com_dia_do_mes(self):
+        # 2025-06-25 é uma quarta-feira; a segunda-feira (23) é a anterior
+        self.assertEqual(registros("nesta segunda-feira (23)", date(2025, 6, 25), 'data'),
+                         [('data', '2025-06-23', True)])
+        # Sem o dia do mês vale a segunda mais próxima
+        self.assertEqual(registros("na próxima segunda-feira", date(2025, 6, 25), 'data'),
+                         [('data', '2025-06-30', True)])
+
+    def test_dia_da_semana_sem_referencia(self):
+        self.assertEqual(registros("nesta segunda-feira (23)", tipo='data'), [])
+
+    def test_virada_de_ano_sem_ano(self):
+        self.assertEqual(registros("em 30 de dezembro", date(2025, 1, 3), 'data'),
+                         [('data', '2024-12-30', False)])
+        self.assertEqual(registros("em 2 de janeiro", date(2024, 12, 28), 'data'),
+                         [('data', '2025-01-02', False)])
+        self.assertEqual(registros("em 15 de março", date(2025, 1, 3), 'data'),
+                         [('data', '2025-03-15', False)])
+
+
+class TestTickers(unittest.TestCase):
+
+    def test_tickers_validos(self):
+        self.assertEqual(registros("PETR4, VALE3 e TAEE11 subiram", tipo='ticker'),
+                         [('ticker', 'PETR4', None), ('ticker', 'VALE3', None), ('ticker', 'TAEE11', None)])
+
+    def test_falsos_positivos(self):
+        for texto in ("petr4 em minúsculas", "surto de COVID19", "modelo ABCD2", "ABCD9", "PETR44", "XPETR4",
+                      "IPCA12 meses"):
+            with self.subTest(texto=texto):
+                self.assertEqual(registros(texto, tipo='ticker'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()